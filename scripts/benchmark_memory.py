@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Measure the memory held by parsed firmware objects, per object.
+
+Synthetic volumes are built with many firmware files (each with a PE and a UI
+section) and with a NVAR store of many variables. The memory allocated while
+parsing, and kept by the parsed tree, is divided by the number of objects.
+'''
+from __future__ import print_function
+
+import argparse
+import gc
+import struct
+import tracemalloc
+
+from uefi_firmware import AutoParser
+from uefi_firmware.structs.uefi_structs import guid_bytes
+
+FFS2_GUID = "8c8ce578-8a3d-4f1c-9935-896185c32dd3"
+NVAR_GUID = "cef5b9a3-476d-497f-9fdc-e98143e0422c"
+
+
+def _align(data, alignment, fill=b"\x00"):
+    return data + fill * (-len(data) % alignment)
+
+
+def _section(section_type, body):
+    return _align(struct.pack("<I", 4 + len(body))[:3] +
+                  struct.pack("<B", section_type) + body, 4)
+
+
+def _file(index, file_type, body, guid=None):
+    if guid is None:
+        guid = struct.pack("<I", index) + b"\x00" * 12
+    size = struct.pack("<I", 24 + len(body))
+    return _align(guid + struct.pack("<HBB", 0xAA55, file_type, 0) +
+                  size[:3] + b"\xF8" + body, 8, b"\xFF")
+
+
+def _volume(files):
+    body = b"".join(files)
+    size = 0x48 + len(body)
+    header = b"\x00" * 16 + guid_bytes(FFS2_GUID) + struct.pack("<Q", size) + \
+        b"_FVH" + struct.pack("<IHHHBB", 0x0004FEFF, 0x48, 0, 0, 0, 2) + \
+        struct.pack("<II", 1, size) + b"\x00" * 8
+    checksum = (0x10000 - sum(struct.unpack("<36H", header))) & 0xFFFF
+    return header[:0x32] + struct.pack("<H", checksum) + header[0x34:] + body
+
+
+def file_volume(count):
+    '''A volume of 'count' files, each with a PE and a UI section.'''
+    files = []
+    for i in range(count):
+        name = ("Driver%d" % i).encode("utf-16le") + b"\x00\x00"
+        files.append(_file(i, 0x07, _section(0x10, b"MZ" + b"\x00" * 62) +
+                           _section(0x15, name)))
+    return _volume(files)
+
+
+def variable_volume(count):
+    '''A volume with a NVAR store of 'count' named variables.'''
+    variables = []
+    for i in range(count):
+        # Variables share a few vendor GUIDs.
+        body = struct.pack("<I", i % 8) + b"\x00" * 12 + \
+            ("Variable%d" % i).encode("ascii") + b"\x00" + b"\x01" * 8
+        variables.append(b"NVAR" + struct.pack("<H", 10 + len(body)) +
+                         b"\xFF\xFF\xFF" + b"\x86" + body)
+    return _volume([_file(0, 0x01, b"".join(variables), guid_bytes(NVAR_GUID))])
+
+
+def measure(data, count):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    firmware = AutoParser(data).parse()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del firmware
+    return held, held / float(count)
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description="Measure the memory held by parsed firmware objects.")
+    argparser.add_argument(
+        '-n', '--files', type=int, default=5000, help="Number of files.")
+    argparser.add_argument(
+        '-v', '--variables', type=int, default=20000,
+        help="Number of NVAR variables.")
+    args = argparser.parse_args()
+
+    # Each file is a file object and two section objects.
+    held, per_object = measure(file_volume(args.files), args.files * 3)
+    print("files:     %d objects, %d KiB held, %d bytes per object" % (
+        args.files * 3, held // 1024, per_object))
+    held, per_object = measure(variable_volume(args.variables), args.variables)
+    print("variables: %d objects, %d KiB held, %d bytes per object" % (
+        args.variables, held // 1024, per_object))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Measure how efi_compressor scales across threads on independent buffers.
+
+The extension releases the GIL while decoding and encoding, so the speedup
+should follow the number of threads up to the number of cores.
+'''
+from __future__ import print_function
+
+import argparse
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from uefi_firmware import efi_compressor
+
+ALGORITHMS = {
+    "efi": (efi_compressor.EfiCompress, efi_compressor.EfiDecompress),
+    "tiano": (efi_compressor.TianoCompress, efi_compressor.TianoDecompress),
+    "lzma": (efi_compressor.LzmaCompress, efi_compressor.LzmaDecompress),
+}
+
+
+def make_buffers(count, size):
+    '''Create partially compressible buffers, each distinct.'''
+    buffers = []
+    for i in range(count):
+        chunk = os.urandom(size // 8) + bytes(bytearray([i % 256])) * (size // 8)
+        buffers.append((chunk * 4)[:size])
+    return buffers
+
+
+def run(function, buffers, threads, rounds):
+    def work(data):
+        return len(function(data, len(data)))
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in range(rounds):
+            list(executor.map(work, buffers))
+    return time.time() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description="Benchmark efi_compressor (de)compression across threads.")
+    argparser.add_argument(
+        '-a', '--algorithm', default="lzma", choices=sorted(ALGORITHMS.keys()),
+        help="The compression algorithm.")
+    argparser.add_argument(
+        '-t', '--threads', default=None,
+        help="Comma-separated thread counts (default: 1 up to the CPU count).")
+    argparser.add_argument(
+        '-n', '--buffers', type=int, default=32, help="Number of buffers.")
+    argparser.add_argument(
+        '-s', '--size', type=int, default=1024 * 1024,
+        help="Size of each decompressed buffer.")
+    argparser.add_argument(
+        '-c', '--compress', default=False, action="store_true",
+        help="Measure compression instead of decompression.")
+    argparser.add_argument(
+        '-r', '--rounds', type=int, default=3, help="Passes over the buffers.")
+    args = argparser.parse_args()
+
+    if args.threads is not None:
+        thread_counts = [int(count) for count in args.threads.split(",")]
+    else:
+        thread_counts = [1]
+        while thread_counts[-1] * 2 <= (os.cpu_count() or 1):
+            thread_counts.append(thread_counts[-1] * 2)
+
+    compress, decompress = ALGORITHMS[args.algorithm]
+    buffers = make_buffers(args.buffers, args.size)
+    function = compress
+    if not args.compress:
+        buffers = [compress(data, len(data)) for data in buffers]
+        function = decompress
+    total = args.buffers * args.size * args.rounds / (1024.0 * 1024.0)
+
+    print("%s: %d buffers of %d bytes, %d CPUs" % (
+        args.algorithm, args.buffers, args.size, os.cpu_count() or 1))
+    base = None
+    for threads in thread_counts:
+        elapsed = run(function, buffers, threads, args.rounds)
+        base = base or elapsed
+        print("threads %3d: %8.3fs %9.1f MiB/s  speedup %.2fx" % (
+            threads, elapsed, total / elapsed, base / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,7 @@ except (ImportError, AttributeError):
 
 
 def brute_search(data):
-    volumes = search_firmware_volumes(data)
+    volumes = search_firmware_volumes(data, validate=True)
 
     for index in volumes:
         _parse_firmware_volume(data[index - 40:], name=index - 40)
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''Regenerate the precompiled GUID index from the GUID tables.
+
+Run this after changing uefi_firmware/guids/efiguids*.py, the tests check
+that the index matches the tables.
+'''
+from __future__ import print_function
+
+import argparse
+
+from uefi_firmware import guids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write the GUID tables as a precompiled index.")
+    parser.add_argument(
+        "-o", "--output", default=guids.INDEX_PATH,
+        help="The index to write (default: %s)." % guids.INDEX_PATH)
+    args = parser.parse_args()
+
+    database = guids.build_database()
+    database.save_index(args.output)
+    print("Wrote %d GUIDs to %s" % (len(database), args.output))
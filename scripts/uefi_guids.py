@@ -4,10 +4,11 @@ from __future__ import print_function
 
 import argparse
 
+from uefi_firmware.base import walk
 from uefi_firmware.uefi import *
 from uefi_firmware.utils import *
 from uefi_firmware.flash import FlashDescriptor
-from uefi_firmware.guids import get_guid_name
+from uefi_firmware.guids import get_guid_name, load_dec, load_csv
 
 
 def debug(text, cr=True, gen=False):
@@ -46,33 +47,35 @@ def label_as_guid_name(label):
 
 
 def list_uefi_guids(base_object):
-    base_objects = base_object.iterate_objects(False)
-    objects = flatten_firmware_objects(base_objects)
+    guided_guids = set(FIRMWARE_GUIDED_GUIDS.values())
+    parents = {}
     guids = {}
 
-    for firmware_object in objects:
-        guid = firmware_object["guid"] if "guid" in firmware_object else None
-        if guid is None:
+    for firmware_object, parent, _, _ in walk(base_object):
+        parents[id(firmware_object)] = parent
+        if parent is None:
             continue
-        if firmware_object["guid"] in [v for k, v in FIRMWARE_GUIDED_GUIDS.items()]:
-            guid = firmware_object["parent"]["parent"]["guid"]
+        guid = firmware_object.guid_label
+        if guid in guided_guids and parents[id(parent)] is not None:
+            # Name the file containing the GUID-defined section.
+            guid = parents[id(parent)].guid_label
 
         if len(guid) == 0:
             continue
-        if guid not in list(guids.keys()):
+        if guid not in guids:
             guids[guid] = {"labels": [], "types": []}
 
-        if len(firmware_object["label"]) > 0 and \
-                firmware_object["label"] not in guids[guid]["labels"]:
-            guids[guid]["labels"].append(firmware_object["label"])
-        if firmware_object["type"] not in guids[guid]["types"]:
-            guids[guid]["types"].append(firmware_object["type"])
+        label = firmware_object.label
+        if len(label) > 0 and label not in guids[guid]["labels"]:
+            guids[guid]["labels"].append(label)
+        if firmware_object.type_label not in guids[guid]["types"]:
+            guids[guid]["types"].append(firmware_object.type_label)
 
     guid_list = list(guids.keys())
     guid_list.sort()
 
     for guid in guid_list:
-        guid_name = get_guid_name(s2aguid(guid))
+        guid_name = get_guid_name(guid)
 
         label = ""
         if len(guids[guid]["labels"]) >= 1:
@@ -98,7 +101,7 @@ def list_uefi_guids(base_object):
 
 
 def brute_search_volumes(data):
-    volumes = search_firmware_volumes(data)
+    volumes = search_firmware_volumes(data, validate=True)
     for index in volumes:
         parse_firmware_volume(data[index - 40:], name=index - 40)
     pass
@@ -151,10 +154,19 @@ if __name__ == "__main__":
     parser.add_argument(
         '-u', "--unknowns", action="store_true",
         help='When generating also print unknowns.')
+    parser.add_argument(
+        "--names", action="append", default=[],
+        help="Add GUID names from an EDK2 .dec or a CSV file (repeatable).")
 
     parser.add_argument("file", help="The file to work on")
     args = parser.parse_args()
 
+    for path in args.names:
+        if path.lower().endswith(".dec"):
+            load_dec(path)
+        else:
+            load_csv(path)
+
     try:
         with open(args.file, 'rb') as fh:
             input_data = fh.read()
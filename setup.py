@@ -69,6 +69,7 @@ setup(
     url='https://github.com/theopolis/uefi-firmware-parser',
     license='BSD',
     packages=find_packages(exclude=('tests', 'docs')),
+    package_data={'uefi_firmware.guids': ['index.bin']},
     test_suite="tests",
     cmdclass={
         "lint": LintCommand,
@@ -82,7 +83,11 @@ setup(
                 os.path.join("uefi_firmware", 'compression', 'Include')
             ],
             depends=COMPRESSION_HEADERS,
-        )
+        ),
+        Extension(
+            'uefi_firmware._buffers',
+            sources=[os.path.join("uefi_firmware", "buffers", "Buffers.c")],
+        ),
     ],
     scripts=[
         'bin/uefi-firmware-parser',
@@ -95,6 +100,7 @@ setup(
         'Topic :: Security',
         'License :: OSI Approved :: BSD License',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: Free Threading :: 2 - Beta',
     ],
     keywords="security uefi firmware parsing bios",
 )
@@ -1,2 +1,12 @@
-
 from . import test_compression
+from . import test_uefi
+from . import test_cache
+from . import test_sniffer
+from . import test_checker
+from . import test_guids
+from . import test_index
+from . import test_scheduler
+from . import test_batch
+from . import test_shared
+from . import test_threads
+from . import test_aio
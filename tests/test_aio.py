@@ -0,0 +1,89 @@
+import unittest
+import asyncio
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from uefi_firmware import AutoParser, aio
+from uefi_firmware.base import walk
+from uefi_firmware.utils import Cancelled, check_cancelled, run_cancellable
+
+from .test_uefi import sample_volume
+
+
+def _walked(items):
+    return [(type(node).__name__, depth, path)
+            for node, _, depth, path in items]
+
+
+class AsyncTest(unittest.TestCase):
+
+    def test_parse(self):
+        data = sample_volume() * 2
+        serial = AutoParser(data).parse()
+
+        async def parse():
+            firmware = await aio.parse_async(data)
+            lazy = await aio.parse_async(data, lazy=True)
+            return firmware, lazy, [item async for item in aio.walk_async(lazy)]
+        firmware, lazy, items = asyncio.run(parse())
+        self.assertEqual(firmware.to_dict(), serial.to_dict())
+        # Walking a lazy tree expands it, as a serial walk would.
+        self.assertEqual(_walked(items), _walked(walk(serial)))
+        self.assertEqual(lazy.to_dict(), serial.to_dict())
+
+        self.assertEqual(asyncio.run(aio.parse_async(b"\x00" * 64)), None)
+
+    def test_dump(self):
+        path = tempfile.mkdtemp()
+        try:
+            firmware = AutoParser(sample_volume()).parse()
+            with contextlib.redirect_stdout(io.StringIO()):
+                firmware.dump(os.path.join(path, "serial"))
+                asyncio.run(aio.dump_async(
+                    firmware, os.path.join(path, "async")))
+            for parent in ("serial", "async"):
+                self.assertGreater(len(os.listdir(os.path.join(path, parent))), 0)
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(path, "serial"))),
+                sorted(os.listdir(os.path.join(path, "async"))))
+        finally:
+            shutil.rmtree(path)
+
+    def test_cancel(self):
+        started = threading.Event()
+        stopped = threading.Event()
+
+        def work():
+            started.set()
+            try:
+                while True:
+                    check_cancelled()
+                    time.sleep(0.001)
+            finally:
+                stopped.set()
+
+        async def cancel():
+            task = asyncio.ensure_future(aio.call_async(work))
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The work stopped before the coroutine returned.
+            self.assertTrue(stopped.is_set())
+        asyncio.run(cancel())
+
+        # A cancelled parse stops before processing the next object.
+        event = threading.Event()
+        self.assertNotEqual(
+            run_cancellable(event, AutoParser(sample_volume()).parse), None)
+        event.set()
+        with self.assertRaises(Cancelled):
+            run_cancellable(event, AutoParser(sample_volume()).parse)
+        # The event only applies to the function.
+        check_cancelled()
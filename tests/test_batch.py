@@ -0,0 +1,88 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from uefi_firmware import batch
+from uefi_firmware.batch import run_batch
+
+from .test_uefi import sample_volume
+
+
+class _Crash(str):
+    '''A path that ends the worker process receiving it.'''
+
+    def __reduce__(self):
+        return (os._exit, (1,))
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.paths = []
+        for name, data in [("small.fv", sample_volume()),
+                           ("large.fv", sample_volume() * 2),
+                           ("unknown.bin", b"\x00" * 64)]:
+            path = os.path.join(self.folder, name)
+            with open(path, "wb") as fh:
+                fh.write(data)
+            self.paths.append(path)
+        self.paths.append(os.path.join(self.folder, "missing.bin"))
+
+    def _check(self, results):
+        lines = dict((path, json.loads(line)) for path, _, line in results)
+        self.assertEqual(sorted(lines), sorted(self.paths))
+        for path, error, _ in results:
+            self.assertEqual(lines[path]["error"], error)
+
+        small = lines[self.paths[0]]
+        self.assertEqual(small["type"], "UEFIFirmwareVolume")
+        self.assertEqual(small["error"], None)
+        self.assertEqual(small["result"]["ffs"][0]["guid"],
+                         "aaaaaaaa-0000-0000-0000-000000000001")
+        self.assertEqual(lines[self.paths[2]]["type"], "unknown")
+        self.assertNotEqual(lines[self.paths[2]]["error"], None)
+        self.assertNotEqual(lines[self.paths[3]]["error"], None)
+
+    def test_serial(self):
+        results = list(run_batch(self.paths, jobs=1))
+        self._check(results)
+        # Largest first.
+        self.assertEqual([r[0] for r in results], [
+            self.paths[1], self.paths[0], self.paths[2], self.paths[3]])
+
+    def test_workers(self):
+        self._check(list(run_batch(self.paths, jobs=2, max_files=1)))
+        self._check(list(run_batch(self.paths, jobs=3, headers_only=True)))
+
+    def test_replace_pool(self):
+        # Without max_tasks_per_child (before Python 3.11) the pool is
+        # replaced after jobs * max_files files.
+        with mock.patch.object(batch, "_MAX_TASKS_PER_CHILD", False), \
+                mock.patch.object(
+                    batch, "_executor", wraps=batch._executor) as executor:
+            self._check(list(run_batch(self.paths, jobs=2, max_files=1)))
+        self.assertGreaterEqual(executor.call_count, 2)
+
+    def test_worker_exit(self):
+        crash = _Crash(self.paths[0])
+        paths = [crash] + self.paths[1:]
+        for max_files in (None, 1):
+            results = list(run_batch(paths, jobs=2, max_files=max_files))
+            # The other files are parsed, the file ending its worker fails.
+            self.assertEqual(sorted(r[0] for r in results), sorted(paths))
+            for path, error, line in results:
+                self.assertEqual(json.loads(line)["error"], error)
+                if path == crash:
+                    self.assertIn("BrokenProcessPool", error)
+            lines = dict((path, json.loads(line)) for path, _, line in results)
+            self.assertEqual(lines[self.paths[1]]["error"], None)
+            self.assertEqual(lines[self.paths[1]]["type"], "UEFIFirmwareVolume")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+
+from uefi_firmware import cache, efi_compressor
+from uefi_firmware import AutoParser
+
+from .test_uefi import sample_volume
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = cache.enable(self.path)
+        self.calls = []
+
+    def tearDown(self):
+        cache.disable()
+        shutil.rmtree(self.path)
+
+    def _decompress(self, data):
+        self.calls.append(data)
+        return zlib.decompress(data)
+
+    def test_decode(self):
+        content = b"AAAAAAAA" * 90
+        compressed = zlib.compress(content)
+        for _ in range(2):
+            self.assertEqual(
+                cache.decode("zlib", self._decompress, compressed), content)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_failure(self):
+        with self.assertRaises(zlib.error):
+            cache.decode("zlib", self._decompress, b"invalid")
+        # The failure is recorded, the algorithm is not attempted again.
+        with self.assertRaises(cache.CachedFailure):
+            cache.decode("zlib", self._decompress, b"invalid")
+        self.assertEqual(len(self.calls), 1)
+
+    def test_transient_failure(self):
+        content = b"AAAAAAAA" * 90
+        compressed = zlib.compress(content)
+
+        def fail(data):
+            raise MemoryError()
+        with self.assertRaises(MemoryError):
+            cache.decode("zlib", fail, compressed)
+        # Only invalid content is recorded, a later attempt decodes.
+        self.assertEqual(
+            cache.decode("zlib", self._decompress, compressed), content)
+
+        # The native codecs report invalid content as ValueError.
+        with self.assertRaises(ValueError):
+            cache.decode("EfiDecompress", efi_compressor.EfiDecompress, b"\xFF" * 32)
+        with self.assertRaises(cache.CachedFailure):
+            cache.decode("EfiDecompress", efi_compressor.EfiDecompress, b"\xFF" * 32)
+
+    def test_eviction(self):
+        self.cache.max_size = 3000
+        for i in range(4):
+            cache.decode("raw", bytes, bytes([i]) * 1000)
+            os.utime(self.cache._entry(
+                "raw", self._digest(bytes([i]) * 1000)), (i, i))
+        self.assertLessEqual(self.cache.size, 3000)
+        self.assertEqual(self.cache.get("raw", self._digest(b"\x00" * 1000)), None)
+        self.assertEqual(
+            self.cache.get("raw", self._digest(b"\x03" * 1000)), (True, b"\x03" * 1000))
+
+    def test_size(self):
+        digest = self._digest(b"encoded")
+        self.cache.put("raw", digest, b"\x00" * 1000)
+        size = self.cache.size
+        # Replacing an entry, as concurrent writers do, keeps the size.
+        self.cache.put("raw", digest, b"\x00" * 1000)
+        self.assertEqual(self.cache.size, size)
+
+        # Growing beyond the limit evicts down to the low-water mark.
+        self.cache.max_size = 4000
+        for i in range(4):
+            self.cache.put("raw", self._digest(bytes([i])), bytes([i]) * 1000)
+        self.assertLessEqual(self.cache.size, 4000 * cache.LOW_WATER)
+
+    def _digest(self, data):
+        return hashlib.sha256(data).hexdigest()
+
+    def test_parse(self):
+        expected = AutoParser(sample_volume()).parse().to_dict()
+        self.assertEqual(AutoParser(sample_volume()).parse().to_dict(), expected)
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(self.cache.hits, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
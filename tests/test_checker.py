@@ -0,0 +1,101 @@
+import unittest
+import struct
+
+from uefi_firmware import AutoParser, base
+from uefi_firmware.misc import checker
+
+from .test_uefi import sample_volume
+
+
+class CheckerTest(unittest.TestCase):
+
+    def _blob(self):
+        # Signatures within unrelated content, and a partial volume header.
+        volume = sample_volume()
+        data = bytes(bytearray([(i * 7) & 0xFF for i in range(0x300)]))
+        data += b"PFS.HDR" + b"\x00" * 0x19
+        data += b"_FVH" + b"\x00" * 0x2C + b"$PFH" + struct.pack("<6I", *([0] * 6))
+        return data + volume, len(data)
+
+    def test_scan(self):
+        data, offset = self._blob()
+        results = list(checker.scan(memoryview(data)))
+        self.assertEqual([result[0] for result in results],
+                         [0x300, offset - 0x1C, offset])
+        self.assertEqual(results[0][1], [checker.DellPFSTester])
+        self.assertEqual(results[2][1], [checker.UEFIFirmwareVolumeTester])
+
+    def test_scan_offsets(self):
+        # The scan agrees with trying the testers at every offset.
+        data, _ = self._blob()
+        data = memoryview(data[:0x500])
+        expected = [
+            i for i in range(len(data))
+            if AutoParser(data[i:], search=False).type() != 'unknown']
+        self.assertEqual([result[0] for result in checker.scan(data)], expected)
+
+    def test_custom_tester(self):
+        class MarkerTester(checker.TypeTester):
+            static = b"MARK"
+
+        data = b"\x00" * 100 + b"MARK" + b"\x00" * 100
+        self.assertEqual(list(checker.scan(data, [MarkerTester])),
+                         [(100, [MarkerTester])])
+
+    def test_detect(self):
+        volume = sample_volume()
+        tester = checker.detect(memoryview(volume))
+        self.assertTrue(isinstance(tester, checker.UEFIFirmwareVolumeTester))
+        # Testers are instantiated once.
+        self.assertTrue(checker.detect(volume) is tester)
+        self.assertEqual(tester.name, "UEFIFirmwareVolume")
+
+        # An unknown volume GUID is not a match.
+        self.assertEqual(checker.detect(volume[:16] + b"\x00" * 16 + volume[32:]), None)
+        self.assertEqual(checker.detect(b"\x00" * 0x40 + volume), None)
+
+    def test_register(self):
+        class MarkerTester(checker.TypeTester):
+            static = b"MARK"
+            parser = base.RawObject
+
+        data = b"MARK" + b"\x00" * 100
+        self.assertEqual(AutoParser(data).type(), "unknown")
+        checker.register(MarkerTester)
+        try:
+            self.assertEqual(AutoParser(data).type(), "Marker")
+            self.assertEqual(list(checker.scan(data)), [(0, [MarkerTester])])
+        finally:
+            checker.unregister(MarkerTester)
+        self.assertEqual(AutoParser(data).type(), "unknown")
+
+        # Testers appended to TESTERS are used, a tester overriding match
+        # without signatures is tried on all content.
+        class PrefixTester(checker.TypeTester):
+            parser = base.RawObject
+
+            def match(self, data):
+                return data[:3] == b"PRE"
+
+        data = b"\x00PRE" + b"\x00" * 100
+        self.assertEqual(PrefixTester().signatures, None)
+        checker.TESTERS.append(PrefixTester)
+        try:
+            self.assertEqual(AutoParser(data[1:]).type(), "Prefix")
+            self.assertEqual(list(checker.scan(data)), [(1, [PrefixTester])])
+        finally:
+            checker.TESTERS.remove(PrefixTester)
+        self.assertEqual(AutoParser(data[1:]).type(), "unknown")
+
+        # A later registration takes precedence over an earlier match.
+        class OtherPFSTester(checker.TypeTester):
+            static = b"PFS.HDR"
+
+        registry = checker.Registry([checker.DellPFSTester, OtherPFSTester])
+        data = b"PFS.HDR" + b"\x00" * 100
+        self.assertEqual(registry.detect(data).name, "OtherPFS")
+        registry.register(checker.DellPFSTester)
+        self.assertEqual(registry.detect(data).name, "DellPFS")
+
+if __name__ == '__main__':
+    unittest.main()
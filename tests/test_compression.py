@@ -1,5 +1,7 @@
 import unittest
+import importlib.util
 import struct
+import threading
 
 from uefi_firmware import efi_compressor
 
@@ -63,5 +65,129 @@ class CompressionTest(unittest.TestCase):
         self.assertEqual(len(decompressed_buffer), len(default_buffer))
         self.assertEqual(decompressed_buffer, default_buffer)
 
+    def test_invalid_input(self):
+        with self.assertRaises(TypeError):
+            efi_compressor.EfiDecompress(u"text", 4)
+        with self.assertRaises(ValueError):
+            efi_compressor.LzmaDecompress(b"\x00" * 16, 17)
+        with self.assertRaises(Exception):
+            efi_compressor.LzmaGetInfo(b"\x5d\x00")
+
+    def test_buffers(self):
+        default_buffer = b"AAAAAAAA" * 90
+        for compress, decompress in [
+                (efi_compressor.EfiCompress, efi_compressor.EfiDecompress),
+                (efi_compressor.TianoCompress, efi_compressor.TianoDecompress),
+                (efi_compressor.LzmaCompress, efi_compressor.LzmaDecompress)]:
+            compressed_buffer = compress(bytearray(default_buffer))
+            self.assertEqual(compressed_buffer, compress(default_buffer))
+            # Any contiguous buffer is read in place, the size is optional.
+            padded = memoryview(b"\xFF" + compressed_buffer + b"\xFF")[1:-1]
+            self.assertEqual(decompress(padded), default_buffer)
+            self.assertEqual(
+                decompress(bytearray(compressed_buffer), len(compressed_buffer)),
+                default_buffer)
+
+    def test_decompress_into(self):
+        default_buffer = b"ABCDEFGH" * 90
+        for compress, get_info, decompress_into in [
+                (efi_compressor.EfiCompress, efi_compressor.EfiGetInfo,
+                 efi_compressor.EfiDecompressInto),
+                (efi_compressor.TianoCompress, efi_compressor.TianoGetInfo,
+                 efi_compressor.TianoDecompressInto),
+                (efi_compressor.LzmaCompress, efi_compressor.LzmaGetInfo,
+                 efi_compressor.LzmaDecompressInto)]:
+            compressed_buffer = compress(default_buffer)
+            size, scratch_size = get_info(compressed_buffer)
+            self.assertEqual(size, len(default_buffer))
+            self.assertGreaterEqual(scratch_size, 0)
+
+            destination = bytearray(size + 16)
+            self.assertEqual(
+                decompress_into(compressed_buffer, destination), size)
+            self.assertEqual(bytes(destination[:size]), default_buffer)
+            with self.assertRaises(ValueError):
+                decompress_into(compressed_buffer, bytearray(size - 1))
+            with self.assertRaises(TypeError):
+                decompress_into(compressed_buffer, bytes(size))
+
+    def test_threads(self):
+        # EFI and Tiano decoding differ in state that was once shared, and
+        # the compressors keep their state per thread.
+        algorithms = [
+            (efi_compressor.EfiCompress, efi_compressor.EfiDecompress),
+            (efi_compressor.TianoCompress, efi_compressor.TianoDecompress),
+            (efi_compressor.LzmaCompress, efi_compressor.LzmaDecompress),
+        ]
+        contents = [
+            bytes(bytearray(range(256))) * 64 + b"AAAAAAAA" * 512,
+            b"ABCDEFGH" * 1024 + bytes(bytearray(range(255, -1, -1))) * 32,
+        ]
+        expected = dict(
+            ((compress, content), compress(content, len(content)))
+            for compress, _ in algorithms for content in contents)
+        failures = []
+
+        def run(compress, decompress, content):
+            for _ in range(20):
+                compressed = compress(content, len(content))
+                if compressed != expected[(compress, content)]:
+                    failures.append(compress.__name__)
+                if decompress(compressed, len(compressed)) != content:
+                    failures.append(decompress.__name__)
+
+        threads = [threading.Thread(target=run, args=algorithm + (content,))
+                   for algorithm in algorithms for content in contents * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+    def test_lzma_decompressor(self):
+        default_buffer = bytes(bytearray(range(256))) * 300
+        compressed_buffer = efi_compressor.LzmaCompress(default_buffer)
+
+        # Input is fed in chunks and output is returned in bounded chunks.
+        decompressor = efi_compressor.LzmaDecompressor()
+        output = b""
+        offset = 0
+        while not decompressor.eof:
+            chunk = b""
+            if decompressor.needs_input:
+                chunk = compressed_buffer[offset:offset + 100]
+                offset += 100
+            data = decompressor.decompress(chunk, 1000)
+            self.assertLessEqual(len(data), 1000)
+            output += data
+        self.assertEqual(output, default_buffer)
+        self.assertEqual(decompressor.size, len(default_buffer))
+        with self.assertRaises(EOFError):
+            decompressor.decompress(b"")
+
+        # Decoding stops after max_output bytes, the rest is unused.
+        decompressor = efi_compressor.LzmaDecompressor(max_output=16)
+        self.assertEqual(
+            decompressor.decompress(compressed_buffer), default_buffer[:16])
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(decompressor.total_out, 16)
+        self.assertGreater(len(decompressor.unused_data), 0)
+
+        with self.assertRaises(Exception):
+            efi_compressor.LzmaDecompressor().decompress(b"\xFF" * 32)
+
+    def test_module_state(self):
+        # Each module object has its own LzmaDecompressor type.
+        spec = importlib.util.find_spec(efi_compressor.__name__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.assertIsNot(
+            module.LzmaDecompressor, efi_compressor.LzmaDecompressor)
+        content = b"AAAAAAAA" * 90
+        self.assertEqual(
+            module.LzmaDecompressor().decompress(module.LzmaCompress(content)),
+            content)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import os
+import pickle
+import struct
+import tempfile
+from collections import OrderedDict
+from unittest import mock
+
+from uefi_firmware import AutoParser, guids
+from uefi_firmware.utils import Guid, sguid
+from uefi_firmware.structs.uefi_structs import FIRMWARE_GUIDED_GUID_NAMES
+
+from .test_uefi import sample_volume
+
+LZMA_GUID = "ee4e5898-3914-4259-9d6e-dc7bd79403cf"
+
+DEC = '''
+[Guids]
+  ## Include/Guid/Example.h
+  gExampleGuid       = { 0x11111111, 0x2222, 0x3333, { 0x44, 0x44, 0x55, 0x55, 0x55, 0x55, 0x55, 0x55 }}
+  # gCommentedGuid   = { 0x99999999, 0x2222, 0x3333, { 0x44, 0x44, 0x55, 0x55, 0x55, 0x55, 0x55, 0x55 }}
+
+[Protocols]
+  gExampleProtocolGuid = {0xaaaaaaaa,0xbbbb,0xcccc,{0xdd,0xdd,0xee,0xee,0xee,0xee,0xee,0xee}} # Comment
+'''
+
+
+class GuidsTest(unittest.TestCase):
+
+    def _write(self, content):
+        fh = tempfile.NamedTemporaryFile("w", delete=False)
+        fh.write(content)
+        fh.close()
+        self.addCleanup(os.unlink, fh.name)
+        return fh.name
+
+    def test_lookup(self):
+        raw = guids.raw_guid(LZMA_GUID)
+        self.assertEqual(raw[:4], struct.pack("<I", 0xee4e5898))
+        name = guids.get_guid_name(raw)
+        self.assertEqual(name, "LZMA_CUSTOM_DECOMPRESS_GUID")
+        self.assertEqual(guids.get_guid_name(memoryview(raw)), name)
+        self.assertEqual(guids.get_guid_name(LZMA_GUID), name)
+        self.assertEqual(guids.get_guid_name(
+            [0xee4e5898, 0x3914, 0x4259, 0x9d, 0x6e, 0xdc, 0x7b, 0xd7, 0x94, 0x03, 0xcf]),
+            name)
+        self.assertEqual(guids.get_guid_name(b"\x00" * 16), None)
+
+    def test_index(self):
+        # The precompiled index matches the GUID tables, in order.
+        database = guids.GuidDatabase()
+        database.load_index(guids.INDEX_PATH)
+        tables = guids.build_database()
+        self.assertEqual(list(database.names.items()), list(tables.names.items()))
+
+        # The first table naming a GUID wins.
+        expected = {}
+        for table in guids.get_tables():
+            for name, guid in table.items():
+                expected.setdefault(guids.raw_guid(guid), name)
+        self.assertEqual(tables.names, expected)
+
+        path = self._write("")
+        tables.save_index(path)
+        copy = guids.GuidDatabase()
+        copy.load_index(path)
+        self.assertEqual(copy.names, tables.names)
+
+    def test_load_dec(self):
+        database = guids.GuidDatabase()
+        self.assertEqual(database.load_dec(self._write(DEC)), 2)
+        self.assertEqual(
+            database.get("11111111-2222-3333-4444-555555555555"), "gExampleGuid")
+        self.assertEqual(
+            database.get("aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"),
+            "gExampleProtocolGuid")
+        self.assertFalse("99999999-2222-3333-4444-555555555555" in database)
+
+    def test_load_csv(self):
+        database = guids.GuidDatabase()
+        database.add(LZMA_GUID, "Existing")
+        path = self._write(
+            "guid,name\n"
+            "11111111-2222-3333-4444-555555555555,First\n"
+            "Second,{aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee}\n"
+            "%s,Replacement\n" % LZMA_GUID)
+        self.assertEqual(database.load_csv(path), 3)
+        self.assertEqual(database.get("11111111-2222-3333-4444-555555555555"), "First")
+        self.assertEqual(database.get("aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"), "Second")
+        self.assertEqual(database.get(LZMA_GUID), "Existing")
+
+        database.load_csv(path, override=True)
+        self.assertEqual(database.get(LZMA_GUID), "Replacement")
+
+    def test_guid_type(self):
+        raw = guids.raw_guid(LZMA_GUID)
+        guid = Guid(raw)
+        self.assertTrue(Guid(memoryview(raw)) is guid)
+        self.assertTrue(Guid(LZMA_GUID) is guid)
+        self.assertTrue(Guid(guid) is guid)
+        self.assertTrue(pickle.loads(pickle.dumps(guid)) is guid)
+
+        # Hashed and compared as the raw bytes.
+        self.assertEqual(guid, raw)
+        self.assertEqual(FIRMWARE_GUIDED_GUID_NAMES[guid], "LZMA_COMPRESSED")
+        self.assertEqual(str(guid), LZMA_GUID)
+        self.assertEqual(sguid(raw), LZMA_GUID)
+        self.assertEqual(guid.array[:3], (0xee4e5898, 0x3914, 0x4259))
+        self.assertEqual(guids.get_guid_name(guid), "LZMA_CUSTOM_DECOMPRESS_GUID")
+
+        with self.assertRaises(AttributeError):
+            guid.string = "changed"
+        with self.assertRaises(ValueError):
+            Guid(b"\x00" * 15)
+
+    def test_guid_interning(self):
+        # Formatting bytes, e.g. while searching a blob, does not intern them.
+        raw = b"\x5a" * 16
+        self.assertEqual(sguid(raw), "5a5a5a5a-5a5a-5a5a-5a5a-5a5a5a5a5a5a")
+        self.assertFalse(raw in Guid._interned)
+
+        # The least recently used GUIDs are released first.
+        with mock.patch.object(Guid, "_interned", OrderedDict()), \
+                mock.patch.object(Guid, "_INTERN_LIMIT", 2):
+            first = Guid(b"\x01" * 16)
+            second = Guid(b"\x02" * 16)
+            self.assertTrue(Guid(b"\x01" * 16) is first)
+            Guid(b"\x03" * 16)
+            self.assertTrue(Guid(b"\x01" * 16) is first)
+            self.assertFalse(Guid(b"\x02" * 16) is second)
+            self.assertEqual(Guid(b"\x02" * 16), second)
+
+    def test_parsed_guids(self):
+        volume = AutoParser(sample_volume()).parse()
+        firmware_file = volume.objects[0].objects[2]
+        guided = firmware_file.objects[0].parsed_object
+        self.assertTrue(isinstance(volume.guid, Guid))
+        self.assertTrue(isinstance(firmware_file.guid, Guid))
+        self.assertEqual(guided.guid_type, "LZMA_COMPRESSED")
+        self.assertEqual(volume.to_dict()["ffs"][2]["guid"], str(firmware_file.guid))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+
+from uefi_firmware import AutoParser, index, uefi
+from uefi_firmware.utils import Guid, flatten_firmware_objects, view_offset
+
+from .test_uefi import sample_volume
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = sample_volume()
+        self.volume = AutoParser(self.data).parse()
+        self.index = self.volume.index()
+
+    def test_rows(self):
+        index = self.index
+        objects = flatten_firmware_objects(self.volume.iterate_objects())
+        self.assertEqual(index.nodes, [self.volume] + [o["_self"] for o in objects])
+        self.assertEqual(index.parent[0], -1)
+        self.assertEqual(index.end[0], len(index))
+
+        for node_id, node in enumerate(index.nodes):
+            parent = index.parent[node_id]
+            if parent >= 0:
+                self.assertTrue(node in index.nodes[parent].objects)
+                self.assertEqual(index.depth[node_id], index.depth[parent] + 1)
+            self.assertEqual(index.types[index.type[node_id]],
+                             node.__class__.__name__)
+
+        # Offsets and lengths within the input, headers included.
+        firmware_file = self.volume.objects[0].objects[1]
+        node_id = index.nodes.index(firmware_file)
+        row = index.row(node_id)
+        self.assertEqual(row["buffer"], 0)
+        self.assertEqual(row["file_type"], 0x07)
+        self.assertEqual(row["guid"], firmware_file.guid)
+        self.assertEqual(self.data[row["offset"]:row["offset"] + row["length"]],
+                         bytes(firmware_file._data))
+        self.assertEqual(bytes(index.content(node_id)), bytes(firmware_file._data))
+
+        # Decompressed content is a separate buffer.
+        compressed = firmware_file.sections[0].parsed_object
+        node_id = index.nodes.index(compressed.subsections[1])
+        self.assertTrue(index.buffers[index.buffer[node_id]] is compressed.data)
+        self.assertEqual(index.offset[node_id], 264)
+
+    def test_view_offset(self):
+        view = memoryview(self.data)
+        self.assertEqual(view_offset(view[40:80]), 40)
+        self.assertEqual(view_offset(view[40:80][8:], view[16:]), 32)
+        with self.assertRaises(ValueError):
+            view_offset(view[40:80], view[50:])
+        with self.assertRaises(ValueError):
+            view_offset(memoryview(b"\x00" * 16), self.data)
+
+    def test_select(self):
+        index = self.index
+        drivers = index.select(file_type=0x07)
+        self.assertEqual([index.nodes[i].guid for i in drivers], [
+            Guid("aaaaaaaa-0000-0000-0000-000000000001"),
+            Guid("aaaaaaaa-0000-0000-0000-000000000002"),
+            Guid("11111111-2222-3333-4444-555555555555")])
+        self.assertEqual(index.select(file_type=0x07, max_length=0x80),
+                         drivers[1:])
+        self.assertEqual(index.select(file_type=0x07, min_length=0x80),
+                         drivers[:1])
+
+        guid = "aaaaaaaa-0000-0000-0000-000000000002"
+        sections = index.select(type=uefi.FirmwareFileSystemSection, guid=guid)
+        self.assertEqual([index.section_type[i] for i in sections],
+                         [0x01, 0x10, 0x15])
+        self.assertEqual(index.select(section_type=0x15, under=drivers[1]),
+                         sections[2:])
+        self.assertEqual(index.select(type="Unknown"), [])
+
+        # Identical content has identical hashes.
+        names = index.select(section_type=0x15)
+        self.assertEqual(len(set(index.hash[i] for i in names)), 3)
+        self.assertEqual(set(self.volume.index(hashes=False).hash), set([0]))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        columns = self.index.to_numpy()
+        selected = numpy.nonzero(
+            (columns["file_type"] == 0x07) & (columns["length"] <= 0x80))[0]
+        self.assertEqual(list(selected),
+                         self.index.select(file_type=0x07, max_length=0x80))
+
+        # The vectorized and the pure-Python filters agree.
+        guid = "aaaaaaaa-0000-0000-0000-000000000002"
+        queries = [
+            {"file_type": 0x07}, {"section_type": 0x15, "under": 1},
+            {"type": "FirmwareFileSystemSection", "guid": guid},
+            {"guid": guid, "under": 3, "max_length": 0x100},
+            {"min_length": 0x20, "max_length": 0x80}]
+        selected = [self.index.select(**query) for query in queries]
+        with mock.patch.object(index, "numpy", None):
+            self.assertEqual(
+                [self.index.select(**query) for query in queries], selected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from uefi_firmware import AutoParser
+from uefi_firmware.scheduler import Scheduler
+
+from .test_uefi import sample_volume, _names
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def test_map(self):
+        with Scheduler(4) as scheduler:
+            def square(value):
+                return value * value
+            self.assertEqual(scheduler.map(square, range(100)),
+                             [value * value for value in range(100)])
+
+            # Tasks waiting for nested tasks run other tasks meanwhile.
+            def nested(value):
+                return sum(scheduler.map(square, range(value)))
+            self.assertEqual(scheduler.map(nested, range(20)),
+                             [sum(v * v for v in range(value)) for value in range(20)])
+
+            def fail(value):
+                if value == 3:
+                    raise ValueError(value)
+                return value
+            with self.assertRaises(ValueError):
+                scheduler.map(fail, range(8))
+
+        # A closed scheduler runs calls serially.
+        self.assertEqual(scheduler.map(square, [1, 2, 3]), [1, 4, 9])
+
+    def test_parse(self):
+        data = sample_volume() * 3
+        serial = AutoParser(data).parse()
+        for workers in (2, 8):
+            firmware = AutoParser(data).parse(workers=workers)
+            self.assertEqual(firmware.to_dict(), serial.to_dict())
+            self.assertEqual(_names(firmware), _names(serial))
+
+        firmware = AutoParser(data).parse(lazy=True, workers=4)
+        self.assertEqual(_names(firmware), _names(serial))
+
+
+if __name__ == '__main__':
+    unittest.main()
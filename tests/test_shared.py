@@ -0,0 +1,45 @@
+import unittest
+import multiprocessing
+
+from uefi_firmware import AutoParser
+from uefi_firmware.shared import SharedBuffer, parse_extent, release, resolve
+
+from .test_uefi import sample_volume
+
+
+class SharedTest(unittest.TestCase):
+
+    def test_parse_extent(self):
+        data = sample_volume()
+        index = AutoParser(data).parse().index()
+
+        with SharedBuffer.create(b"\xFF" * 16 + data) as image:
+            self.assertEqual(bytes(image.view[16:]), data)
+            volume = AutoParser(image.view[16:]).parse(lazy=True)
+            extent = image.extent(volume._data)
+            self.assertEqual((extent.offset, extent.length), (16, len(data)))
+
+            pool = multiprocessing.Pool(2)
+            try:
+                results = pool.map(parse_extent, [extent, extent])
+            finally:
+                pool.close()
+                pool.join()
+
+            for nodes in results:
+                self.assertEqual(len(nodes), len(index))
+                names = [node.name for node in nodes
+                         if node.type == "FirmwareFileSystemSection" and node.name]
+                self.assertEqual(names, ["DriverA", "DriverB", "Nested"])
+                for node_id, node in enumerate(nodes):
+                    self.assertEqual(node.parent, index.parent[node_id])
+                    self.assertEqual(bytes(resolve(node.extent)),
+                                     bytes(index.content(node_id)))
+                # Files are described in place, decompressed content is not.
+                self.assertEqual(nodes[2].extent.name, image.name)
+                self.assertNotEqual(nodes[7].extent.name, image.name)
+                release(nodes, keep=[image])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import struct
+
+from uefi_firmware import efi_compressor
+from uefi_firmware import sniffer
+from uefi_firmware import uefi
+
+
+ALGORITHMS = [
+    efi_compressor.LzmaDecompress,
+    efi_compressor.TianoDecompress,
+    efi_compressor.EfiDecompress,
+]
+
+
+class SnifferTest(unittest.TestCase):
+
+    def setUp(self):
+        sniffer.reset_counters()
+        self.content = b"\x00\x01\x02\x03" * 256 + b"firmware" * 64
+
+    def test_efi(self):
+        data = efi_compressor.EfiCompress(self.content, len(self.content))
+        # LZMA cannot decode the stream, EFI and Tiano keep their order.
+        self.assertEqual(sniffer.candidates(ALGORITHMS, data), [1, 2])
+        self.assertEqual(sniffer.counters, {"sniffed": 3, "avoided": 1})
+
+    def test_lzma(self):
+        data = efi_compressor.LzmaCompress(self.content, len(self.content))
+        self.assertEqual(sniffer.candidates(ALGORITHMS, data), [0])
+
+    def test_size(self):
+        data = efi_compressor.TianoCompress(self.content, len(self.content))
+        self.assertEqual(
+            sniffer.candidates(ALGORITHMS, data, len(self.content)), [1, 2])
+        self.assertEqual(
+            sniffer.candidates(ALGORITHMS[::-1], data, len(self.content)), [0, 1])
+
+    def test_invalid_table(self):
+        data = bytearray(
+            efi_compressor.EfiCompress(self.content, len(self.content)))
+        # Declare more code lengths than the extra set table holds.
+        data[10] = 0xFF
+        data[11] = 0xFF
+        self.assertEqual(sniffer.efi_plausible(bytes(data)), 0)
+        for algorithm in ALGORITHMS[1:]:
+            with self.assertRaises(Exception):
+                algorithm(bytes(data), len(data))
+
+    def test_parse(self):
+        # A customized (type 0x02) compressed section holding LZMA content.
+        compressed = efi_compressor.LzmaCompress(self.content, len(self.content))
+        section = uefi.CompressedSection(
+            struct.pack("<IB", len(self.content), 2) + compressed, None)
+        self.assertTrue(section.process())
+        self.assertEqual(section.subtype, 1)
+        self.assertEqual(section.data, self.content)
+        self.assertEqual(sniffer.counters, {"sniffed": 3, "avoided": 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import shutil
+import tempfile
+import threading
+
+from uefi_firmware import AutoParser, cache
+from uefi_firmware.utils import blue, colors
+
+from .test_uefi import sample_volume, _names
+
+
+def _run_threads(function, count):
+    results = [None] * count
+    errors = []
+
+    def run(index):
+        try:
+            results[index] = function(index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class ThreadsTest(unittest.TestCase):
+
+    def test_concurrent_parse(self):
+        data = sample_volume() * 2
+        serial = AutoParser(data).parse()
+
+        def parse(index):
+            firmware = AutoParser(data).parse(workers=1 + index % 3)
+            return (firmware.to_dict(), _names(firmware))
+        for result in _run_threads(parse, 8):
+            self.assertEqual(result, (serial.to_dict(), _names(serial)))
+
+    def test_colors(self):
+        def label(index):
+            with colors(index % 2 == 0):
+                return blue("label")
+        results = _run_threads(label, 8)
+        for index, result in enumerate(results):
+            self.assertEqual(result == "label", index % 2 == 1)
+
+    def test_cache(self):
+        paths = [tempfile.mkdtemp() for _ in range(2)]
+        try:
+            caches = [cache.DecompressionCache(path) for path in paths]
+
+            def parse(index):
+                with cache.use(caches[index]):
+                    for _ in range(2):
+                        AutoParser(sample_volume()).parse(workers=2)
+            _run_threads(parse, 2)
+            self.assertEqual(cache.active, None)
+            for each in caches:
+                # The second parse decodes from this thread's cache only.
+                self.assertEqual(each.misses, each.hits)
+                self.assertGreater(each.hits, 0)
+        finally:
+            for path in paths:
+                shutil.rmtree(path)
@@ -0,0 +1,367 @@
+import unittest
+import contextlib
+import io
+import mmap
+import os
+import struct
+import tempfile
+import uuid
+
+from uefi_firmware import AutoParser, efi_compressor
+from uefi_firmware import uefi
+from uefi_firmware import base
+from uefi_firmware import utils
+
+
+FFS2_GUID = "8c8ce578-8a3d-4f1c-9935-896185c32dd3"
+LZMA_GUID = "ee4e5898-3914-4259-9d6e-dc7bd79403cf"
+
+
+def _guid(guid):
+    return uuid.UUID(guid).bytes_le
+
+
+def _section(section_type, body):
+    return struct.pack("<I", 4 + len(body))[:3] + \
+        struct.pack("<B", section_type) + body
+
+
+def _sections(*sections):
+    data = b""
+    for section in sections:
+        data += section + b"\x00" * (((len(section) + 3) & ~3) - len(section))
+    return data
+
+
+def _ui(name):
+    return _section(0x15, name.encode("utf-16le") + b"\x00\x00")
+
+
+def _pe(payload):
+    return _section(0x10, b"MZ" + payload)
+
+
+def _compressed(data):
+    compressed = efi_compressor.EfiCompress(data, len(data))
+    return _section(0x01, struct.pack("<IB", len(data), 1) + compressed)
+
+
+def _lzma_guided(data):
+    compressed = efi_compressor.LzmaCompress(data, len(data))
+    return _section(
+        0x02, _guid(LZMA_GUID) + struct.pack("<HH", 0x18, 1) + compressed)
+
+
+def _file(guid, file_type, body):
+    size = struct.pack("<I", 24 + len(body))
+    return _guid(guid) + struct.pack("<HBB", 0xAA55, file_type, 0) + \
+        size[:3] + b"\xF8" + body
+
+
+def _volume(*files, **kwargs):
+    block_size = kwargs.get("block_size", 0x1000)
+    body = b""
+    for firmware_file in files:
+        body += firmware_file + \
+            b"\xFF" * (((len(firmware_file) + 7) & ~7) - len(firmware_file))
+    size = (0x48 + len(body) + block_size - 1) // block_size * block_size
+    header = b"\x00" * 16 + _guid(FFS2_GUID) + struct.pack("<Q", size) + \
+        b"_FVH" + struct.pack("<IHHHBB", 0x0004FEFF, 0x48, 0, 0, 0, 2) + \
+        struct.pack("<II", size // block_size, block_size) + b"\x00" * 8
+    checksum = (0x10000 - sum(struct.unpack("<36H", header))) & 0xFFFF
+    header = header[:0x32] + struct.pack("<H", checksum) + header[0x34:]
+    return (header + body).ljust(size, b"\xFF")
+
+
+def sample_volume():
+    '''A volume with plain, compressed, and nested (LZMA) volume files.'''
+    nested = _volume(
+        _file("11111111-2222-3333-4444-555555555555", 0x07,
+              _sections(_pe(b"N" * 64), _ui("Nested"))),
+        block_size=0x200)
+    return _volume(
+        _file("aaaaaaaa-0000-0000-0000-000000000001", 0x07,
+              _sections(_pe(b"A" * 128), _ui("DriverA"))),
+        _file("aaaaaaaa-0000-0000-0000-000000000002", 0x07,
+              _sections(_compressed(_sections(_pe(b"B" * 256), _ui("DriverB"))))),
+        _file("aaaaaaaa-0000-0000-0000-000000000003", 0x0B,
+              _sections(_lzma_guided(_sections(_section(0x17, nested))))),
+    )
+
+
+def _names(firmware_object):
+    names = []
+    for _object in firmware_object.objects:
+        if _object is None:
+            continue
+        if getattr(_object, "name", None) and \
+                isinstance(_object, uefi.FirmwareFileSystemSection):
+            names.append(_object.name)
+        names += _names(_object)
+    return names
+
+
+class UefiParsingTest(unittest.TestCase):
+
+    def test_parse_volume(self):
+        data = sample_volume()
+        parser = AutoParser(data)
+        self.assertEqual(parser.type(), "UEFIFirmwareVolume")
+
+        volume = parser.parse()
+        self.assertTrue(isinstance(volume, uefi.FirmwareVolume))
+        self.assertEqual(volume.size, len(data))
+        self.assertEqual(len(volume.objects[0].objects), 3)
+        self.assertEqual(_names(volume), ["DriverA", "DriverB", "Nested"])
+
+    def test_shared_view(self):
+        data = sample_volume()
+        volume = AutoParser(data).parse()
+        firmware_file = volume.objects[0].objects[0]
+        section = firmware_file.sections[0]
+
+        # Parsed objects reference the input without copying it.
+        self.assertTrue(firmware_file.view.obj is data)
+        self.assertTrue(section.view.obj is data)
+
+        # Content is still available as bytes.
+        self.assertTrue(isinstance(section.data, bytes))
+        self.assertEqual(section.data, b"MZ" + b"A" * 128)
+        self.assertEqual(volume.content, data[0x48:])
+
+    def test_decompressed_view(self):
+        volume = AutoParser(sample_volume()).parse()
+        compressed = volume.objects[0].objects[1].sections[0].parsed_object
+        self.assertEqual(compressed.subtype, 1)
+        self.assertTrue(isinstance(compressed.data, bytes))
+        self.assertTrue(compressed.subsections[0].view.obj is compressed.data)
+
+    def test_lazy_parse(self):
+        volume = AutoParser(sample_volume()).parse(lazy=True)
+        filesystem = volume.firmware_filesystems[0]
+        self.assertFalse(filesystem.expanded)
+        self.assertEqual(filesystem.files, [])
+
+        # Children are processed on first access and kept.
+        firmware_files = filesystem.objects
+        self.assertEqual(len(firmware_files), 3)
+        self.assertTrue(filesystem.objects[0] is firmware_files[0])
+        self.assertFalse(firmware_files[1].expanded)
+        self.assertEqual(firmware_files[1].sections, [])
+
+        self.assertEqual(_names(volume), ["DriverA", "DriverB", "Nested"])
+        self.assertTrue(firmware_files[1].expanded)
+        self.assertEqual(
+            volume.to_dict(), AutoParser(sample_volume()).parse().to_dict())
+
+    def test_deferred_decompression(self):
+        volume = AutoParser(sample_volume()).parse(lazy=True)
+        firmware_files = volume.objects[0].objects
+        compressed = firmware_files[1].objects[0].parsed_object
+        guided = firmware_files[2].objects[0].parsed_object
+        self.assertFalse(compressed.decompressed)
+        self.assertEqual(compressed.compressed_size, len(compressed.compressed_data))
+
+        # Decompression happens on first access to the subsections.
+        self.assertEqual(len(compressed.objects), 2)
+        self.assertTrue(compressed.decompressed)
+        self.assertEqual(compressed.subtype, 1)
+
+        # Or when requested.
+        self.assertFalse(guided.decompressed)
+        self.assertTrue(guided.materialize())
+        self.assertTrue(guided.decompressed)
+        self.assertEqual(len(guided.subsections), 1)
+        self.assertEqual(_names(guided), ["Nested"])
+
+    def test_peek(self):
+        volume = AutoParser(sample_volume()).parse(lazy=True)
+        guided = volume.objects[0].objects[2].objects[0].parsed_object
+        content = guided.peek(0x20)
+        self.assertEqual(len(content), 0x20)
+        self.assertFalse(guided.decompressed)
+
+        # The start of the decoded content, a volume image section.
+        guided.materialize()
+        self.assertEqual(content, guided.data[:0x20])
+        self.assertEqual(content[3:4], b"\x17")
+
+        data = b"".join(uefi.lzma_chunks(guided.body, chunk_size=0x10))
+        self.assertEqual(data, guided.data)
+
+    def test_mapped_file(self):
+        data = b"\xFF" * 2048 + sample_volume()
+        with tempfile.NamedTemporaryFile(delete=False) as fh:
+            fh.write(data)
+        try:
+            parser = AutoParser(fh.name, use_mmap=True)
+            self.assertTrue(isinstance(parser.view.obj, mmap.mmap))
+            self.assertEqual(parser.offset, 2048)
+            self.assertEqual(parser.type(), "UEFIFirmwareVolume")
+
+            # Leading padding is kept as a view rather than rebuilt.
+            padding, volume = parser.parse().objects
+            self.assertTrue(isinstance(padding, base.RawObject))
+            self.assertEqual(padding.data, b"\xFF" * 2048)
+            self.assertEqual(_names(volume), ["DriverA", "DriverB", "Nested"])
+        finally:
+            os.unlink(fh.name)
+
+    def test_compact_objects(self):
+        volume = AutoParser(sample_volume()).parse()
+        firmware_file = volume.objects[0].objects[0]
+        section = firmware_file.sections[1]
+        for _object in (firmware_file, section):
+            self.assertFalse(hasattr(_object, "__dict__"))
+
+        # One view per object, the content follows the header.
+        self.assertEqual(len(firmware_file._data), firmware_file.size)
+        self.assertEqual(firmware_file.data, firmware_file._data[24:])
+        self.assertEqual(section.data, section._data[4:])
+        self.assertEqual(section.attrs, {
+            "type": 0x15, "size": section.size,
+            "type_name": "User interface name"})
+        self.assertEqual(firmware_file.attrs["state"], 0x07)
+
+        # Class defaults are not shared, mutable lists.
+        self.assertEqual(uefi.EfiSection.subsections, ())
+        self.assertEqual(uefi.FirmwareVariableStore.variables, ())
+
+        body = _guid(LZMA_GUID) + b"Setup\x00" + b"\x01\x02"
+        variable = b"NVAR" + struct.pack("<H", 10 + len(body)) + \
+            b"\xFF\xFF\xFF\x86" + body
+        data = _volume(_file("cef5b9a3-476d-497f-9fdc-e98143e0422c", 0x01,
+                             variable * 2))
+        store = AutoParser(data).parse().objects[0].objects[0].objects[0]
+        nvar = store.variables[1]
+        self.assertFalse(hasattr(nvar, "__dict__"))
+        self.assertEqual(nvar.to_dict(), {
+            "guid": LZMA_GUID, "name": "Setup", "attributes": 0x86})
+        self.assertEqual(nvar.structure.TotalSize, len(variable))
+        self.assertEqual(nvar.build(), variable)
+
+    def test_undecompressible_section(self):
+        # A section that cannot be decompressed keeps the compressed data.
+        data = _volume(_file("aaaaaaaa-0000-0000-0000-000000000004", 0x07,
+                             _section(0x01, struct.pack("<IB", 16, 1) +
+                                      b"\x00" * 16)))
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            volume = AutoParser(data).parse()
+        section = volume.objects[0].objects[0].sections[0].parsed_object
+        self.assertEqual(len(section.subsections), 1)
+        self.assertTrue(
+            isinstance(section.subsections[0], base.AutoRawObject))
+        # The class default is not modified.
+        self.assertEqual(uefi.EfiSection.subsections, ())
+
+    def test_walk(self):
+        volume = AutoParser(sample_volume()).parse()
+        nodes = list(base.walk(volume))
+        objects = utils.flatten_firmware_objects(volume.iterate_objects())
+        self.assertEqual([node for node, _, _, _ in nodes],
+                         [volume] + [o["_self"] for o in objects])
+        self.assertEqual(nodes[0], (volume, None, 0, ()))
+        for node, parent, depth, path in nodes[1:]:
+            self.assertEqual(len(path), depth)
+            self.assertTrue(parent.objects[path[-1]] is node)
+
+        depths = [depth for _, _, depth, _ in base.walk(volume, order="bfs")]
+        self.assertEqual(depths, sorted(depths))
+        self.assertEqual(len(depths), len(nodes))
+
+        names = [node.name for node, _, _, _ in base.walk(
+            volume, where=lambda node: getattr(node, "type", None) == 0x15 and
+            isinstance(node, uefi.FirmwareFileSystemSection))]
+        self.assertEqual(names, ["DriverA", "DriverB", "Nested"])
+
+        # Pruned subtrees are not processed.
+        volume = AutoParser(sample_volume()).parse(lazy=True)
+        encapsulated = (uefi.CompressedSection, uefi.GuidDefinedSection)
+        nodes = [node for node, _, _, _ in base.walk(
+            volume, prune=lambda node: isinstance(node, encapsulated))]
+        sections = [node for node in nodes if isinstance(node, encapsulated)]
+        self.assertEqual(len(sections), 2)
+        self.assertFalse(any(section.decompressed for section in sections))
+
+        with self.assertRaises(ValueError):
+            list(base.walk(volume, order="random"))
+
+    def test_find_first(self):
+        volume = AutoParser(sample_volume()).parse(lazy=True)
+        firmware_files = volume.objects[0].objects
+        compressed = firmware_files[1].objects[0].parsed_object
+        guided = firmware_files[2].objects[0].parsed_object
+
+        # The search stops at the match, later siblings are not decompressed.
+        match = uefi.find_first(volume, guid="aaaaaaaa-0000-0000-0000-000000000001")
+        self.assertTrue(match is firmware_files[0])
+        self.assertFalse(compressed.decompressed)
+        self.assertFalse(guided.decompressed)
+
+        # A section name matches its file, which is fully processed.
+        match = uefi.find_first(volume, name="DriverB")
+        self.assertTrue(match is firmware_files[1])
+        self.assertTrue(compressed.decompressed)
+        self.assertFalse(guided.decompressed)
+
+        match = uefi.find_first(volume, name="Nested")
+        self.assertEqual(match.guid, _guid("11111111-2222-3333-4444-555555555555"))
+        self.assertTrue(guided.decompressed)
+        self.assertEqual(uefi.find_first(volume, name="Missing"), None)
+        with self.assertRaises(ValueError):
+            uefi.find_first(volume)
+
+    def test_depth_limit(self):
+        for options in ({"max_depth": 3}, {"headers_only": True}):
+            volume = AutoParser(sample_volume()).parse(**options)
+            firmware_files = volume.objects[0].objects
+            compressed = firmware_files[1].objects[0].parsed_object
+            guided = firmware_files[2].objects[0].parsed_object
+
+            # Sections are kept with their types and sizes, and names.
+            self.assertEqual(_names(volume), ["DriverA"])
+            self.assertEqual(firmware_files[1].objects[0].attrs["type"], 0x01)
+            self.assertEqual(compressed.decompressed_size, 0x11C)
+
+            # Content beyond the limit is never processed.
+            volume.to_dict()
+            with contextlib.redirect_stdout(io.StringIO()):
+                volume.showinfo()
+            self.assertTrue(compressed.limited)
+            self.assertFalse(compressed.expanded)
+            self.assertFalse(compressed.decompressed)
+            self.assertFalse(guided.decompressed)
+            self.assertEqual(list(compressed.objects), [])
+
+        volume = AutoParser(sample_volume()).parse(lazy=True, max_depth=5)
+        self.assertEqual(_names(volume), ["DriverA", "DriverB"])
+        nested = volume.objects[0].objects[2].objects[0].parsed_object \
+            .objects[0].parsed_object
+        self.assertTrue(isinstance(nested, uefi.FirmwareVolume))
+        self.assertFalse(nested.expanded)
+
+    def test_search_volumes(self):
+        volume = sample_volume()
+        bad_checksum = volume[:0x32] + b"\x00\x00" + volume[0x34:]
+        bad_guid = volume[:0x10] + b"\x00" * 16 + volume[0x20:]
+        data = b"\x00" * 0x3E + b"_FVH" + b"\x00" * 0x1BE + \
+            volume + bad_checksum + bad_guid + volume
+        offsets = [0x200, 0x200 + len(volume) * 3]
+
+        magics = [offset + 40 for offset in range(0x200, len(data), len(volume))]
+        self.assertEqual(utils.search_firmware_volumes(data), magics)
+        self.assertEqual(utils.search_firmware_volumes(
+            memoryview(data), validate=True), [offset + 40 for offset in offsets])
+        self.assertEqual(utils.search_firmware_volumes(
+            data, limit=1, validate=True), [0x200 + 40])
+
+        self.assertTrue(utils.valid_volume_header(data, 0x200))
+        self.assertFalse(utils.valid_volume_header(data, 0x200 + len(volume)))
+        self.assertTrue(utils.valid_volume_header(
+            data, 0x200 + len(volume), checksum=False))
+        self.assertFalse(utils.valid_volume_header(data[:0x230], 0x200))
+
+
+if __name__ == '__main__':
+    unittest.main()
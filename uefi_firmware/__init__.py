@@ -3,10 +3,12 @@
 import os
 
 from . import uefi
+from .uefi import find_first
 
 from .misc import checker
-from .base import FirmwareObject, RawObject, AutoRawObject
-from .utils import search_firmware_volumes
+from .base import FirmwareObject, RawObject, AutoRawObject, walk
+from .scheduler import Scheduler
+from .utils import search_firmware_volumes, memview, as_bytes, read_file
 
 
 class AutoParser(object):
@@ -24,31 +26,38 @@ class AutoParser(object):
     the type by applying basic checks for known headers.
     '''
 
-    def __init__(self, data, search=True):
+    def __init__(self, data, search=True, use_mmap=None):
         '''Create an AutoParser instance.
 
         Args:
-            data (binary): The entire input file contents.
+            data (binary): The entire input file contents, as bytes, an mmap,
+                or a path to the input file.
             search (Optional[bool]): Allow brute-force discovery of volumes.
+            use_mmap (Optional[bool]): When data is a path, memory-map the
+                file (see utils.read_file).
         '''
         self.data_type = 'unknown'
         self.constructor = None
         self.firmware = None
         self.offset = 0
 
+        if isinstance(data, (str, os.PathLike)):
+            data = read_file(data, use_mmap)
+
+        # Parsers share zero-copy views of the input.
+        data = memview(data)
         if search:
             self.offset = 0
             while data[self.offset:self.offset + 1024] == b'\xFF' * 1024:
                 self.offset += 1024
-            if self.offset > 0:
-                data = data[self.offset:]
-        self.data = data
+        self.padding = data[:self.offset]
+        data = data[self.offset:]
+        self.view = data
 
-        header = data[:200]
-        for tester in checker.TESTERS:
-            if tester().match(header):
-                self.data_type = tester().name
-                self.constructor = tester().parser
+        tester = checker.detect(data)
+        if tester is not None:
+            self.data_type = tester.name
+            self.constructor = tester.parser
 
     def type(self):
         '''Return the discovered file format type.
@@ -60,11 +69,41 @@ class AutoParser(object):
         '''
         return self.data_type
 
-    def parse(self):
+    @property
+    def data(self):
+        '''The input content (after leading padding) as bytes.'''
+        return as_bytes(self.view)
+
+    def parse(self, lazy=False, max_depth=None, headers_only=False,
+              workers=None):
         '''Call the 'process' method for the discovered type using the input
         file contents. If the file type's parser returns False indicating a
         failure or exception while parsing this will return None.
 
+        Parsing is reentrant: parse keeps its state in the parsed objects,
+        so separate AutoParser instances, even of the same input, may parse
+        concurrently from any number of threads. A single parser, or a lazily
+        parsed tree, should be used by one thread at a time.
+
+        Args:
+            lazy (Optional[bool]): Only process the top-level objects, nested
+                objects are processed and kept when they are first accessed
+                through 'objects', 'showinfo', 'to_dict', 'dump', or
+                'iterate_objects'. Failures within nested objects are then
+                not reported by parse.
+            max_depth (Optional[int]): Only process objects up to this many
+                levels below the top-level objects, deeper objects are kept
+                with the values read from their headers but never processed
+                or decompressed (see FirmwareObject.process_child).
+            headers_only (Optional[bool]): Process volumes, files, and
+                sections, including user interface and version names, but not
+                the content of sections: compressed, GUID-defined, and nested
+                volume sections are kept unprocessed.
+            workers (Optional[int]): Process independent subtrees, such as
+                volumes and files, on this many threads (see
+                uefi_firmware.scheduler). A Scheduler may be given instead, to
+                share its threads.
+
         Return:
             object: The associated file object upon success, otherwise None.
         '''
@@ -73,9 +112,27 @@ class AutoParser(object):
         if self.firmware is not None:
             return self.firmware
 
+        scheduler = workers
+        owned = isinstance(workers, int)
+        if owned:
+            scheduler = Scheduler(workers) if workers > 1 else None
+        try:
+            return self._parse(lazy, max_depth, headers_only, scheduler)
+        finally:
+            if owned and scheduler is not None:
+                # Objects processed later (lazily) are processed serially.
+                scheduler.close()
+
+    def _parse(self, lazy, max_depth, headers_only, scheduler):
         # Instantiate an instance of the firmware object
-        self.firmware = self.constructor(self.data)
-        if not self.firmware.process():
+        self.firmware = self.constructor(self.view)
+        self.firmware.lazy = lazy
+        self.firmware.max_depth = max_depth
+        self.firmware.headers_only = headers_only
+        self.firmware.scheduler = scheduler
+        if self.firmware.limited:
+            self.firmware.expanded = False
+        elif not self.firmware.process():
             # Parsing failed, remove the object reference.
             self.firmware = None
             return None
@@ -83,15 +140,25 @@ class AutoParser(object):
         objs = [self.firmware]
         size = self.firmware.size
 
-        while size < len(self.data):
-            raw = AutoRawObject(self.data[size:])
+        while size < len(self.view):
+            raw = AutoRawObject(self.view[size:])
+            raw.lazy = lazy
+            raw.max_depth = max_depth
+            raw.headers_only = headers_only
+            raw.scheduler = scheduler
             if raw.process():
                 size += raw.object.size
                 objs.append(raw.object)
             else:
                 break
 
-        mfc = MultiVolumeContainer(self.data[size:])
+        mfc = MultiVolumeContainer(self.view[size:])
+        mfc.lazy = lazy
+        if max_depth is not None:
+            # The volumes take the place of the container.
+            mfc.max_depth = max_depth + 1
+        mfc.headers_only = headers_only
+        mfc.scheduler = scheduler
         if mfc.has_indexes():
             # Headers were discovered, attempt to process.
             if mfc.process():
@@ -99,11 +166,11 @@ class AutoParser(object):
                 # Add the base (first) firmware volume
                 objs = objs + mfc.volumes
 
-        if size < len(self.data):
-            objs.append(RawObject(self.data[size:]))
+        if size < len(self.view):
+            objs.append(RawObject(self.view[size:]))
 
         if self.offset > 0:
-            objs = [RawObject('\xFF' * self.offset)] + objs
+            objs = [RawObject(self.padding)] + objs
 
         if len(objs) == 1:
             return objs[0]
@@ -164,7 +231,7 @@ class MultiVolumeContainer(FirmwareObject):
     def __init__(self, data):
         '''Initialize the container with the tail content from a volume.'''
         self.data = data
-        self.indexes = search_firmware_volumes(data)
+        self.indexes = search_firmware_volumes(data, validate=True)
         self.volumes = []
         self.size = 0
 
@@ -177,9 +244,11 @@ class MultiVolumeContainer(FirmwareObject):
         self.volumes = [volume] + self.volumes
 
     def process(self):
-        for index in self.indexes:
-            volume = uefi.FirmwareVolume(self.data[index - 40:], index)
-            if volume.process():
+        volumes = [uefi.FirmwareVolume(self.view[index - 40:], index)
+                   for index in self.indexes]
+        statuses = self.process_children(volumes, defer=False)
+        for volume, status in zip(volumes, statuses):
+            if status:
                 self.size += volume.size
                 self.volumes.append(volume)
         valid = len(self.volumes) > 0
@@ -0,0 +1,117 @@
+'''Parse and extract images from asyncio code without blocking the loop.
+
+Parsing, decompression, and writing files run on a thread pool executor,
+by default the loop's. The coroutines may be cancelled: the work running on
+the executor stops before its next object, or its next file, and the
+coroutine raises asyncio.CancelledError once the executor is released.
+
+A lazily parsed image is expanded as it is walked, so objects can be used,
+e.g. streamed to a client, while deeper content is still decompressed:
+
+  firmware = await parse_async(path, lazy=True)
+  async for node, parent, depth, path in walk_async(firmware):
+      ...
+
+Colors and the decompression cache chosen by the calling task (see
+utils.colors and cache.use) apply to the work on the executor.
+'''
+
+import asyncio
+import contextvars
+import functools
+import threading
+
+from . import AutoParser
+from .base import walk_steps
+from .utils import run_cancellable
+
+
+async def call_async(function, *args, executor=None, **kwargs):
+    '''Call a blocking function on an executor, see the module notes.
+
+    Args:
+        function (callable): The function, e.g. an object's to_dict.
+        executor (Optional[concurrent.futures.Executor]): A thread pool,
+            by default the running loop's default executor.
+
+    Return:
+        object: The function's result.
+    '''
+    loop = asyncio.get_running_loop()
+    event = threading.Event()
+    context = contextvars.copy_context()
+    future = loop.run_in_executor(executor, functools.partial(
+        context.run, run_cancellable, event, function, *args, **kwargs))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Stop the function, and wait until it no longer uses the executor.
+        event.set()
+        await asyncio.wait([future])
+        if not future.cancelled():
+            # Retrieve the Cancelled error, or the result of a function that
+            # did not stop.
+            future.exception()
+        raise
+
+
+def _parse(data, search, parse_options):
+    parser = AutoParser(data, search=search)
+    return parser.parse(**parse_options)
+
+
+async def parse_async(data, executor=None, search=True, **parse_options):
+    '''Parse an image on an executor.
+
+    Args:
+        data (binary): The input, or a path to the input file, see AutoParser.
+        executor (Optional[concurrent.futures.Executor]): See call_async.
+        search (Optional[bool]): Allow brute-force discovery of volumes.
+        parse_options: Arguments of AutoParser.parse, e.g. lazy.
+
+    Return:
+        object: The parsed object, or None if the input could not be parsed.
+    '''
+    return await call_async(
+        _parse, data, search, parse_options, executor=executor)
+
+
+def _objects(node):
+    return list(node.objects)
+
+
+async def walk_async(root, executor=None, order="dfs", where=None,
+                     prune=None):
+    '''Walk a tree of firmware objects, see base.walk.
+
+    Objects whose processing was deferred (see AutoParser.parse's lazy) are
+    expanded on the executor, before their children are walked.
+
+    Yields:
+        tuple: (object, parent, depth, path), see base.walk.
+    '''
+    steps = walk_steps(root, order, where, prune)
+    objects = None
+    while True:
+        try:
+            step, value = steps.send(objects)
+        except StopIteration:
+            return
+        objects = None
+        if step == "item":
+            yield value
+        elif getattr(value, "expanded", True) or value.limited:
+            objects = value.objects
+        else:
+            objects = await call_async(_objects, value, executor=executor)
+
+
+async def dump_async(firmware_object, parent='', executor=None):
+    '''Write an object, and its descendants, to files on an executor.
+
+    Args:
+        firmware_object (FirmwareObject): The object to dump.
+        parent (Optional[string]): The output folder, see the object's dump.
+        executor (Optional[concurrent.futures.Executor]): See call_async.
+    '''
+    await call_async(firmware_object.dump, parent, executor=executor)
@@ -4,22 +4,149 @@
 
 import os
 import ctypes
+import functools
 
-from .utils import dump_data, sguid, blue, utf8_decode_safe
+from collections import deque
+
+from .utils import (
+    dump_data, sguid, blue, utf8_decode_safe, memview, as_bytes,
+    check_cancelled)
+
+
+def expands(method):
+    '''Decorate a method that reads an object's children.
+
+    The object is expanded (see FirmwareObject.expand) before the method runs.
+    '''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.expand()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def walk_steps(root, order="dfs", where=None, prune=None):
+    '''The traversal of walk, leaving the listing of children to the caller.
+
+    Yields:
+        tuple: ("item", item) for each item walk yields, and ("list", object)
+            before the children of an object are walked. The caller sends
+            back the object's objects, e.g. listed on another thread (see
+            aio.walk_async).
+    '''
+    if order not in ("dfs", "bfs"):
+        raise ValueError("Unknown walk order: %s" % order)
+    pending = deque([(root, None, 0, ())])
+    pop = pending.pop if order == "dfs" else pending.popleft
+    while pending:
+        item = pop()
+        node, _, depth, path = item
+        if where is None or where(node):
+            yield "item", item
+        if prune is not None and prune(node):
+            continue
+        objects = yield "list", node
+        children = [
+            (child, node, depth + 1, path + (i,))
+            for i, child in enumerate(objects) if child is not None]
+        if order == "dfs":
+            children.reverse()
+        pending.extend(children)
+
+
+def walk(root, order="dfs", where=None, prune=None):
+    '''Walk a tree of firmware objects.
+
+    The root is visited first, then its descendants depth-first in pre-order
+    ("dfs", the order of iterate_objects) or breadth-first ("bfs"). No record
+    is built for the visited objects and children are only accessed as the
+    walk reaches them, so a walk that stops early does not process the rest
+    of a lazily parsed tree.
+
+    Args:
+        root (FirmwareObject): The object to walk from.
+        order (Optional[str]): Either "dfs" or "bfs".
+        where (Optional[callable]): Only yield the objects for which
+            where(object) is true, the children of the others are still walked.
+        prune (Optional[callable]): Do not walk the children of the objects
+            for which prune(object) is true, e.g. compressed sections.
+
+    Yields:
+        tuple: (object, parent, depth, path), the root has no parent, a depth
+            of 0, and an empty path. The path is the tuple of the positions
+            of the object and its ancestors within their parents' objects.
+    '''
+    steps = walk_steps(root, order, where, prune)
+    objects = None
+    while True:
+        try:
+            step, value = steps.send(objects)
+        except StopIteration:
+            return
+        objects = None
+        if step == "list":
+            objects = value.objects
+        else:
+            yield value
+
+
+def read_structure(data, structure):
+    '''Return an instance of a ctypes structure read from the start of data.
+
+    Fields beyond the end of a short input are zero.
+    '''
+    struct_instance = structure()
+    struct_data = as_bytes(data[:ctypes.sizeof(struct_instance)])
+    ctypes.memmove(
+        ctypes.addressof(struct_instance), struct_data, len(struct_data))
+    return struct_instance
 
 
 class BaseObject(object):
     '''A base object can be used to access direct content.'''
 
+    __slots__ = ()
+
 
 class FirmwareObject(object):
     '''A pseudo-abstract type providing common firmware member facilities.'''
+
+    __slots__ = ()
+
+    view = None
+    '''memoryview: Zero-copy view of the object's content within the input.'''
+
+    lazy = False
+    '''bool: Defer processing children until they are accessed.'''
+
+    expanded = True
+    '''bool: False while this object's processing is deferred.'''
+
+    max_depth = None
+    '''int: Levels of descendants to process, None for no limit.'''
+
+    headers_only = False
+    '''bool: Do not process the content of sections, see process_child.'''
+
+    scheduler = None
+    '''scheduler.Scheduler: Processes children in parallel, see
+    process_children.'''
+
     def __init__(self):
         self.data = None
         self._name = None
         self.attrs = None
         self.guid = None
 
+    @property
+    def data(self):
+        '''The object's content as bytes, copied out of 'view' on access.'''
+        return as_bytes(self.view)
+
+    @data.setter
+    def data(self, data):
+        self.view = memview(data)
+
     @property
     def name(self):
         return self._name
@@ -30,10 +157,83 @@ class FirmwareObject(object):
             name = utf8_decode_safe(name)
         self._name = name
 
+    @property
+    def limited(self):
+        '''bool: This object is below the depth limit and is not processed.'''
+        return self.max_depth is not None and self.max_depth < 0
+
+    def process_child(self, child, defer=True):
+        '''Process a child object, the child inherits this object's laziness.
+
+        When lazy, and the child may be deferred, the child is processed on
+        first access to its children instead. A deferred child cannot report
+        a failure and is assumed to succeed.
+
+        The child also inherits the depth limit, one level less. A child
+        beyond the limit keeps the values read from its header, its type and
+        size, but is never processed: it stays unexpanded and its content,
+        including compressed content, is not parsed.
+
+        A cancelled parse (see uefi_firmware.aio) stops before the next child,
+        raising utils.Cancelled.
+
+        Args:
+            child (FirmwareObject): The child to process.
+            defer (Optional[bool]): Allow the child's processing to be deferred.
+
+        Return:
+            bool: The child's process status.
+        '''
+        check_cancelled()
+        child.lazy = self.lazy
+        if self.headers_only:
+            child.headers_only = True
+        if self.scheduler is not None:
+            child.scheduler = self.scheduler
+        if self.max_depth is not None:
+            child.max_depth = self.max_depth - 1
+            if child.max_depth < 0:
+                child.expanded = False
+                return True
+        if self.lazy and defer:
+            child.expanded = False
+            return True
+        return child.process()
+
+    def process_children(self, children, defer=True):
+        '''Process independent children, see process_child.
+
+        With a scheduler, each child is processed by a task of the scheduler's
+        pool, in parallel with its siblings. The statuses are returned in the
+        order of the children either way.
+
+        Args:
+            children (list): The children to process.
+            defer (Optional[bool]): Allow the children's processing to be
+                deferred.
+
+        Return:
+            list: The process status of each child.
+        '''
+        if self.scheduler is None or (self.lazy and defer):
+            return [self.process_child(child, defer) for child in children]
+        return self.scheduler.map(
+            lambda child: self.process_child(child, defer), children)
+
+    def expand(self):
+        '''Process this object if its processing was deferred.
+
+        The result is kept, subsequent calls do nothing. Objects beyond a depth
+        limit are not processed.
+        '''
+        if not self.expanded and not self.limited:
+            self.expanded = True
+            self.process()
+
     @property
     def content(self):
         '''The object content is the 'data' stream.'''
-        if hasattr(self, "data") and self.data is not None:
+        if self.view is not None:
             return self.data
         return ""
 
@@ -118,20 +318,31 @@ class FirmwareObject(object):
             objects.append(_info)
         return objects
 
+    def index(self, hashes=True):
+        '''Return a columnar table of this object and its descendants.
+
+        Args:
+            hashes (Optional[bool]): Hash each object's content.
+
+        Return:
+            index.ObjectIndex: One row per object, see uefi_firmware.index.
+        '''
+        from .index import build_index
+        return build_index(self, hashes)
+
 
 class StructuredObject(object):
+    __slots__ = ()
+
     def __init__(self):
         self.fields = []
 
     def parse_structure(self, data, structure):
         '''Construct an instance object of the provided structure.'''
-        struct_instance = structure()
+        struct_instance = read_structure(data, structure)
         struct_size = ctypes.sizeof(struct_instance)
 
-        struct_data = data[:struct_size]
-        struct_length = min(len(struct_data), struct_size)
-        ctypes.memmove(
-            ctypes.addressof(struct_instance), struct_data, struct_length)
+        struct_data = as_bytes(data[:struct_size])
         self.structure = struct_instance
         self.structure_data = struct_data
         self.structure_fields = [field[0] for field in structure._fields_]
@@ -142,6 +353,43 @@ class StructuredObject(object):
             print("%s: %s" % (field, getattr(self.structure, field, None)))
 
 
+class CompactObject(FirmwareObject):
+    '''A firmware object without an instance dictionary.
+
+    Images may hold thousands of files, sections, and variables. Subclasses
+    list their attributes in __slots__, and compute derived values (such as
+    'attrs') on access. The object's bytes, including its header, are kept in
+    a single view, '_data', and 'view' is the content following the header.
+    '''
+
+    __slots__ = (
+        "_data", "header_size", "lazy", "expanded", "max_depth",
+        "headers_only", "scheduler")
+
+    def __init__(self, data=None, header_size=0):
+        self._data = memview(data)
+        self.header_size = header_size
+        self.lazy = False
+        self.expanded = True
+        self.max_depth = None
+        self.headers_only = False
+        self.scheduler = None
+
+    @property
+    def view(self):
+        '''memoryview: The object's content, following the header.'''
+        if self._data is None:
+            return None
+        if self.header_size == 0:
+            return self._data
+        return self._data[self.header_size:]
+
+    @view.setter
+    def view(self, view):
+        self._data = view
+        self.header_size = 0
+
+
 class RawObject(FirmwareObject, BaseObject):
 
     def __init__(self, data):
@@ -153,17 +401,17 @@ class RawObject(FirmwareObject, BaseObject):
 
     def showinfo(self, ts='', index=None):
         print("%s%s size= %d " % (
-            ts, blue("RawObject:"), len(self.data)
+            ts, blue("RawObject:"), len(self.view)
         ))
 
     def to_dict(self):
         return {
-            'size': len(self.data),
+            'size': len(self.view),
         }
 
     def dump(self, parent='', index=0):
         path = os.path.join(parent, "object-%s.raw" % (str(index)))
-        dump_data(path, self.data)
+        dump_data(path, self.view)
 
 
 class AutoRawObject(RawObject):
@@ -182,26 +430,29 @@ class AutoRawObject(RawObject):
 
     def process(self):
         from . import AutoParser
-        parser = AutoParser(self.data)
-        self.object = parser.parse()
+        parser = AutoParser(self.view)
+        # The discovered object takes the place of this raw object.
+        self.object = parser.parse(
+            lazy=self.lazy, max_depth=self.max_depth,
+            headers_only=self.headers_only, workers=self.scheduler)
         return self.object is not None
 
     def showinfo(self, ts='', index=None):
         if self.object is None:
             print("%s%s size= %d " % (
-                ts, blue("RawObject:"), len(self.data)
+                ts, blue("RawObject:"), len(self.view)
             ))
             return
         self.object.showinfo(ts)
 
     def to_dict(self):
         return {
-            'size': len(self.data),
+            'size': len(self.view),
         }
 
     def dump(self, parent='', index=None):
         if self.object is None:
             path = os.path.join(parent, "object.raw")
-            dump_data(path, self.data)
+            dump_data(path, self.view)
             return
         self.object.dump(parent)
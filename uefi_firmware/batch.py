@@ -0,0 +1,226 @@
+'''Parse a corpus of files on a pool of worker processes.
+
+Each file is parsed by a worker process and described by a single line of
+JSON (NDJSON), produced as soon as the file is parsed:
+
+  for path, error, line in run_batch(paths, jobs=8, max_files=100):
+      print(line)
+
+Files are scheduled largest first, so a large image does not start last and
+extend the run while the other workers are idle. Workers may be replaced
+after a number of files to release the memory kept by the allocator. A few
+files beyond the files being parsed are queued, and the operating system is
+asked to read them ahead, so workers do not wait for storage.
+
+A worker that exits while parsing, e.g. it is killed by the operating system,
+does not stop the run. The files that were queued on the pool are parsed
+again, one at a time on a new pool, and a file that also ends its second
+worker is described by an error line.
+'''
+
+import os
+import sys
+import json
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from . import AutoParser
+from . import cache
+from .utils import read_file, memview
+
+
+def parse_file(path, use_mmap=None, **parse_options):
+    '''Parse a file and describe the result.
+
+    Args:
+        path (string): Path to the input file.
+        use_mmap (Optional[bool]): See utils.read_file.
+        parse_options: Arguments of AutoParser.parse, e.g. headers_only.
+
+    Return:
+        dict: The 'file' path, its 'size', the detected 'type', the 'result'
+            of the parsed object's to_dict, and an 'error' message or None.
+    '''
+    result = {
+        "file": path, "size": None, "type": None, "result": None,
+        "error": None,
+    }
+    try:
+        data = memview(read_file(path, use_mmap=use_mmap))
+        result["size"] = len(data)
+        parser = AutoParser(data, search=True)
+        result["type"] = parser.type()
+        if parser.type() == 'unknown':
+            result["error"] = "could not detect firmware type"
+            return result
+        firmware = parser.parse(**parse_options)
+        if firmware is None:
+            result["error"] = "could not parse the firmware"
+            return result
+        result["result"] = firmware.to_dict()
+    except Exception as e:
+        result["error"] = "%s: %s" % (e.__class__.__name__, str(e))
+    return result
+
+
+def _initialize(cache_dir, cache_size):
+    if cache_dir is not None:
+        cache.enable(cache_dir, cache_size)
+
+
+def _work(path, use_mmap, parse_options):
+    # The JSON line is encoded by the worker, only the text is sent back.
+    result = parse_file(path, use_mmap, **parse_options)
+    try:
+        line = json.dumps(result)
+    except (TypeError, ValueError) as e:
+        result["result"] = None
+        result["error"] = "%s: %s" % (e.__class__.__name__, str(e))
+        line = json.dumps(result)
+    return (path, result["error"], line)
+
+
+def _failure(path, error):
+    # A task that failed outside of parse_file, e.g. its result was lost.
+    message = "%s: %s" % (error.__class__.__name__, str(error))
+    return (path, message, json.dumps({
+        "file": path, "size": None, "type": None, "result": None,
+        "error": message}))
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _read_ahead(path):
+    # Ask the kernel to start reading the file, where supported.
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+# Workers are replaced by the pool itself, otherwise run_batch replaces the
+# pool.
+_MAX_TASKS_PER_CHILD = sys.version_info >= (3, 11)
+
+
+def _executor(jobs, max_files, cache_dir, cache_size):
+    options = {}
+    if max_files is not None and _MAX_TASKS_PER_CHILD:
+        options["max_tasks_per_child"] = max_files
+    return ProcessPoolExecutor(
+        jobs, initializer=_initialize, initargs=(cache_dir, cache_size),
+        **options)
+
+
+def run_batch(paths, jobs=None, max_files=None, read_ahead=None,
+              use_mmap=None, cache_dir=None,
+              cache_size=cache.DEFAULT_MAX_SIZE, **parse_options):
+    '''Parse files on worker processes (see the module notes).
+
+    Args:
+        paths (list): Paths to the input files.
+        jobs (Optional[int]): The number of worker processes, by default the
+            number of CPUs. With a single job the files are parsed in this
+            process.
+        max_files (Optional[int]): Replace a worker after it parsed this many
+            files, by default workers are kept. Before Python 3.11 the pool
+            is replaced once it was given 'jobs' times this many files.
+        read_ahead (Optional[int]): The number of files queued beyond the
+            files being parsed, by default 'jobs'.
+        use_mmap (Optional[bool]): See utils.read_file.
+        cache_dir (Optional[string]): Enable the decompression cache in this
+            folder within the workers, see cache.enable.
+        cache_size (Optional[int]): The cache size limit in bytes.
+        parse_options: Arguments of AutoParser.parse, e.g. headers_only.
+
+    Yields:
+        tuple: (path, error, line) for each file, in the order the files are
+            parsed. The error is a message, or None, and the line is the
+            JSON encoding of parse_file's result.
+    '''
+    paths = sorted(paths, key=_size, reverse=True)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs < 2:
+        for path in paths:
+            yield _work(path, use_mmap, parse_options)
+        return
+    if read_ahead is None:
+        read_ahead = jobs
+
+    executor = _executor(jobs, max_files, cache_dir, cache_size)
+    try:
+        pending = iter(paths)
+        # The files queued on the pool, and whether a file is parsed again.
+        running = {}
+        # The files queued when a worker exited, parsed again one at a time.
+        retry = deque()
+        # The files given to the pool, when run_batch replaces the pool.
+        submitted = 0
+        limit = None
+        if max_files is not None and not _MAX_TASKS_PER_CHILD:
+            limit = jobs * max_files
+        while True:
+            if limit is not None and submitted >= limit and not running:
+                # The pool parsed its files, replace its workers.
+                executor.shutdown()
+                executor = _executor(jobs, max_files, cache_dir, cache_size)
+                submitted = 0
+            if retry:
+                if not running:
+                    path = retry.popleft()
+                    future = executor.submit(
+                        _work, path, use_mmap, parse_options)
+                    running[future] = (path, True)
+                    submitted += 1
+            else:
+                while len(running) < jobs + read_ahead and (
+                        limit is None or submitted < limit):
+                    path = next(pending, None)
+                    if path is None:
+                        break
+                    _read_ahead(path)
+                    future = executor.submit(
+                        _work, path, use_mmap, parse_options)
+                    running[future] = (path, False)
+                    submitted += 1
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            broken = False
+            while done:
+                for future in done:
+                    path, retried = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        broken = True
+                        if not retried:
+                            retry.append(path)
+                            continue
+                        # The file was parsed alone, it ended the worker.
+                        result = _failure(path, e)
+                    except Exception as e:
+                        result = _failure(path, e)
+                    yield result
+                # The other queued files complete, or fail, with the pool.
+                done = wait(running)[0] if broken else ()
+            if broken:
+                executor.shutdown()
+                executor = _executor(jobs, max_files, cache_dir, cache_size)
+                submitted = 0
+    finally:
+        executor.shutdown(cancel_futures=True)
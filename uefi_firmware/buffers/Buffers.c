@@ -0,0 +1,94 @@
+/** @file
+
+Memory layout helpers for uefi_firmware_parser.
+
+Parsed objects are views of the input, or of decompressed content. The
+functions in this module relate views to the buffers they were sliced from,
+using the buffer protocol only.
+
+**/
+
+#include <Python.h>
+
+#if PY_MAJOR_VERSION >= 3
+#define OFFSET_FORMAT "y*y*:offset"
+#else
+#define OFFSET_FORMAT "s*s*:offset"
+#endif
+
+/*
+ offset(view, base)
+
+ Return the offset of a view within a buffer containing it, e.g. of a slice
+ of an image within the image, without copying either.
+*/
+static
+PyObject*
+Py_Offset(
+  PyObject    *Self,
+  PyObject    *Args
+  )
+{
+  Py_buffer     View;
+  Py_buffer     Base;
+  Py_ssize_t    Offset;
+
+  if (!PyArg_ParseTuple(Args, OFFSET_FORMAT, &View, &Base)) {
+    return NULL;
+  }
+  Offset = (const char *)View.buf - (const char *)Base.buf;
+  if ((const char *)View.buf < (const char *)Base.buf || View.len > Base.len - Offset) {
+    Offset = -1;
+  }
+  PyBuffer_Release(&View);
+  PyBuffer_Release(&Base);
+
+  if (Offset < 0) {
+    PyErr_SetString(PyExc_ValueError, "view is not within base");
+    return NULL;
+  }
+  return PyLong_FromSsize_t(Offset);
+}
+
+static PyMethodDef Buffers_Funcs[] = {
+  {"offset", (PyCFunction)Py_Offset, METH_VARARGS, "offset(view, base): Return the offset of a view within a buffer containing it.\n"},
+
+  {NULL, NULL, 0, NULL}
+};
+
+#define BUFFERS_DOCS "Memory layout helpers for views of firmware images."
+
+#if PY_MAJOR_VERSION >= 3
+static PyModuleDef_Slot Buffers_Slots[] = {
+#ifdef Py_mod_multiple_interpreters
+  {Py_mod_multiple_interpreters, Py_MOD_PER_INTERPRETER_GIL_SUPPORTED},
+#endif
+#ifdef Py_mod_gil
+  // The functions keep no state.
+  {Py_mod_gil, Py_MOD_GIL_NOT_USED},
+#endif
+  {0, NULL}
+};
+
+static PyModuleDef Buffers = {
+  PyModuleDef_HEAD_INIT,
+  "_buffers",
+  BUFFERS_DOCS,
+  0,
+  Buffers_Funcs,
+  Buffers_Slots,
+  NULL,
+  NULL,
+  NULL
+};
+
+PyMODINIT_FUNC
+PyInit__buffers(void) {
+  return PyModuleDef_Init(&Buffers);
+}
+#else
+PyMODINIT_FUNC
+init_buffers(void) {
+  Py_InitModule3("_buffers", Buffers_Funcs, BUFFERS_DOCS);
+}
+#endif
@@ -0,0 +1,244 @@
+'''An opt-in, on-disk cache of decompressed content.
+
+Vendor images are often parsed many times, each run repeating the same LZMA,
+Tiano, EFI, zlib, or gzip decoding. When enabled, decoded content is stored
+by algorithm name and the SHA-256 digest of the encoded input:
+
+    <path>/<algorithm>/<digest[:2]>/<digest>        decoded content
+    <path>/<algorithm>/<digest[:2]>/<digest>.err    a failed decode (message)
+
+Failed decodes of invalid content are kept so later runs do not retry them. Entry modification
+times record use, once the cache grows beyond its size limit the least
+recently used entries are removed until it is back under a low-water mark.
+'''
+
+import os
+import gzip
+import zlib
+import hashlib
+import tempfile
+import threading
+import contextlib
+import contextvars
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+'''int: The default cache size limit in bytes.'''
+
+LOW_WATER = 0.9
+'''float: Eviction reduces a cache to this fraction of its size limit, so the
+cache directory is only scanned again after it grew by the remainder.'''
+
+active = None
+'''DecompressionCache: The cache used by decode, None when disabled, unless
+the current context chose another cache (see use).'''
+
+_current = contextvars.ContextVar("cache")
+
+
+class CachedFailure(Exception):
+    '''A decode failure recorded by an earlier attempt.'''
+
+
+CODEC_ERRORS = (ValueError, EOFError, zlib.error, gzip.BadGzipFile)
+'''tuple: Errors of invalid encoded content, recorded by decode. The
+efi_compressor codecs raise ValueError. Other errors, e.g. MemoryError or
+OSError, may not recur and are not recorded.'''
+
+
+class DecompressionCache(object):
+    '''A size-limited directory of decoded content (see the module notes).'''
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        '''Create or open a cache.
+
+        Args:
+            path (string): The cache directory, created if needed.
+            max_size (Optional[int]): Evict entries beyond this many bytes.
+        '''
+        self.path = path
+        self.max_size = max_size
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+        # Guards the size and hit accounting, files are parsed on several
+        # threads.
+        self._lock = threading.Lock()
+
+    def _entry(self, algorithm, digest):
+        return os.path.join(self.path, algorithm, digest[:2], digest)
+
+    def get(self, algorithm, digest):
+        '''Look up the result of decoding content with an algorithm.
+
+        Args:
+            algorithm (string): Name of the algorithm.
+            digest (string): Hex SHA-256 digest of the encoded content.
+
+        Return:
+            tuple (bool, binary): (True, content) for decoded content,
+                (False, message) for a failed decode, None if not cached.
+        '''
+        entry = self._entry(algorithm, digest)
+        for path, success in [(entry, True), (entry + ".err", False)]:
+            try:
+                with open(path, 'rb') as fh:
+                    content = fh.read()
+                os.utime(path, None)
+            except (IOError, OSError):
+                continue
+            with self._lock:
+                self.hits += 1
+            if not success:
+                content = content.decode('utf-8', 'replace')
+            return (success, content)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, algorithm, digest, content=None, error=None):
+        '''Store decoded content, or the message of a failed decode.
+
+        Args:
+            algorithm (string): Name of the algorithm.
+            digest (string): Hex SHA-256 digest of the encoded content.
+            content (Optional[binary]): The decoded content.
+            error (Optional[string]): The failure message, if decoding failed.
+        '''
+        path = self._entry(algorithm, digest)
+        if error is not None:
+            path += ".err"
+            content = error.encode('utf-8')
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            fd, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), prefix=".")
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(content)
+        except (IOError, OSError):
+            return
+
+        with self._lock:
+            # Concurrent writers each replace the entry with identical content,
+            # only count the difference.
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            try:
+                os.replace(temp_path, path)
+            except OSError:
+                return
+            if self.size is None:
+                self.size = sum([entry[1] for entry in self._entries()])
+            else:
+                self.size += len(content) - replaced
+            if self.size > self.max_size:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, target=None):
+        '''Remove the least recently used entries.
+
+        Args:
+            target (Optional[int]): The size to reduce the cache to, by default
+                the low-water mark (see LOW_WATER).
+        '''
+        with self._lock:
+            self._evict(target)
+
+    def _evict(self, target=None):
+        if target is None:
+            target = int(self.max_size * LOW_WATER)
+        entries = sorted(self._entries())
+        self.size = sum([entry[1] for entry in entries])
+        for _, size, path in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+
+def enable(path, max_size=DEFAULT_MAX_SIZE):
+    '''Cache decoded content in the directory path.
+
+    Return:
+        DecompressionCache: The active cache.
+    '''
+    global active
+    active = DecompressionCache(path, max_size)
+    return active
+
+
+def disable():
+    '''Stop caching decoded content.'''
+    global active
+    active = None
+
+
+@contextlib.contextmanager
+def use(cache):
+    '''Use a cache, or no cache (None), within a with block.
+
+    The choice applies to the calling thread (or asyncio task), and to the
+    worker threads of its parses, other threads use 'active'.
+
+    Args:
+        cache (DecompressionCache): The cache used by decode.
+    '''
+    token = _current.set(cache)
+    try:
+        yield cache
+    finally:
+        _current.reset(token)
+
+
+def decode(algorithm, function, data):
+    '''Decode data using the active cache.
+
+    Without an active cache this is function(data). Otherwise a cached result
+    is returned, or the result of function(data) is cached. A failure recorded
+    earlier raises CachedFailure, only CODEC_ERRORS are recorded.
+
+    Args:
+        algorithm (string): Name of the algorithm, part of the cache key.
+        function (callable): Decodes its argument, raising on failure.
+        data (binary): The encoded content.
+
+    Return:
+        binary: The decoded content.
+    '''
+    cache = _current.get(active)
+    if cache is None:
+        return function(data)
+
+    digest = hashlib.sha256(data).hexdigest()
+    result = cache.get(algorithm, digest)
+    if result is not None:
+        if not result[0]:
+            raise CachedFailure(result[1])
+        return result[1]
+
+    try:
+        content = function(data)
+    except CODEC_ERRORS as e:
+        cache.put(algorithm, digest, error=str(e) or e.__class__.__name__)
+        raise
+    cache.put(algorithm, digest, content=bytes(content or b""))
+    return content
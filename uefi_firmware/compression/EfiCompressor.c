@@ -24,6 +24,7 @@ This includes minor API changes for Tiano and EFI decompressor, as well as LZMA.
 #include "Tiano/Compress.h"
 #include "LZMA/LzmaDecompress.h"
 #include "LZMA/LzmaCompress.h"
+#include "LzmaDecompressor.h"
 
 #define EFI_COMPRESSION   1 //defined as PI_STD, section type= 0x01
 #define TIANO_COMPRESSION 2 //not defined, section type= 0x01
@@ -32,84 +33,168 @@ This includes minor API changes for Tiano and EFI decompressor, as well as LZMA.
 #define MAX_DSTSZ 100000000 //100MB -- Max destination buffer size allowed. 
                            //I don't think there is an image to decompress bigger than this. In any case, feel free to change.
 
+#if PY_MAJOR_VERSION >= 3
+#define SOURCE_FORMAT "y*|K"      //Any contiguous buffer, optional size
+#define INTO_FORMAT   "y*w*"      //A source and a writable destination buffer
+#else
+#define SOURCE_FORMAT "s*|K"
+#define INTO_FORMAT   "s*w*"
+#endif
+
+/*
+ Retrieve the decompressed and scratch sizes from the header of Source.
+*/
 EFI_STATUS
-Extract (
+ExtractInfo (
   IN      VOID    *Source,
   IN      SizeT   SrcSize,
-     OUT  VOID    **Destination,
      OUT  SizeT   *DstSize,
+     OUT  SizeT   *ScratchSize,
+  IN      UINTN   Algorithm
+  )
+{
+  EFI_STATUS    Status;
+
+  *ScratchSize = 0;
+  switch (Algorithm) {
+  case 0:
+    *DstSize = SrcSize;
+    Status = EFI_SUCCESS;
+    break;
+  case EFI_COMPRESSION:
+    Status = EfiGetInfo(Source, SrcSize, DstSize, ScratchSize);
+    break;
+  case TIANO_COMPRESSION:
+    Status = TianoGetInfo(Source, SrcSize, DstSize, ScratchSize);
+    break;
+  case LZMA_COMPRESSION:
+    Status = LzmaGetInfo(Source, SrcSize, DstSize, ScratchSize);
+    break;
+  default:
+    Status = EFI_INVALID_PARAMETER;
+  }
+  if (Status == EFI_SUCCESS && *DstSize > MAX_DSTSZ) {
+    Status = EFI_OUT_OF_RESOURCES;
+  }
+  return Status;
+}
+
+/*
+ Decompress Source into Destination, DstSize must be the size given by ExtractInfo.
+ Runs without the GIL. EFI_OUT_OF_RESOURCES is only returned if the scratch
+ buffer could not be allocated.
+*/
+EFI_STATUS
+Extract (
+  IN      VOID    *Source,
+  IN      SizeT   SrcSize,
+     OUT  VOID    *Destination,
+  IN      SizeT   DstSize,
+  IN      SizeT   ScratchSize,
   IN      UINTN   Algorithm
   )
 {
   VOID          *Scratch;
-  SizeT         ScratchSize;
   EFI_STATUS    Status;
 
-  GETINFO_FUNCTION    GetInfoFunction;
   DECOMPRESS_FUNCTION DecompressFunction;
 
-  GetInfoFunction = NULL;
   DecompressFunction = NULL;
   Scratch = NULL;
-  ScratchSize = 0;
   Status = EFI_SUCCESS;
 
   switch (Algorithm) {
   case 0:
-    *Destination = (VOID *)malloc(SrcSize);
-    if (*Destination != NULL) {
-      memcpy(*Destination, Source, SrcSize);
-    } else {
-      Status = EFI_OUT_OF_RESOURCES;
-    }
+    memcpy(Destination, Source, DstSize);
     break;
   case EFI_COMPRESSION:
-    GetInfoFunction = EfiGetInfo;
     DecompressFunction = EfiDecompress;
     break;
   case TIANO_COMPRESSION:
-    GetInfoFunction = TianoGetInfo;
     DecompressFunction = TianoDecompress;
     break;
   case LZMA_COMPRESSION:
-    GetInfoFunction = LzmaGetInfo;
     DecompressFunction = LzmaDecompress;
     break;
   default:
     Status = EFI_INVALID_PARAMETER;
   }
-  if (GetInfoFunction != NULL) {
-    Status = GetInfoFunction(Source, SrcSize, DstSize, &ScratchSize);
-    if (Status == EFI_SUCCESS) {
-      if (ScratchSize > 0) {
-        Scratch = (VOID *)malloc(ScratchSize);
-      }
-      if(*DstSize <= MAX_DSTSZ){
-        *Destination = (VOID *)malloc(*DstSize);
-      }
-      if (((ScratchSize > 0 && Scratch != NULL) || ScratchSize == 0) && *Destination != NULL) {
-        Status = DecompressFunction(Source, SrcSize, *Destination, *DstSize, Scratch, ScratchSize);
-      } else {
-        free(*Destination);
-        free(Scratch);
-        Status = EFI_OUT_OF_RESOURCES;
-      }
+  if (DecompressFunction != NULL) {
+    if (ScratchSize > 0) {
+      Scratch = (VOID *)malloc(ScratchSize);
+    }
+    if ((ScratchSize > 0 && Scratch != NULL) || ScratchSize == 0) {
+      Status = DecompressFunction(Source, SrcSize, Destination, DstSize, Scratch, ScratchSize);
+    } else {
+      Status = EFI_OUT_OF_RESOURCES;
     }
+    free(Scratch);
   }
   return Status;
 }
 
-void 
-errorHandling(
-  VOID* SrcBuf,
-  VOID* DstBuf
+/*
+ Compress Source into Destination of *DstSize bytes. If Destination is too
+ small (or NULL) EFI_BUFFER_TOO_SMALL is returned and *DstSize is set to the
+ required size. Runs without the GIL, the EFI and Tiano compressors keep
+ their state in thread-local variables and LZMA in the encoder.
+*/
+STATIC
+EFI_STATUS
+CompressBuffer (
+  IN      VOID    *Source,
+  IN      SizeT   SrcSize,
+     OUT  VOID    *Destination,
+  IN OUT  SizeT   *DstSize,
+  IN      UINTN   Algorithm
   )
 {
-  free(DstBuf);
+  EFI_STATUS    Status;
+
+  // Pick the compress function based on compression type
+  COMPRESS_FUNCTION CompressFunction;
+
+  if (Algorithm == LZMA_COMPRESSION) {
+    // LzmaCompress takes a 5th DictionarySize parameter, so it cannot be
+    // called through the 4-parameter COMPRESS_FUNCTION pointer.
+    UINT32 LzmaDstSize = (*DstSize > UINT32_MAX) ? UINT32_MAX : (UINT32)*DstSize;
+    if (SrcSize > UINT32_MAX / 2) {
+      return EFI_OUT_OF_RESOURCES;
+    }
+    Status = LzmaCompress((CONST UINT8 *)Source, (UINT32)SrcSize, (UINT8 *)Destination, &LzmaDstSize, DEFAULT_LZMA_DICTIONARY_SIZE);
+    *DstSize = (SizeT)LzmaDstSize;
+  } else {
+    CompressFunction = (COMPRESS_FUNCTION) ((Algorithm == EFI_COMPRESSION) ? EfiCompress : TianoCompress);
+    Status = CompressFunction(Source, SrcSize, Destination, DstSize);
+  }
+  return Status;
+}
+
+/*
+ Return the size of Source to use, the optional size argument (SIZE_MAX if it
+ was not passed) may not exceed the length of the buffer.
+*/
+STATIC
+int
+SourceSize(
+  Py_buffer   *Source,
+  SizeT       *SrcDataSize
+  )
+{
+  if (*SrcDataSize == (SizeT)-1) {
+    *SrcDataSize = (SizeT)Source->len;
+  } else if (*SrcDataSize > (SizeT)Source->len) {
+    PyErr_SetString(PyExc_ValueError, "size exceeds the length of data");
+    return 0;
+  }
+  return 1;
 }
 
 /*
- UefiDecompress(data_buffer, size, huffman_type)
+ UefiDecompress(data_buffer[, size], huffman_type)
+
+ The buffer stays exported, and so cannot be resized or released, while the
+ GIL is not held. The result is decoded directly into the returned bytes.
 */
 STATIC
 PyObject*
@@ -119,214 +204,379 @@ UefiDecompress(
   UINT8       type
   )
 {
-  PyBytesObject *SrcData;
+  Py_buffer     Source;
+  PyObject      *Result;
   SizeT         SrcDataSize;
   SizeT         DstDataSize;
+  SizeT         ScratchSize;
   EFI_STATUS    Status;
-  char          *SrcBuf;
-  char          *DstBuf;
 
+  SrcDataSize = (SizeT)-1;
   DstDataSize = 0;
-  DstBuf = NULL;
 
-  Status = PyArg_ParseTuple(Args, "OK", &SrcData, &SrcDataSize); //-V111
-  if (Status == 0) {
+  if (!PyArg_ParseTuple(Args, SOURCE_FORMAT, &Source, &SrcDataSize)) { //-V111
+    return NULL;
+  }
+  if (!SourceSize(&Source, &SrcDataSize)) {
+    PyBuffer_Release(&Source);
     return NULL;
   }
 
-  SrcBuf = SrcData->ob_sval;
+  Result = NULL;
+  Status = ExtractInfo(Source.buf, SrcDataSize, &DstDataSize, &ScratchSize, type);
+  if (Status == EFI_SUCCESS) {
+    Result = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)DstDataSize);
+    if (Result == NULL) {
+      PyBuffer_Release(&Source);
+      return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    Status = Extract(Source.buf, SrcDataSize, PyBytes_AS_STRING(Result), DstDataSize, ScratchSize, type);
+    Py_END_ALLOW_THREADS
+    if (Status == EFI_OUT_OF_RESOURCES) {
+      // The scratch buffer could not be allocated, the data may be valid.
+      PyBuffer_Release(&Source);
+      Py_DECREF(Result);
+      return PyErr_NoMemory();
+    }
+  }
+  PyBuffer_Release(&Source);
 
-  Status = Extract((VOID *)SrcBuf, SrcDataSize, (VOID **)&DstBuf, &DstDataSize, type);
   if (Status != EFI_SUCCESS) {
-    PyErr_SetString(PyExc_Exception, "Failed to decompress\n");
-    errorHandling(SrcBuf, DstBuf);
+    Py_XDECREF(Result);
+    PyErr_SetString(PyExc_ValueError, "Failed to decompress\n");
     return NULL;
   }
-
-  return PyBytes_FromStringAndSize(DstBuf, (Py_ssize_t)DstDataSize);
+  return Result;
 }
 
 /*
- UefiCompress(data_buffer, size, huffman_type)
+ UefiDecompressInto(data_buffer, destination_buffer, huffman_type)
+
+ Decompress into a caller-provided writable buffer, return the size written.
 */
 STATIC
 PyObject*
-UefiCompress(
+UefiDecompressInto(
   PyObject    *Self,
   PyObject    *Args,
   UINT8       type
   )
 {
-  PyBytesObject *SrcData;
-  SizeT         SrcDataSize;
+  Py_buffer     Source;
+  Py_buffer     Destination;
   SizeT         DstDataSize;
+  SizeT         ScratchSize;
   EFI_STATUS    Status;
-  char          *SrcBuf;
-  char          *DstBuf;
-
-  // Pick the compress function based on compression type
-  COMPRESS_FUNCTION CompressFunction;
 
   DstDataSize = 0;
-  DstBuf = NULL;
-  CompressFunction = NULL;
 
-  Status = PyArg_ParseTuple(Args, "OK", &SrcData, &SrcDataSize); //-V111
-  if (Status == 0) {
+  if (!PyArg_ParseTuple(Args, INTO_FORMAT, &Source, &Destination)) {
     return NULL;
   }
 
-  SrcBuf = SrcData->ob_sval;
-
-  if (type == LZMA_COMPRESSION) {
-    // LzmaCompress takes a 5th DictionarySize parameter, so it cannot be
-    // called through the 4-parameter COMPRESS_FUNCTION pointer.
-    UINT32 LzmaDstSize = 0;
-    Status = LzmaCompress((CONST UINT8 *)SrcBuf, (UINT32)SrcDataSize, NULL, &LzmaDstSize, DEFAULT_LZMA_DICTIONARY_SIZE);
-    if (Status == EFI_BUFFER_TOO_SMALL) {
-      DstBuf = malloc(LzmaDstSize);
-      if (!DstBuf) {
-        errorHandling(SrcBuf, DstBuf);
-        return NULL;
-      }
-      Status = LzmaCompress((CONST UINT8 *)SrcBuf, (UINT32)SrcDataSize, (UINT8 *)DstBuf, &LzmaDstSize, DEFAULT_LZMA_DICTIONARY_SIZE);
-    }
-    DstDataSize = (SizeT)LzmaDstSize;
-  } else {
-    CompressFunction = (COMPRESS_FUNCTION) ((type == EFI_COMPRESSION) ? EfiCompress : TianoCompress);
-    Status = CompressFunction(SrcBuf, SrcDataSize, DstBuf, &DstDataSize);
-    if (Status == EFI_BUFFER_TOO_SMALL) {
-      // The first call to compress fills in the expected destination size.
-      DstBuf = malloc (DstDataSize);
-      if (!DstBuf) {
-        errorHandling(SrcBuf, DstBuf);
-        return NULL;
-      }
-      // The second call to compress compresses.
-      Status = CompressFunction(SrcBuf, SrcDataSize, DstBuf, &DstDataSize);
+  Status = ExtractInfo(Source.buf, (SizeT)Source.len, &DstDataSize, &ScratchSize, type);
+  if (Status == EFI_SUCCESS && DstDataSize > (SizeT)Destination.len) {
+    PyBuffer_Release(&Source);
+    PyBuffer_Release(&Destination);
+    PyErr_Format(PyExc_ValueError, "destination is too small, %zu bytes are required", (size_t)DstDataSize);
+    return NULL;
+  }
+  if (Status == EFI_SUCCESS) {
+    Py_BEGIN_ALLOW_THREADS
+    Status = Extract(Source.buf, (SizeT)Source.len, Destination.buf, DstDataSize, ScratchSize, type);
+    Py_END_ALLOW_THREADS
+    if (Status == EFI_OUT_OF_RESOURCES) {
+      PyBuffer_Release(&Source);
+      PyBuffer_Release(&Destination);
+      return PyErr_NoMemory();
     }
   }
+  PyBuffer_Release(&Source);
+  PyBuffer_Release(&Destination);
 
   if (Status != EFI_SUCCESS) {
-    PyErr_SetString(PyExc_Exception, "Failed to compress\n");
-    errorHandling(SrcBuf, DstBuf);
+    PyErr_SetString(PyExc_ValueError, "Failed to decompress\n");
     return NULL;
   }
-
-  return PyBytes_FromStringAndSize(DstBuf, (Py_ssize_t)DstDataSize);
+  return PyLong_FromSize_t((size_t)DstDataSize);
 }
 
-/**
-
-The following functions are semi-cyclic, they call a Python-abstraction that calls
-replica version of the following two entry points. Each uses a cased short to determine
-the huffman-decode implementation.
-
-**/
+/*
+ UefiGetInfo(data_buffer[, size], huffman_type)
 
+ Return (decompressed size, scratch size) from the header without decoding.
+*/
 STATIC
 PyObject*
-Py_EfiDecompress(
+UefiGetInfo(
   PyObject    *Self,
-  PyObject    *Args
+  PyObject    *Args,
+  UINT8       type
   )
 {
-  /* Use the "EFI"-type compression, or PI_STD (4-bit symbol tables). */
-  return UefiDecompress(Self, Args, EFI_COMPRESSION);
+  Py_buffer     Source;
+  SizeT         SrcDataSize;
+  SizeT         DstDataSize;
+  SizeT         ScratchSize;
+  EFI_STATUS    Status;
+
+  SrcDataSize = (SizeT)-1;
+  DstDataSize = 0;
+
+  if (!PyArg_ParseTuple(Args, SOURCE_FORMAT, &Source, &SrcDataSize)) { //-V111
+    return NULL;
+  }
+  if (!SourceSize(&Source, &SrcDataSize)) {
+    PyBuffer_Release(&Source);
+    return NULL;
+  }
+
+  Status = ExtractInfo(Source.buf, SrcDataSize, &DstDataSize, &ScratchSize, type);
+  PyBuffer_Release(&Source);
+
+  if (Status != EFI_SUCCESS) {
+    PyErr_SetString(PyExc_ValueError, "Invalid compressed data header\n");
+    return NULL;
+  }
+  return Py_BuildValue("(nn)", (Py_ssize_t)DstDataSize, (Py_ssize_t)ScratchSize);
 }
 
+/*
+ UefiCompress(data_buffer[, size], huffman_type)
+*/
 STATIC
 PyObject*
-Py_TianoDecompress(
+UefiCompress(
   PyObject    *Self,
-  PyObject    *Args
+  PyObject    *Args,
+  UINT8       type
   )
 {
-  /* Use the "Tiano"-type compression (5-bit symbol tables). */
-  return UefiDecompress(Self, Args, TIANO_COMPRESSION);
+  Py_buffer     Source;
+  PyObject      *Result;
+  SizeT         SrcDataSize;
+  SizeT         DstDataSize;
+  EFI_STATUS    Status;
+
+  SrcDataSize = (SizeT)-1;
+  DstDataSize = 0;
+  Result = NULL;
+
+  if (!PyArg_ParseTuple(Args, SOURCE_FORMAT, &Source, &SrcDataSize)) { //-V111
+    return NULL;
+  }
+  if (!SourceSize(&Source, &SrcDataSize)) {
+    PyBuffer_Release(&Source);
+    return NULL;
+  }
+
+  // The first call to compress fills in the expected destination size.
+  Py_BEGIN_ALLOW_THREADS
+  Status = CompressBuffer(Source.buf, SrcDataSize, NULL, &DstDataSize, type);
+  Py_END_ALLOW_THREADS
+  if (Status == EFI_BUFFER_TOO_SMALL) {
+    Result = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)DstDataSize);
+    if (Result == NULL) {
+      PyBuffer_Release(&Source);
+      return NULL;
+    }
+    // The second call to compress compresses into the result.
+    Py_BEGIN_ALLOW_THREADS
+    Status = CompressBuffer(Source.buf, SrcDataSize, PyBytes_AS_STRING(Result), &DstDataSize, type);
+    Py_END_ALLOW_THREADS
+  }
+  PyBuffer_Release(&Source);
+
+  if (Status != EFI_SUCCESS || Result == NULL) {
+    Py_XDECREF(Result);
+    if (Status == EFI_OUT_OF_RESOURCES) {
+      return PyErr_NoMemory();
+    }
+    PyErr_SetString(PyExc_Exception, "Failed to compress\n");
+    return NULL;
+  }
+
+  // The LZMA size is an upper bound, shrink the result to the compressed size.
+  if ((Py_ssize_t)DstDataSize < PyBytes_GET_SIZE(Result) &&
+      _PyBytes_Resize(&Result, (Py_ssize_t)DstDataSize) < 0) {
+    return NULL;
+  }
+  return Result;
 }
 
+/**
+
+The following functions are semi-cyclic, they call a Python-abstraction that calls
+replica version of the following entry points. Each uses a cased short to determine
+the huffman-decode implementation.
+
+**/
+
+#define UEFI_ENTRY(Name, Function, Type)  \
+  STATIC                                  \
+  PyObject*                               \
+  Name(                                   \
+    PyObject    *Self,                    \
+    PyObject    *Args                     \
+    )                                     \
+  {                                       \
+    return Function(Self, Args, Type);    \
+  }
+
+/* The "EFI"-type compression, or PI_STD (4-bit symbol tables). */
+UEFI_ENTRY(Py_EfiDecompress,       UefiDecompress,     EFI_COMPRESSION)
+UEFI_ENTRY(Py_EfiDecompressInto,   UefiDecompressInto, EFI_COMPRESSION)
+UEFI_ENTRY(Py_EfiGetInfo,          UefiGetInfo,        EFI_COMPRESSION)
+UEFI_ENTRY(Py_EfiCompress,         UefiCompress,       EFI_COMPRESSION)
+
+/* The "Tiano"-type compression (5-bit symbol tables). */
+UEFI_ENTRY(Py_TianoDecompress,     UefiDecompress,     TIANO_COMPRESSION)
+UEFI_ENTRY(Py_TianoDecompressInto, UefiDecompressInto, TIANO_COMPRESSION)
+UEFI_ENTRY(Py_TianoGetInfo,        UefiGetInfo,        TIANO_COMPRESSION)
+UEFI_ENTRY(Py_TianoCompress,       UefiCompress,       TIANO_COMPRESSION)
+
+/* The 7-z LZMA compression. */
+UEFI_ENTRY(Py_LzmaDecompress,      UefiDecompress,     LZMA_COMPRESSION)
+UEFI_ENTRY(Py_LzmaDecompressInto,  UefiDecompressInto, LZMA_COMPRESSION)
+UEFI_ENTRY(Py_LzmaGetInfo,         UefiGetInfo,        LZMA_COMPRESSION)
+UEFI_ENTRY(Py_LzmaCompress,        UefiCompress,       LZMA_COMPRESSION)
+
+#define EFI_DECOMPRESS_DOCS   "EfiDecompress(data[, size]): Decompress data using the EDKII standard algorithm.\n"
+#define TIANO_DECOMPRESS_DOCS "TianoDecompress(data[, size]): Decompress data using 5-bit Huffman encoding.\n"
+#define LZMA_DECOMPRESS_DOCS  "LzmaDecompress(data[, size]): Decompress using 7-z LZMA alogrithm.\n"
+#define EFI_COMPRESS_DOCS     "EfiCompress(data[, size]): Compress data using the EDKII standard algorithm.\n"
+#define TIANO_COMPRESS_DOCS   "TianoCompress(data[, size]): Compress data using 5-bit Huffman encoding.\n"
+#define LZMA_COMPRESS_DOCS    "LzmaCompress(data[, size]): Compress using 7-z LZMA alogrithm.\n"
+#define INTO_DOCS             "(data, destination): Decompress into a writable buffer, return the decompressed size.\n"
+#define GETINFO_DOCS          "(data[, size]): Return the (decompressed, scratch) sizes from the header.\n"
+
+
+STATIC PyMethodDef EfiCompressor_Funcs[] = {
+  {"EfiDecompress",       (PyCFunction)Py_EfiDecompress,       METH_VARARGS, EFI_DECOMPRESS_DOCS},
+  {"TianoDecompress",     (PyCFunction)Py_TianoDecompress,     METH_VARARGS, TIANO_DECOMPRESS_DOCS},
+  {"LzmaDecompress",      (PyCFunction)Py_LzmaDecompress,      METH_VARARGS, LZMA_DECOMPRESS_DOCS},
+  {"EfiCompress",         (PyCFunction)Py_EfiCompress,         METH_VARARGS, EFI_COMPRESS_DOCS},
+  {"TianoCompress",       (PyCFunction)Py_TianoCompress,       METH_VARARGS, TIANO_COMPRESS_DOCS},
+  {"LzmaCompress",        (PyCFunction)Py_LzmaCompress,        METH_VARARGS, LZMA_COMPRESS_DOCS},
+  {"EfiDecompressInto",   (PyCFunction)Py_EfiDecompressInto,   METH_VARARGS, "EfiDecompressInto" INTO_DOCS},
+  {"TianoDecompressInto", (PyCFunction)Py_TianoDecompressInto, METH_VARARGS, "TianoDecompressInto" INTO_DOCS},
+  {"LzmaDecompressInto",  (PyCFunction)Py_LzmaDecompressInto,  METH_VARARGS, "LzmaDecompressInto" INTO_DOCS},
+  {"EfiGetInfo",          (PyCFunction)Py_EfiGetInfo,          METH_VARARGS, "EfiGetInfo" GETINFO_DOCS},
+  {"TianoGetInfo",        (PyCFunction)Py_TianoGetInfo,        METH_VARARGS, "TianoGetInfo" GETINFO_DOCS},
+  {"LzmaGetInfo",         (PyCFunction)Py_LzmaGetInfo,         METH_VARARGS, "LzmaGetInfo" GETINFO_DOCS},
+
+  {NULL, NULL, 0, NULL}
+};
+
+#if PY_MAJOR_VERSION >= 3
+/*
+ The module keeps no global state: the LzmaDecompressor type is created for
+ each module object (each interpreter) and kept in the module state.
+*/
+typedef struct {
+  PyObject  *LzmaDecompressorType;
+} EfiCompressorState;
+
 STATIC
-PyObject*
-Py_LzmaDecompress(
-  PyObject    *Self,
-  PyObject    *Args
+int
+EfiCompressor_Exec(
+  PyObject    *Module
   )
 {
-  /* Use the "Tiano"-type compression (5-bit symbol tables). */
-  return UefiDecompress(Self, Args, LZMA_COMPRESSION);
+  EfiCompressorState  *State;
+
+  State = (EfiCompressorState *)PyModule_GetState(Module);
+  State->LzmaDecompressorType = LzmaDecompressor_CreateType(Module);
+  if (State->LzmaDecompressorType == NULL) {
+    return -1;
+  }
+  Py_INCREF(State->LzmaDecompressorType);
+  if (PyModule_AddObject(Module, "LzmaDecompressor", State->LzmaDecompressorType) < 0) {
+    Py_DECREF(State->LzmaDecompressorType);
+    return -1;
+  }
+  return 0;
 }
 
 STATIC
-PyObject*
-Py_EfiCompress(
-  PyObject    *Self,
-  PyObject    *Args
+int
+EfiCompressor_Traverse(
+  PyObject    *Module,
+  visitproc   visit,  // The names used by Py_VISIT
+  void        *arg
   )
 {
-  /* Use the "EFI"-type compression, or PI_STD (4-bit symbol tables). */
-  return UefiCompress(Self, Args, EFI_COMPRESSION);
+  EfiCompressorState *State = (EfiCompressorState *)PyModule_GetState(Module);
+  if (State != NULL) {
+    Py_VISIT(State->LzmaDecompressorType);
+  }
+  return 0;
 }
 
 STATIC
-PyObject*
-Py_TianoCompress(
-  PyObject    *Self,
-  PyObject    *Args
+int
+EfiCompressor_Clear(
+  PyObject    *Module
   )
 {
-  /* Use the "Tiano"-type compression (5-bit symbol tables). */
-  return UefiCompress(Self, Args, TIANO_COMPRESSION);
+  EfiCompressorState *State = (EfiCompressorState *)PyModule_GetState(Module);
+  if (State != NULL) {
+    Py_CLEAR(State->LzmaDecompressorType);
+  }
+  return 0;
 }
 
 STATIC
-PyObject*
-Py_LzmaCompress(
-  PyObject    *Self,
-  PyObject    *Args
+void
+EfiCompressor_Free(
+  void        *Module
   )
 {
-  /* Use the "Tiano"-type compression (5-bit symbol tables). */
-  return UefiCompress(Self, Args, LZMA_COMPRESSION);
+  EfiCompressor_Clear((PyObject *)Module);
 }
 
-#define EFI_DECOMPRESS_DOCS   "EfiDecompress(): Decompress data using the EDKII standard algorithm.\n"
-#define TIANO_DECOMPRESS_DOCS "TianoDecompress(): Decompress data using 5-bit Huffman encoding.\n"
-#define LZMA_DECOMPRESS_DOCS  "LzmaDecompress(): Decompress using 7-z LZMA alogrithm.\n"
-#define EFI_COMPRESS_DOCS     "EfiCompress(): Compress data using the EDKII standard algorithm.\n"
-#define TIANO_COMPRESS_DOCS   "TianoCompress(): Compress data using 5-bit Huffman encoding.\n"
-#define LZMA_COMPRESS_DOCS    "LzmaCompress(): Compress using 7-z LZMA alogrithm.\n"
-
-
-STATIC PyMethodDef EfiCompressor_Funcs[] = {
-  {"EfiDecompress",   (PyCFunction)Py_EfiDecompress,   METH_VARARGS, EFI_DECOMPRESS_DOCS},
-  {"TianoDecompress", (PyCFunction)Py_TianoDecompress, METH_VARARGS, TIANO_DECOMPRESS_DOCS},
-  {"LzmaDecompress",  (PyCFunction)Py_LzmaDecompress,  METH_VARARGS, LZMA_DECOMPRESS_DOCS},
-  {"EfiCompress",     (PyCFunction)Py_EfiCompress,     METH_VARARGS, EFI_COMPRESS_DOCS},
-  {"TianoCompress",   (PyCFunction)Py_TianoCompress,   METH_VARARGS, TIANO_COMPRESS_DOCS},
-  {"LzmaCompress",    (PyCFunction)Py_LzmaCompress,    METH_VARARGS, LZMA_COMPRESS_DOCS},
-
-  {NULL, NULL, 0, NULL}
+STATIC PyModuleDef_Slot EfiCompressor_Slots[] = {
+  {Py_mod_exec, (void *)EfiCompressor_Exec},
+#ifdef Py_mod_multiple_interpreters
+  {Py_mod_multiple_interpreters, Py_MOD_PER_INTERPRETER_GIL_SUPPORTED},
+#endif
+#ifdef Py_mod_gil
+  // The functions share no state, the compressors keep theirs per thread.
+  {Py_mod_gil, Py_MOD_GIL_NOT_USED},
+#endif
+  {0, NULL}
 };
 
-#if PY_MAJOR_VERSION >= 3
 STATIC PyModuleDef EfiCompressor = {
   PyModuleDef_HEAD_INIT,
   "efi_compressor",
   "Various EFI Compression Algorithms Extension Module",
-  -1,
-  EfiCompressor_Funcs
+  sizeof(EfiCompressorState),
+  EfiCompressor_Funcs,
+  EfiCompressor_Slots,
+  EfiCompressor_Traverse,
+  EfiCompressor_Clear,
+  EfiCompressor_Free
 };
 
 PyMODINIT_FUNC
 PyInit_efi_compressor(VOID) {
-  return PyModule_Create(&EfiCompressor);
+  return PyModuleDef_Init(&EfiCompressor);
 }
 #else
 PyMODINIT_FUNC
 initefi_compressor(VOID) {
-  Py_InitModule3("efi_compressor", EfiCompressor_Funcs, "Various EFI Compression Algorithms Extension Module");
+  PyObject *Module;
+
+  if (PyType_Ready(&LzmaDecompressor_Type) < 0) {
+    return;
+  }
+  Module = Py_InitModule3("efi_compressor", EfiCompressor_Funcs, "Various EFI Compression Algorithms Extension Module");
+  if (Module == NULL) {
+    return;
+  }
+  Py_INCREF(&LzmaDecompressor_Type);
+  PyModule_AddObject(Module, "LzmaDecompressor", (PyObject *)&LzmaDecompressor_Type);
 }
 #endif
-
-
@@ -72,7 +72,7 @@ checking of the validity of the source data. It just retrieves the "Original Siz
 field from the LZMA_HEADER_SIZE beginning bytes of the source data and output it as DestinationSize.
 And ScratchSize is specific to the decompression implementation.
 
-If SourceSize is less than LZMA_HEADER_SIZE, then ASSERT().
+If SourceSize is less than LZMA_HEADER_SIZE, then EFI_INVALID_PARAMETER is returned.
 
 @param  Source          The source buffer containing the compressed data.
 @param  SourceSize      The size, bytes, of the source buffer.
@@ -95,8 +95,11 @@ LzmaGetInfo (
     )
 {
     UINT64 DecodedSize;
-    ASSERT(SourceSize >= LZMA_HEADER_SIZE);
-    (void)SourceSize;
+
+    if (SourceSize < LZMA_HEADER_SIZE) {
+        return EFI_INVALID_PARAMETER;
+    }
+    *_ScratchSize = 0;
 
     DecodedSize = GetDecodedSizeOfBuf((UINT8*)Source);
 
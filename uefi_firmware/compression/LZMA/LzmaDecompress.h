@@ -38,7 +38,7 @@ extern "C" {
       field from the LZMA_HEADER_SIZE beginning bytes of the source data and output it as DestinationSize.
       And ScratchSize is specific to the decompression implementation.
 
-      If SourceSize is less than LZMA_HEADER_SIZE, then ASSERT().
+      If SourceSize is less than LZMA_HEADER_SIZE, then EFI_INVALID_PARAMETER is returned.
 
       @param  Source          The source buffer containing the compressed data.
       @param  SourceSize      The size, bytes, of the source buffer.
@@ -0,0 +1,567 @@
+/** @file
+
+An incremental LZMA decoder type for the efi_compressor module.
+
+LzmaDecompress decodes a whole section into one buffer. The LzmaDecompressor
+type instead accepts the (EFI, 13-byte header) stream in chunks, and returns
+the output in chunks, built on the LzmaDec_DecodeToDic interface of the SDK.
+
+The dictionary is limited to the declared decoded size (or max_output), a
+match can never reach further back than the output produced so far.
+
+**/
+
+#include "LzmaDecompressor.h"
+
+#include "LZMA/LzmaDecompress.h"
+
+#include <stdlib.h>
+#include <string.h>
+
+#if PY_MAJOR_VERSION >= 3
+#define DECOMPRESS_FORMAT "y*|n:decompress"
+#else
+#define DECOMPRESS_FORMAT "s*|n:decompress"
+#endif
+
+#ifndef Py_XSETREF
+#define Py_XSETREF(Op, Op2) do { \
+    PyObject *Old = (PyObject *)(Op); (Op) = (Op2); Py_XDECREF(Old); \
+  } while (0)
+#endif
+
+#define UNKNOWN_SIZE ((UINT64)-1)
+
+static void * AllocForLzma(ISzAllocPtr p, size_t size) { (void)p; return malloc(size); }
+static void FreeForLzma(ISzAllocPtr p, void *address) { (void)p; free(address); }
+static ISzAlloc SzAllocForLzma = { &AllocForLzma, &FreeForLzma };
+
+typedef struct {
+  PyObject_HEAD
+  CLzmaDec            Decoder;
+  int                 Allocated;    // The header was read, Decoder is allocated
+  UINT64              Size;         // The declared decoded size, or UNKNOWN_SIZE
+  UINT64              TotalOut;
+  Py_ssize_t          MaxOutput;    // Stop decoding after this many bytes, or -1
+  int                 Eof;
+  int                 NeedsInput;
+  Byte                *Input;       // Input not yet consumed by the decoder
+  size_t              InputSize;
+  PyObject            *UnusedData;
+  PyThread_type_lock  Lock;
+} LzmaDecompressorObject;
+
+#define ACQUIRE_LOCK(Object) do { \
+    if (!PyThread_acquire_lock((Object)->Lock, 0)) { \
+      Py_BEGIN_ALLOW_THREADS \
+      PyThread_acquire_lock((Object)->Lock, 1); \
+      Py_END_ALLOW_THREADS \
+    } } while (0)
+#define RELEASE_LOCK(Object) PyThread_release_lock((Object)->Lock)
+
+/*
+ Read the properties and decoded size, and allocate the decoder.
+*/
+STATIC
+int
+ReadHeader(
+  LzmaDecompressorObject  *Self,
+  CONST Byte              *Header
+  )
+{
+  Byte    Properties[LZMA_PROPS_SIZE];
+  UINT64  Limit;
+  UINT32  DictionarySize;
+  int     Index;
+
+  Self->Size = 0;
+  for (Index = 7; Index >= 0; Index--) {
+    Self->Size = (Self->Size << 8) | Header[LZMA_PROPS_SIZE + Index];
+  }
+
+  memcpy(Properties, Header, LZMA_PROPS_SIZE);
+  DictionarySize = Properties[1] | (Properties[2] << 8) |
+    (Properties[3] << 16) | ((UINT32)Properties[4] << 24);
+  Limit = Self->Size;
+  if (Self->MaxOutput >= 0 && (UINT64)Self->MaxOutput < Limit) {
+    Limit = (UINT64)Self->MaxOutput;
+  }
+  if (Limit < DictionarySize) {
+    DictionarySize = (UINT32)Limit;
+    Properties[1] = (Byte)DictionarySize;
+    Properties[2] = (Byte)(DictionarySize >> 8);
+    Properties[3] = (Byte)(DictionarySize >> 16);
+    Properties[4] = (Byte)(DictionarySize >> 24);
+  }
+
+  switch (LzmaDec_Allocate(&Self->Decoder, Properties, LZMA_PROPS_SIZE, &SzAllocForLzma)) {
+  case SZ_OK:
+    break;
+  case SZ_ERROR_MEM:
+    PyErr_NoMemory();
+    return 0;
+  default:
+    PyErr_SetString(PyExc_ValueError, "Invalid LZMA properties\n");
+    return 0;
+  }
+  LzmaDec_Init(&Self->Decoder);
+  Self->Allocated = 1;
+  return 1;
+}
+
+/*
+ Decode from Source, appending at most MaxLength bytes (or all, if negative)
+ to the returned bytes. *Consumed is set to the input used.
+*/
+STATIC
+PyObject*
+DecodeBuffer(
+  LzmaDecompressorObject  *Self,
+  CONST Byte              *Source,
+  size_t                  SourceSize,
+  Py_ssize_t              MaxLength,
+  size_t                  *Consumed
+  )
+{
+  CLzmaDec      *Decoder;
+  PyObject      *Result;
+  ELzmaStatus   Status;
+  SRes          LzmaResult;
+  size_t        Position;
+  size_t        Start;
+  size_t        InputLength;
+  size_t        Produced;
+  UINT64        Allowed;
+  Py_ssize_t    OutputSize;
+
+  Decoder = &Self->Decoder;
+  Position = 0;
+  OutputSize = 0;
+  Status = LZMA_STATUS_NOT_SPECIFIED;
+
+  Result = PyBytes_FromStringAndSize(NULL, (MaxLength >= 0 && MaxLength < 0x10000) ? MaxLength : 0x10000);
+  if (Result == NULL) {
+    return NULL;
+  }
+
+  while (!Self->Eof) {
+    if (Decoder->dicPos == Decoder->dicBufSize) {
+      Decoder->dicPos = 0;
+    }
+    Start = Decoder->dicPos;
+    Allowed = Decoder->dicBufSize - Start;
+    if (MaxLength >= 0 && (UINT64)(MaxLength - OutputSize) < Allowed) {
+      Allowed = (UINT64)(MaxLength - OutputSize);
+    }
+    if (Self->Size != UNKNOWN_SIZE && Self->Size - Self->TotalOut < Allowed) {
+      Allowed = Self->Size - Self->TotalOut;
+    }
+    if (Self->MaxOutput >= 0 && (UINT64)Self->MaxOutput - Self->TotalOut < Allowed) {
+      Allowed = (UINT64)Self->MaxOutput - Self->TotalOut;
+    }
+    if (Allowed == 0) {
+      break;
+    }
+
+    InputLength = SourceSize - Position;
+    Py_BEGIN_ALLOW_THREADS
+    LzmaResult = LzmaDec_DecodeToDic(Decoder, Start + (size_t)Allowed,
+      Source + Position, &InputLength, LZMA_FINISH_ANY, &Status);
+    Py_END_ALLOW_THREADS
+    Position += InputLength;
+    Produced = Decoder->dicPos - Start;
+
+    if (Produced > 0) {
+      if (OutputSize + (Py_ssize_t)Produced > PyBytes_GET_SIZE(Result)) {
+        Py_ssize_t NewSize = PyBytes_GET_SIZE(Result) * 2;
+        if (NewSize < OutputSize + (Py_ssize_t)Produced) {
+          NewSize = OutputSize + (Py_ssize_t)Produced;
+        }
+        if (_PyBytes_Resize(&Result, NewSize) < 0) {
+          return NULL;
+        }
+      }
+      memcpy(PyBytes_AS_STRING(Result) + OutputSize, Decoder->dic + Start, Produced);
+      OutputSize += (Py_ssize_t)Produced;
+      Self->TotalOut += Produced;
+    }
+
+    if (LzmaResult != SZ_OK) {
+      Py_DECREF(Result);
+      PyErr_SetString(PyExc_ValueError, "Failed to decompress\n");
+      return NULL;
+    }
+    if (Status == LZMA_STATUS_FINISHED_WITH_MARK ||
+        (Self->Size != UNKNOWN_SIZE && Self->TotalOut == Self->Size) ||
+        (Self->MaxOutput >= 0 && Self->TotalOut >= (UINT64)Self->MaxOutput)) {
+      Self->Eof = 1;
+    }
+    if (Status == LZMA_STATUS_NEEDS_MORE_INPUT || (InputLength == 0 && Produced == 0)) {
+      break;
+    }
+  }
+
+  *Consumed = Position;
+  Self->NeedsInput = !Self->Eof && Position == SourceSize &&
+    !(MaxLength >= 0 && OutputSize == MaxLength);
+
+  if (OutputSize != PyBytes_GET_SIZE(Result) && _PyBytes_Resize(&Result, OutputSize) < 0) {
+    return NULL;
+  }
+  return Result;
+}
+
+/*
+ Keep Source[Consumed:] as the unconsumed input (or as unused data at the end).
+*/
+STATIC
+int
+KeepInput(
+  LzmaDecompressorObject  *Self,
+  CONST Byte              *Source,
+  size_t                  SourceSize,
+  size_t                  Consumed
+  )
+{
+  Byte    *Input;
+  size_t  Remaining;
+
+  Remaining = SourceSize - Consumed;
+  if (Self->Eof) {
+    PyObject *Unused = PyBytes_FromStringAndSize((CONST char *)Source + Consumed, (Py_ssize_t)Remaining);
+    if (Unused == NULL) {
+      return 0;
+    }
+    Py_XSETREF(Self->UnusedData, Unused);
+    Remaining = 0;
+  }
+
+  Input = NULL;
+  if (Remaining > 0) {
+    Input = (Byte *)malloc(Remaining);
+    if (Input == NULL) {
+      PyErr_NoMemory();
+      return 0;
+    }
+    memcpy(Input, Source + Consumed, Remaining);
+  }
+  free(Self->Input);
+  Self->Input = Input;
+  Self->InputSize = Remaining;
+  return 1;
+}
+
+PyDoc_STRVAR(Decompress_Docs,
+"decompress(data, max_length=-1): Decode data, return at most max_length bytes.\n\n"
+"Input beyond what was decoded is kept for the next call. After the stream ends\n"
+"(or max_output bytes were produced) the remaining input is in unused_data.\n");
+
+STATIC
+PyObject*
+LzmaDecompressor_Decompress(
+  LzmaDecompressorObject  *Self,
+  PyObject                *Args
+  )
+{
+  Py_buffer   Data;
+  Py_ssize_t  MaxLength;
+  PyObject    *Result;
+  Byte        *Source;
+  size_t      SourceSize;
+  size_t      Consumed;
+  int         Joined;
+
+  MaxLength = -1;
+  if (!PyArg_ParseTuple(Args, DECOMPRESS_FORMAT, &Data, &MaxLength)) {
+    return NULL;
+  }
+
+  ACQUIRE_LOCK(Self);
+  Result = NULL;
+  if (Self->Eof) {
+    PyErr_SetString(PyExc_EOFError, "Already at end of stream");
+    goto Done;
+  }
+
+  // Decode from the caller's buffer, unless earlier input is still pending.
+  Joined = (Self->InputSize > 0);
+  Source = (Byte *)Data.buf;
+  SourceSize = (size_t)Data.len;
+  if (Joined) {
+    Source = (Byte *)malloc(Self->InputSize + SourceSize);
+    if (Source == NULL) {
+      PyErr_NoMemory();
+      goto Done;
+    }
+    memcpy(Source, Self->Input, Self->InputSize);
+    memcpy(Source + Self->InputSize, Data.buf, (size_t)Data.len);
+    SourceSize += Self->InputSize;
+  }
+
+  Consumed = 0;
+  if (!Self->Allocated) {
+    if (SourceSize < LZMA_HEADER_SIZE) {
+      Self->NeedsInput = 1;
+      if (KeepInput(Self, Source, SourceSize, 0)) {
+        Result = PyBytes_FromStringAndSize(NULL, 0);
+      }
+      goto Release;
+    }
+    if (!ReadHeader(Self, Source)) {
+      goto Release;
+    }
+    Consumed = LZMA_HEADER_SIZE;
+  }
+
+  if (Self->Size == 0 || Self->MaxOutput == 0) {
+    Self->Eof = 1;
+    Result = PyBytes_FromStringAndSize(NULL, 0);
+    Self->NeedsInput = 0;
+  } else {
+    size_t Used = 0;
+    Result = DecodeBuffer(Self, Source + Consumed, SourceSize - Consumed, MaxLength, &Used);
+    Consumed += Used;
+  }
+  if (Result != NULL && !KeepInput(Self, Source, SourceSize, Consumed)) {
+    Py_CLEAR(Result);
+  }
+
+Release:
+  if (Joined) {
+    free(Source);
+  }
+Done:
+  RELEASE_LOCK(Self);
+  PyBuffer_Release(&Data);
+  return Result;
+}
+
+STATIC
+int
+LzmaDecompressor_Init(
+  LzmaDecompressorObject  *Self,
+  PyObject                *Args,
+  PyObject                *Kwargs
+  )
+{
+  static char *Keywords[] = {"max_output", NULL};
+  PyObject    *MaxOutput;
+
+  MaxOutput = Py_None;
+  if (!PyArg_ParseTupleAndKeywords(Args, Kwargs, "|O:LzmaDecompressor", Keywords, &MaxOutput)) {
+    return -1;
+  }
+  Self->MaxOutput = -1;
+  if (MaxOutput != Py_None) {
+    Self->MaxOutput = PyNumber_AsSsize_t(MaxOutput, PyExc_OverflowError);
+    if (Self->MaxOutput == -1 && PyErr_Occurred()) {
+      return -1;
+    }
+    if (Self->MaxOutput < 0) {
+      PyErr_SetString(PyExc_ValueError, "max_output must not be negative");
+      return -1;
+    }
+  }
+
+  if (Self->Lock == NULL) {
+    Self->Lock = PyThread_allocate_lock();
+    if (Self->Lock == NULL) {
+      PyErr_NoMemory();
+      return -1;
+    }
+  }
+  if (Self->Allocated) {
+    LzmaDec_Free(&Self->Decoder, &SzAllocForLzma);
+  }
+  LzmaDec_Construct(&Self->Decoder);
+  Self->Allocated = 0;
+  Self->Size = UNKNOWN_SIZE;
+  Self->TotalOut = 0;
+  Self->Eof = 0;
+  Self->NeedsInput = 1;
+  free(Self->Input);
+  Self->Input = NULL;
+  Self->InputSize = 0;
+  Py_XSETREF(Self->UnusedData, PyBytes_FromStringAndSize(NULL, 0));
+  if (Self->UnusedData == NULL) {
+    return -1;
+  }
+  return 0;
+}
+
+STATIC
+void
+LzmaDecompressor_Dealloc(
+  LzmaDecompressorObject  *Self
+  )
+{
+  if (Self->Allocated) {
+    LzmaDec_Free(&Self->Decoder, &SzAllocForLzma);
+  }
+  free(Self->Input);
+  Py_XDECREF(Self->UnusedData);
+  if (Self->Lock != NULL) {
+    PyThread_free_lock(Self->Lock);
+  }
+#if PY_MAJOR_VERSION >= 3
+  {
+    // Instances of a heap type own a reference to the type.
+    PyTypeObject *Type = Py_TYPE(Self);
+    Type->tp_free((PyObject *)Self);
+    Py_DECREF(Type);
+  }
+#else
+  Py_TYPE(Self)->tp_free((PyObject *)Self);
+#endif
+}
+
+STATIC
+PyObject*
+LzmaDecompressor_GetSize(
+  LzmaDecompressorObject  *Self,
+  void                    *Closure
+  )
+{
+  if (!Self->Allocated || Self->Size == UNKNOWN_SIZE) {
+    Py_RETURN_NONE;
+  }
+  return PyLong_FromUnsignedLongLong(Self->Size);
+}
+
+STATIC
+PyObject*
+LzmaDecompressor_GetFlag(
+  LzmaDecompressorObject  *Self,
+  void                    *Closure
+  )
+{
+  return PyBool_FromLong(*(int *)((char *)Self + (size_t)Closure));
+}
+
+STATIC
+PyObject*
+LzmaDecompressor_GetTotalOut(
+  LzmaDecompressorObject  *Self,
+  void                    *Closure
+  )
+{
+  return PyLong_FromUnsignedLongLong(Self->TotalOut);
+}
+
+STATIC
+PyObject*
+LzmaDecompressor_GetUnusedData(
+  LzmaDecompressorObject  *Self,
+  void                    *Closure
+  )
+{
+  if (Self->UnusedData == NULL) {
+    return PyBytes_FromStringAndSize(NULL, 0);
+  }
+  Py_INCREF(Self->UnusedData);
+  return Self->UnusedData;
+}
+
+STATIC PyMethodDef LzmaDecompressor_Methods[] = {
+  {"decompress", (PyCFunction)LzmaDecompressor_Decompress, METH_VARARGS, Decompress_Docs},
+  {NULL, NULL, 0, NULL}
+};
+
+STATIC PyGetSetDef LzmaDecompressor_GetSet[] = {
+  {"eof", (getter)LzmaDecompressor_GetFlag, NULL,
+    "True once the stream ended or max_output bytes were decoded.",
+    (void *)offsetof(LzmaDecompressorObject, Eof)},
+  {"needs_input", (getter)LzmaDecompressor_GetFlag, NULL,
+    "False if decompress can return more output without further input.",
+    (void *)offsetof(LzmaDecompressorObject, NeedsInput)},
+  {"size", (getter)LzmaDecompressor_GetSize, NULL,
+    "The decoded size declared by the header, None until it is read.", NULL},
+  {"total_out", (getter)LzmaDecompressor_GetTotalOut, NULL,
+    "The number of bytes decoded so far.", NULL},
+  {"unused_data", (getter)LzmaDecompressor_GetUnusedData, NULL,
+    "Input following the end of the decoded stream.", NULL},
+  {NULL}
+};
+
+PyDoc_STRVAR(LzmaDecompressor_Docs,
+"LzmaDecompressor(max_output=None): Incrementally decode an LZMA stream.\n\n"
+"The stream uses the 13-byte header of LzmaCompress (properties, decoded size).\n"
+"Decoding stops after max_output bytes, if given.\n");
+
+#if PY_MAJOR_VERSION >= 3
+STATIC PyType_Slot LzmaDecompressor_Slots[] = {
+  {Py_tp_dealloc, (void *)LzmaDecompressor_Dealloc},
+  {Py_tp_doc, (void *)LzmaDecompressor_Docs},
+  {Py_tp_methods, LzmaDecompressor_Methods},
+  {Py_tp_getset, LzmaDecompressor_GetSet},
+  {Py_tp_init, (void *)LzmaDecompressor_Init},
+  {Py_tp_new, (void *)PyType_GenericNew},
+  {0, NULL}
+};
+
+STATIC PyType_Spec LzmaDecompressor_Spec = {
+  "efi_compressor.LzmaDecompressor",
+  sizeof(LzmaDecompressorObject),
+  0,
+  Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,
+  LzmaDecompressor_Slots
+};
+
+/*
+ Create the LzmaDecompressor type of a module object, see the module state
+ of efi_compressor.
+*/
+PyObject*
+LzmaDecompressor_CreateType(
+  PyObject    *Module
+  )
+{
+#if PY_VERSION_HEX >= 0x03090000
+  return PyType_FromModuleAndSpec(Module, &LzmaDecompressor_Spec, NULL);
+#else
+  (void)Module;
+  return PyType_FromSpec(&LzmaDecompressor_Spec);
+#endif
+}
+#else
+PyTypeObject LzmaDecompressor_Type = {
+  PyVarObject_HEAD_INIT(NULL, 0)
+  "efi_compressor.LzmaDecompressor",          /* tp_name */
+  sizeof(LzmaDecompressorObject),             /* tp_basicsize */
+  0,                                          /* tp_itemsize */
+  (destructor)LzmaDecompressor_Dealloc,       /* tp_dealloc */
+  0,                                          /* tp_print / tp_vectorcall_offset */
+  0,                                          /* tp_getattr */
+  0,                                          /* tp_setattr */
+  0,                                          /* tp_compare / tp_as_async */
+  0,                                          /* tp_repr */
+  0,                                          /* tp_as_number */
+  0,                                          /* tp_as_sequence */
+  0,                                          /* tp_as_mapping */
+  0,                                          /* tp_hash */
+  0,                                          /* tp_call */
+  0,                                          /* tp_str */
+  0,                                          /* tp_getattro */
+  0,                                          /* tp_setattro */
+  0,                                          /* tp_as_buffer */
+  Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,   /* tp_flags */
+  LzmaDecompressor_Docs,                      /* tp_doc */
+  0,                                          /* tp_traverse */
+  0,                                          /* tp_clear */
+  0,                                          /* tp_richcompare */
+  0,                                          /* tp_weaklistoffset */
+  0,                                          /* tp_iter */
+  0,                                          /* tp_iternext */
+  LzmaDecompressor_Methods,                   /* tp_methods */
+  0,                                          /* tp_members */
+  LzmaDecompressor_GetSet,                    /* tp_getset */
+  0,                                          /* tp_base */
+  0,                                          /* tp_dict */
+  0,                                          /* tp_descr_get */
+  0,                                          /* tp_descr_set */
+  0,                                          /* tp_dictoffset */
+  (initproc)LzmaDecompressor_Init,            /* tp_init */
+  0,                                          /* tp_alloc */
+  PyType_GenericNew,                          /* tp_new */
+};
+#endif
@@ -0,0 +1,18 @@
+/** @file
+
+An incremental LZMA decoder type for the efi_compressor module.
+
+**/
+
+#ifndef LZMADECOMPRESSOR_H
+#define LZMADECOMPRESSOR_H
+
+#include <Python.h>
+
+#if PY_MAJOR_VERSION >= 3
+PyObject *LzmaDecompressor_CreateType(PyObject *Module);
+#else
+extern PyTypeObject LzmaDecompressor_Type;
+#endif
+
+#endif
@@ -29,6 +29,18 @@ Abstract:
 //#include "CommonLib.h"
 #include "BaseTypes.h"
 
+//
+// The compressors keep their state in file-level variables, one copy per
+// thread, so threads may compress concurrently.
+//
+#if defined(_MSC_VER)
+#define THREAD_LOCAL  __declspec(thread)
+#elif defined(__STDC_VERSION__) && __STDC_VERSION__ >= 201112L
+#define THREAD_LOCAL  _Thread_local
+#else
+#define THREAD_LOCAL  __thread
+#endif
+
 /*++
 
 Routine Description:
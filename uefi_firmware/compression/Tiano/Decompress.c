@@ -70,6 +70,7 @@ typedef struct {
   UINT32  mOrigSize;
 
   UINT16  mBadTableFlag;
+  UINT16  mPBit;      // Bits of the position set size, see EFIPBIT/MAXPBIT
 
   UINT16  mLeft[2 * NC - 1];
   UINT16  mRight[2 * NC - 1];
@@ -80,8 +81,6 @@ typedef struct {
 
 } SCRATCH_DATA;
 
-STATIC UINT16 mPbit = EFIPBIT;
-
 /**
   Shift mBitBuf NumOfBits left. Read in NumOfBits of bits from source.
 
@@ -538,7 +537,7 @@ DecodeC (
       return 0;
     }
 
-    Sd->mBadTableFlag = ReadPTLen (Sd, MAXNP, mPbit, (UINT16) (-1));
+    Sd->mBadTableFlag = ReadPTLen (Sd, MAXNP, Sd->mPBit, (UINT16) (-1));
     if (Sd->mBadTableFlag != 0) {
       return 0;
     }
@@ -687,6 +686,7 @@ GetInfo (
   @param Scratch     The buffer used internally by the decompress routine.
                      This buffer is needed to store intermediate data.
   @param ScratchSize The size of scratch buffer.
+  @param PBit        The bits of the position set size (EFIPBIT or MAXPBIT).
 
   @retval EFI_SUCCESS           Decompression is successful.
   @retval EFI_INVALID_PARAMETER The source data is corrupted.
@@ -698,7 +698,8 @@ Decompress (
   IN OUT  VOID    *Destination,
   IN      size_t  DstSize,
   IN OUT  VOID    *Scratch,
-  IN      size_t  ScratchSize
+  IN      size_t  ScratchSize,
+  IN      UINT16  PBit
   )
 {
   UINT32        Index;
@@ -744,6 +745,7 @@ Decompress (
   Sd->mDstBase  = Dst;
   Sd->mCompSize = CompSize;
   Sd->mOrigSize = OrigSize;
+  Sd->mPBit     = PBit;
 
   //
   // Fill the first BITBUFSIZ bits
@@ -835,8 +837,7 @@ EfiDecompress (
   IN      size_t  ScratchSize
   )
 {
-  mPbit = EFIPBIT;
-  return Decompress (Source, SrcSize, Destination, DstSize, Scratch, ScratchSize);
+  return Decompress (Source, SrcSize, Destination, DstSize, Scratch, ScratchSize, EFIPBIT);
 }
 
 /**
@@ -863,8 +864,7 @@ TianoDecompress (
   IN      size_t  ScratchSize
   )
 {
-  mPbit = MAXPBIT;
-  return Decompress (Source, SrcSize, Destination, DstSize, Scratch, ScratchSize);
+  return Decompress (Source, SrcSize, Destination, DstSize, Scratch, ScratchSize, MAXPBIT);
 }
 
 
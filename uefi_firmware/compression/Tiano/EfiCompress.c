@@ -244,23 +244,23 @@ MakeTree (
 
 
 //
-//  Global Variables
+//  Global Variables, one copy per thread (see THREAD_LOCAL)
 //
 
-STATIC UINT8  *mSrc, *mDst, *mSrcUpperLimit, *mDstUpperLimit;
+STATIC THREAD_LOCAL UINT8  *mSrc, *mDst, *mSrcUpperLimit, *mDstUpperLimit;
 
-STATIC UINT8  *mLevel, *mText, *mChildCount, *mBuf, mCLen[NC], mPTLen[NPT], *mLen;
-STATIC INT16  mHeap[NC + 1];
-STATIC ptrdiff_t  mRemainder, mMatchLen, mBitCount, mHeapSize, mN;
-STATIC size_t mBufSiz = 0;
-STATIC size_t mOutputPos, mOutputMask, mSubBitBuf, mCrc;
-STATIC size_t mCompSize, mOrigSize;
+STATIC THREAD_LOCAL UINT8  *mLevel, *mText, *mChildCount, *mBuf, mCLen[NC], mPTLen[NPT], *mLen;
+STATIC THREAD_LOCAL INT16  mHeap[NC + 1];
+STATIC THREAD_LOCAL ptrdiff_t  mRemainder, mMatchLen, mBitCount, mHeapSize, mN;
+STATIC THREAD_LOCAL size_t mBufSiz = 0;
+STATIC THREAD_LOCAL size_t mOutputPos, mOutputMask, mSubBitBuf, mCrc;
+STATIC THREAD_LOCAL size_t mCompSize, mOrigSize;
 
-STATIC UINT16 *mFreq, *mSortPtr, mLenCnt[17], mLeft[2 * NC - 1], mRight[2 * NC - 1],
+STATIC THREAD_LOCAL UINT16 *mFreq, *mSortPtr, mLenCnt[17], mLeft[2 * NC - 1], mRight[2 * NC - 1],
               mCrcTable[UINT8_MAX + 1], mCFreq[2 * NC - 1],mCCode[NC],
               mPFreq[2 * NP - 1], mPTCode[NPT], mTFreq[2 * NT - 1];
 
-STATIC NODE   mPos, mMatchPos, mAvail, *mPosition, *mParent, *mPrev, *mNext = NULL;
+STATIC THREAD_LOCAL NODE   mPos, mMatchPos, mAvail, *mPosition, *mParent, *mPrev, *mNext = NULL;
 
 
 //
@@ -1175,7 +1175,7 @@ Returns: (VOID)
 
 --*/
 {
-  STATIC size_t CPos;
+  STATIC THREAD_LOCAL size_t CPos;
 
   if ((mOutputMask >>= 1) == 0) { //-V1019
     mOutputMask = 1U << (UINT8_BIT - 1);
@@ -1366,7 +1366,7 @@ Returns: (VOID)
 
 --*/
 {
-  STATIC ptrdiff_t Depth = 0;
+  STATIC THREAD_LOCAL ptrdiff_t Depth = 0;
 
   if (i < mN) {
     mLenCnt[(Depth < 16) ? Depth : 16]++;
@@ -46,9 +46,10 @@ class FlashRegion(FirmwareObject, BaseObject):
         from .uefi import FirmwareVolume
 
         if self.name == "bios":
-            data = self.data
+            data = self.view
             while True:
-                volume_index = search_firmware_volumes(data, limit=1)
+                volume_index = search_firmware_volumes(
+                    data, limit=1, validate=True)
                 if len(volume_index) == 0:
                     break
                 fv = FirmwareVolume(data[volume_index[0] - 40:])
@@ -58,18 +59,17 @@ class FlashRegion(FirmwareObject, BaseObject):
                 else:
                     data = data[volume_index[0] + 8:]
         if self.name == "me":
-            data = self.data
+            data = self.view
             me = MeContainer(data)
             if me.valid_header:
                 self.sections.append(me)
-        for section in self.sections:
-            section.process()
+        self.process_children(self.sections, defer=False)
         return True
 
     def showinfo(self, ts='', index=None):
         print("%s%s type= %s, size= 0x%x (%d bytes) details[ %s ]" % (
             ts, blue("Flash Region"), green(self.name),
-            len(self.data), len(self.data),
+            len(self.view), len(self.view),
             ", ".join(["%s: 0x%02x" % (k, v) for k, v in list(self.attrs.items())])
         ))
         for section in self.sections:
@@ -77,7 +77,7 @@ class FlashRegion(FirmwareObject, BaseObject):
         pass
 
     def dump(self, parent=""):
-        dump_data(os.path.join(parent, "region-%s.fd" % self.name), self.data)
+        dump_data(os.path.join(parent, "region-%s.fd" % self.name), self.view)
 
         parent = os.path.join(parent, "region-%s" % self.name)
         for section in self.sections:
@@ -94,6 +94,7 @@ class FlashDescriptor(FirmwareObject):
         if self.size < 20:
             return
 
+        data = memview(data)
         self.padding, self.header = struct.unpack("<16s4s", data[:16 + 4])
         if self.header != FLASH_HEADER:
             return
@@ -115,19 +116,19 @@ class FlashDescriptor(FirmwareObject):
         def _region_offset(base):
             return base * 0x1000
 
-        self.map = DescriptorMap(self.data[20:20 + DescriptorMap.size])
+        self.map = DescriptorMap(self.view[20:20 + DescriptorMap.size])
         region_offset = (self.map.structure.RegionBase * 0x10)
         self.region = RegionSection(
-            self.data[region_offset:region_offset + RegionSection.size])
+            self.view[region_offset:region_offset + RegionSection.size])
         master_offset = (self.map.structure.MasterBase * 0x10)
         self.master = MasterSection(
-            self.data[master_offset:master_offset + MasterSection.size])
+            self.view[master_offset:master_offset + MasterSection.size])
 
         bios_base = self.region.structure.BiosBase
         bios_limit = self.region.structure.BiosLimit
         bios_size = _region_offset(
             bios_base) + _region_size(bios_base, bios_limit)
-        bios = self.data[_region_offset(bios_base): bios_size]
+        bios = self.view[_region_offset(bios_base): bios_size]
 
         bios_region = FlashRegion(bios, "bios", {
             "base": bios_base,
@@ -136,13 +137,12 @@ class FlashDescriptor(FirmwareObject):
             "read": self.master.structure.BiosRead,
             "write": self.master.structure.BiosWrite
         })
-        bios_region.process()
         self.regions.append(bios_region)
 
         me_base = self.region.structure.MeBase
         me_limit = self.region.structure.MeLimit
         me_size = _region_offset(me_base) + _region_size(me_base, me_limit)
-        me = self.data[_region_offset(me_base): me_size]
+        me = self.view[_region_offset(me_base): me_size]
 
         me_region = FlashRegion(me, "me", {
             "base": me_base,
@@ -151,13 +151,12 @@ class FlashDescriptor(FirmwareObject):
             "read": self.master.structure.MeRead,
             "write": self.master.structure.MeWrite
         })
-        me_region.process()
         self.regions.append(me_region)
 
         gbe_base = self.region.structure.GbeBase
         gbe_limit = self.region.structure.GbeLimit
         gbe_size = _region_offset(gbe_base) + _region_size(gbe_base, gbe_limit)
-        gbe = self.data[_region_offset(gbe_base): gbe_size]
+        gbe = self.view[_region_offset(gbe_base): gbe_size]
 
         gbe_region = FlashRegion(gbe, "gbe", {
             "base": gbe_base,
@@ -166,20 +165,20 @@ class FlashDescriptor(FirmwareObject):
             "read": self.master.structure.GbeRead,
             "write": self.master.structure.GbeWrite
         })
-        gbe_region.process()
         self.regions.append(gbe_region)
 
         pdr_base = self.region.structure.PdrBase
         pdr_limit = self.region.structure.PdrLimit
         pdr_size = _region_offset(pdr_base) + _region_size(pdr_base, pdr_limit)
-        pdr = self.data[_region_offset(pdr_base): pdr_size]
+        pdr = self.view[_region_offset(pdr_base): pdr_size]
 
         pdr_region = FlashRegion(pdr, "pdr", {
             "base": pdr_base,
             "limit": pdr_limit,
         })
-        pdr_region.process()
         self.regions.append(pdr_region)
+
+        self.process_children(self.regions, defer=False)
         return True
 
     def showinfo(self, ts='', index=None):
@@ -210,7 +209,7 @@ class FlashDescriptor(FirmwareObject):
         return { 'regions': res }
 
     def dump(self, parent, index=None):
-        dump_data(os.path.join(parent, "flash.fd"), self.data)
+        dump_data(os.path.join(parent, "flash.fd"), self.view)
 
         parent = os.path.join(parent, "regions")
         for region in self.regions:
@@ -1,36 +1,220 @@
-from . import efiguids
-from . import efiguids_ami
-from . import efiguids_dell
-from . import efiguids_lenovo
-from . import efiguids_asrock
-from . import efiguids_qualcomm
+'''A database of GUID names.
 
-from ..utils import aguid
+The GUID tables (efiguids*.py) are only imported when a name is first looked
+up, and not at all if the precompiled index (index.bin) is present. Names are
+kept in a single dictionary keyed by the raw (little-endian) 16-byte GUID.
+'''
 
-GUID_TABLES = [
-    efiguids.GUIDs,
-    efiguids_ami.GUIDs,
-    efiguids_dell.GUIDs,
-    efiguids_lenovo.GUIDs,
-    efiguids_asrock.GUIDs,
-    efiguids_qualcomm.GUIDS,
-]
+import os
+import re
+import struct
+import threading
 
+from ..structs.uefi_structs import guid_bytes
 
-def get_guid_name(guid):
-    raw_guid = aguid(guid)
-
-    for guid_table in GUID_TABLES:
-        for name, match_guid in list(guid_table.items()):
-            match = True
-            for i, k in enumerate(raw_guid):
-                if match_guid[i] != k:
-                    match = False
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index.bin")
+'''string: The precompiled index of the GUID tables, see save_index.'''
+
+_INDEX_MAGIC = b"GUIDIDX1"
+
+_DEC_GUID = (
+    r"^\s*(\w+)\s*=\s*\{\s*(0x[0-9a-fA-F]+)\s*,\s*(0x[0-9a-fA-F]+)\s*,"
+    r"\s*(0x[0-9a-fA-F]+)\s*,\s*\{((?:\s*0x[0-9a-fA-F]+\s*,?){8})\}\s*\}")
+
+
+def _load_tables():
+    from . import efiguids
+    from . import efiguids_ami
+    from . import efiguids_dell
+    from . import efiguids_lenovo
+    from . import efiguids_asrock
+    from . import efiguids_qualcomm
+
+    return [
+        efiguids.GUIDs,
+        efiguids_ami.GUIDs,
+        efiguids_dell.GUIDs,
+        efiguids_lenovo.GUIDs,
+        efiguids_asrock.GUIDs,
+        efiguids_qualcomm.GUIDS,
+    ]
+
+
+def raw_guid(guid):
+    '''Return the raw 16-byte form of a GUID.
+
+    Args:
+        guid: Raw bytes (shorter input is zero-padded), an int array as used
+            by the GUID tables, or an RFC4122 string.
+
+    Return:
+        bytes: The little-endian GUID.
+    '''
+    if isinstance(guid, str):
+        return guid_bytes(guid)
+    if isinstance(guid, (list, tuple)):
+        return struct.pack("<IHH8B", *guid)
+    guid = bytes(guid)
+    if len(guid) < 16:
+        guid += b"\x00" * (16 - len(guid))
+    return guid[:16]
+
+
+class GuidDatabase(object):
+    '''GUID names keyed by the raw GUID.
+
+    When a GUID is added more than once the first name is kept, unless the
+    addition asks to override it.
+    '''
+
+    def __init__(self):
+        self.names = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, guid):
+        return raw_guid(guid) in self.names
+
+    def get(self, guid):
+        '''Return the name of a GUID, or None.'''
+        return self.names.get(raw_guid(guid))
+
+    def add(self, guid, name, override=False):
+        '''Add a single GUID name.'''
+        guid = raw_guid(guid)
+        if override or guid not in self.names:
+            self.names[guid] = name
+
+    def update(self, table, override=False):
+        '''Add a table of names to int arrays (the efiguids format).'''
+        for name, guid in table.items():
+            self.add(guid, name, override)
+
+    def load_dec(self, path, override=False):
+        '''Add the GUIDs, Protocols, and PPIs declared in an EDK2 .dec file.
+
+        Return:
+            int: The number of declarations read.
+        '''
+        count = 0
+        with open(path, "r") as fh:
+            for line in fh:
+                match = re.match(_DEC_GUID, line.split("#", 1)[0])
+                if match is None:
+                    continue
+                values = [int(value, 16) for value in match.group(2, 3, 4)]
+                values += [
+                    int(value, 16) for value in match.group(5).split(",")
+                    if value.strip()]
+                self.add(values, match.group(1), override)
+                count += 1
+        return count
+
+    def load_csv(self, path, override=False):
+        '''Add GUID names from a CSV file of (GUID string, name) rows.
+
+        The columns may be in either order, rows without a GUID are ignored.
+
+        Return:
+            int: The number of rows read.
+        '''
+        import csv
+
+        count = 0
+        with open(path, "r") as fh:
+            for row in csv.reader(fh):
+                if len(row) < 2:
+                    continue
+                for guid, name in ((row[0], row[1]), (row[1], row[0])):
+                    try:
+                        guid = raw_guid(guid.strip())
+                    except ValueError:
+                        continue
+                    self.add(guid, name.strip(), override)
+                    count += 1
                     break
-            if match:
-                return name
-    return None
+        return count
+
+    def load_index(self, path, override=False):
+        '''Add the names from an index written by save_index.'''
+        with open(path, "rb") as fh:
+            data = fh.read()
+        if data[:len(_INDEX_MAGIC)] != _INDEX_MAGIC:
+            raise ValueError("%s is not a GUID index" % path)
+        count, = struct.unpack("<I", data[8:12])
+        offset = 12
+        for _ in range(count):
+            guid = data[offset:offset + 16]
+            size = data[offset + 16]
+            name = data[offset + 17:offset + 17 + size].decode("utf-8")
+            offset += 17 + size
+            if override or guid not in self.names:
+                self.names[guid] = name
+
+    def save_index(self, path):
+        '''Write the names as a binary index, for load_index.'''
+        records = [_INDEX_MAGIC, struct.pack("<I", len(self.names))]
+        for guid, name in self.names.items():
+            name = name.encode("utf-8")[:255]
+            records.append(guid + struct.pack("<B", len(name)) + name)
+        with open(path, "wb") as fh:
+            fh.write(b"".join(records))
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    '''Return the GUID database used by get_guid_name.
+
+    The database is loaded from INDEX_PATH, or from the GUID tables if the
+    index is not present, on the first call. Concurrent first calls load
+    the database once.
+    '''
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                if os.path.exists(INDEX_PATH):
+                    database = GuidDatabase()
+                    database.load_index(INDEX_PATH)
+                else:
+                    database = build_database()
+                _database = database
+    return _database
+
+
+def build_database():
+    '''Return a new GUID database built from the GUID tables.'''
+    database = GuidDatabase()
+    for table in _load_tables():
+        database.update(table)
+    return database
+
+
+def get_guid_name(guid):
+    '''Return the name of a GUID (see raw_guid for the accepted forms).'''
+    return get_database().get(guid)
+
+
+def load_dec(path, override=False):
+    '''Add the declarations of an EDK2 .dec file to the GUID database.'''
+    return get_database().load_dec(path, override)
+
+
+def load_csv(path, override=False):
+    '''Add the (GUID, name) rows of a CSV file to the GUID database.'''
+    return get_database().load_csv(path, override)
 
 
 def get_tables():
-    return GUID_TABLES
+    return _load_tables()
+
+
+def __getattr__(name):
+    # GUID_TABLES is kept for compatibility, importing it loads the tables.
+    if name == "GUID_TABLES":
+        return _load_tables()
+    raise AttributeError(name)
@@ -0,0 +1,275 @@
+'''A columnar index of the objects within a parsed image.
+
+Each object of the tree is a row, in pre-order, and a row's position is the
+object's id. The columns are arrays of integers (see ObjectIndex.COLUMNS),
+and the GUIDs a single bytearray of 16 bytes per row, so queries over an
+image are filters over flat arrays rather than walks over nested objects:
+
+  index = firmware.index()
+  drivers = index.select(file_type=0x07, max_length=0x1000)
+  sections = index.select(type="FirmwareFileSystemSection", guid=guid)
+  firmware_files = [index.nodes[i] for i in drivers]
+
+When NumPy is installed, ObjectIndex.to_numpy returns the columns as NumPy
+arrays sharing the index's memory, and select filters them with vectorized
+comparisons.
+'''
+
+import hashlib
+import operator
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .utils import Guid, memview, view_offset
+from .uefi import FirmwareFile, FirmwareFileSystemSection
+
+_NO_GUID = b"\x00" * 16
+
+
+class ObjectIndex(object):
+    '''A table of the objects within a firmware object, one row per object.
+
+    Columns:
+        parent: The id of the parent object, -1 for the root.
+        end: The id following the object's last descendant, the descendants
+            of object i are the ids i + 1 up to end[i].
+        depth: The depth below the root, 0 for the root.
+        buffer: The position in 'buffers' of the object the node's bytes are
+            a view of, 0 for the image input, other buffers hold
+            decompressed content. -1 if the object has no content.
+        offset: The offset of the object's bytes within its buffer.
+        length: The length of the object's bytes, headers included.
+        type: The position in 'types' of the object's class name.
+        file_type: The type of a FirmwareFile, otherwise -1.
+        section_type: The type of a FirmwareFileSystemSection, otherwise -1.
+        hash: The first 8 bytes of the BLAKE2b digest of the object's bytes,
+            when hashed, otherwise 0.
+    '''
+
+    COLUMNS = (
+        ("parent", "i"), ("end", "i"), ("depth", "H"), ("buffer", "i"),
+        ("offset", "q"), ("length", "q"), ("type", "H"), ("file_type", "h"),
+        ("section_type", "h"), ("hash", "Q"),
+    )
+
+    def __init__(self):
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+        self.guids = bytearray()
+        '''bytearray: The 16-byte GUID of each object, zero if it has none.'''
+        self.nodes = []
+        '''list: The object of each row.'''
+        self.types = []
+        '''list: The class names referenced by the 'type' column.'''
+        self.buffers = []
+        '''list: The objects referenced by the 'buffer' column.'''
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def guid(self, node_id):
+        '''Return the GUID of an object, or None.'''
+        guid = bytes(self.guids[node_id * 16:node_id * 16 + 16])
+        if guid == _NO_GUID:
+            return None
+        return Guid(guid)
+
+    def row(self, node_id):
+        '''Return an object's columns as a dictionary.'''
+        row = dict((name, getattr(self, name)[node_id])
+                   for name, _ in self.COLUMNS)
+        row["type"] = self.types[row["type"]]
+        row["guid"] = self.guid(node_id)
+        return row
+
+    def content(self, node_id):
+        '''Return a view of an object's bytes, headers included.'''
+        if self.buffer[node_id] < 0:
+            return None
+        offset = self.offset[node_id]
+        return memview(self.buffers[self.buffer[node_id]])[
+            offset:offset + self.length[node_id]]
+
+    def select(self, type=None, file_type=None, section_type=None, guid=None,
+               min_length=None, max_length=None, under=None):
+        '''Return the ids of the objects matching every given condition.
+
+        Args:
+            type (Optional[str]): A class name, or class, matched exactly.
+            file_type (Optional[int]): A FirmwareFile type.
+            section_type (Optional[int]): A FirmwareFileSystemSection type.
+            guid (Optional[bytes]): A GUID, in any form accepted by Guid.
+            min_length (Optional[int]): The smallest length selected.
+            max_length (Optional[int]): The largest length selected.
+            under (Optional[int]): Only select the descendants of this id.
+
+        Return:
+            list: The selected ids, in order.
+        '''
+        if under is not None:
+            start, stop = under + 1, self.end[under]
+        else:
+            start, stop = 0, len(self.nodes)
+
+        conditions = []
+        if type is not None:
+            if not isinstance(type, str):
+                type = type.__name__
+            if type not in self.types:
+                return []
+            conditions.append(("type", operator.eq, self.types.index(type)))
+        if file_type is not None:
+            conditions.append(("file_type", operator.eq, file_type))
+        if section_type is not None:
+            conditions.append(("section_type", operator.eq, section_type))
+        if min_length is not None:
+            conditions.append(("length", operator.ge, min_length))
+        if max_length is not None:
+            conditions.append(("length", operator.le, max_length))
+
+        ids = None
+        if guid is not None:
+            ids = [i for i in self._find_guid(Guid(guid)) if start <= i < stop]
+        if start >= stop or ids == []:
+            return []
+        if numpy is not None:
+            return self._select_numpy(start, stop, ids, conditions)
+
+        # Check every condition of an id in a single pass over the ids.
+        if ids is None:
+            ids = range(start, stop)
+        if not conditions:
+            return list(ids)
+        columns = [(getattr(self, name), compare, value)
+                   for name, compare, value in conditions]
+        return [i for i in ids if all(
+            compare(column[i], value) for column, compare, value in columns)]
+
+    def _select_numpy(self, start, stop, ids, conditions):
+        columns = self.to_numpy()
+        if ids is None:
+            mask = numpy.ones(stop - start, dtype=bool)
+        else:
+            mask = numpy.zeros(stop - start, dtype=bool)
+            mask[numpy.array(ids) - start] = True
+        for name, compare, value in conditions:
+            mask &= compare(columns[name][start:stop], value)
+        return (numpy.flatnonzero(mask) + start).tolist()
+
+    def _find_guid(self, guid):
+        ids = []
+        position = self.guids.find(guid)
+        while position >= 0:
+            if position % 16 == 0:
+                ids.append(position // 16)
+                position = self.guids.find(guid, position + 16)
+            else:
+                position = self.guids.find(guid, position + 1)
+        return ids
+
+    def to_numpy(self):
+        '''Return the columns as NumPy arrays, without copying them.
+
+        Return:
+            dict: A NumPy array for each column, 'guid' is an (n, 16) array of
+                bytes.
+        '''
+        import numpy
+
+        columns = dict(
+            (name, numpy.frombuffer(getattr(self, name), dtype=typecode))
+            for name, typecode in self.COLUMNS)
+        columns["guid"] = numpy.frombuffer(
+            self.guids, dtype=numpy.uint8).reshape(-1, 16)
+        return columns
+
+
+def _node_view(node):
+    # Compact objects, volumes, and filesystems keep their header in '_data'.
+    view = memview(getattr(node, "_data", None))
+    if not isinstance(view, memoryview):
+        view = memview(node.view)
+    if not isinstance(view, memoryview):
+        return None
+    return view
+
+
+def build_index(root, hashes=True):
+    '''Index a firmware object and its descendants.
+
+    Objects whose processing was deferred (see FirmwareObject.expand) are
+    processed, the index covers the entire tree.
+
+    Args:
+        root (FirmwareObject): The root of the tree, e.g. a parsed image.
+        hashes (Optional[bool]): Hash each object's bytes.
+
+    Return:
+        ObjectIndex: The index.
+    '''
+    index = ObjectIndex()
+    parent_column, end_column = index.parent, index.end
+    types = {}
+    buffers = {}
+
+    stack = [(root, -1, 0)]
+    while stack:
+        node, parent, depth = stack.pop()
+        if node is None:
+            # The end of a node's descendants.
+            end_column[parent] = len(index.nodes)
+            continue
+
+        node_id = len(index.nodes)
+        index.nodes.append(node)
+        parent_column.append(parent)
+        end_column.append(node_id + 1)
+        index.depth.append(depth)
+
+        view = _node_view(node)
+        if view is None:
+            index.buffer.append(-1)
+            index.offset.append(0)
+            index.length.append(0)
+            index.hash.append(0)
+        else:
+            key = id(view.obj)
+            if key not in buffers:
+                buffers[key] = len(index.buffers)
+                index.buffers.append(view.obj)
+            index.buffer.append(buffers[key])
+            index.offset.append(view_offset(view))
+            index.length.append(len(view))
+            if hashes:
+                digest = hashlib.blake2b(view, digest_size=8).digest()
+                index.hash.append(int.from_bytes(digest, "little"))
+            else:
+                index.hash.append(0)
+
+        name = node.__class__.__name__
+        if name not in types:
+            types[name] = len(index.types)
+            index.types.append(name)
+        index.type.append(types[name])
+        index.file_type.append(
+            node.type if isinstance(node, FirmwareFile) else -1)
+        index.section_type.append(
+            node.type if isinstance(node, FirmwareFileSystemSection) else -1)
+
+        guid = getattr(node, "guid", None)
+        if isinstance(guid, (bytes, memoryview)) and len(guid) == 16:
+            index.guids += guid
+        else:
+            index.guids += _NO_GUID
+
+        children = [child for child in node.objects if child is not None]
+        if children:
+            stack.append((None, node_id, 0))
+            for child in reversed(children):
+                stack.append((child, node_id, depth + 1))
+    return index
@@ -36,6 +36,7 @@ import array
 from .structs.intel_me_structs import *
 from .utils import *
 from uefi_firmware import efi_compressor
+from uefi_firmware import cache
 from uefi_firmware.base import FirmwareObject, StructuredObject
 
 MeModulePowerTypes = ["POWER_TYPE_RESERVED",
@@ -70,15 +71,18 @@ class MeObject(StructuredObject, FirmwareObject):
     def dump_module(self, parent):
         if self.compression == COMP_TYPE_LZMA:
             dump_data("%s.module.lzma" %
-                      os.path.join(parent, self.name), self.data)
+                      os.path.join(parent, self.name), self.view)
             try:
-                data = efi_compressor.LzmaDecompress(self.data, len(self.data))
+                data = cache.decode(
+                    "LzmaDecompress",
+                    lambda data: efi_compressor.LzmaDecompress(data, len(data)),
+                    self.view)
                 dump_data("%s.module" % os.path.join(parent, self.name), data)
             except Exception as e:
                 print("Cannot extract (%s), %s" % (self.name, str(e)))
                 return
         elif self.compression == COMP_TYPE_NOT_COMPRESSED:
-            dump_data("%s.module" % os.path.join(parent, self.name), self.data)
+            dump_data("%s.module" % os.path.join(parent, self.name), self.view)
 
 
 class MeModule(MeObject):
@@ -137,10 +141,10 @@ class MeModule(MeObject):
 
         if self.structure_type == MeModuleHeader1Type:
             # It's possible for type 1 to include LZMA compression
-            if self.data[0x50:0x55] == b'\x5D\x00\x00\x80\x00':
-                raw_data = self.data[0x50:0x55]
+            if self.view[0x50:0x55] == b'\x5D\x00\x00\x80\x00':
+                raw_data = as_bytes(self.view[0x50:0x55])
                 raw_data += struct.pack("<Q", self.structure.UncompressedSize)
-                raw_data += self.data[0x55:]
+                raw_data += self.view[0x55:]
                 self.data = raw_data
         return True
 
@@ -191,7 +195,7 @@ class MeVariableModule(MeObject):
             self.valid_header = False
             return
 
-        self.tag = hdr[:4]
+        self.tag = as_bytes(hdr[:4])
         # Note the elen size includes the header size
         self.size = struct.unpack("<I", hdr[4:])[0] * 4 - self.HEADER_SIZE
         self.data = data[self.HEADER_SIZE:self.HEADER_SIZE + self.size]
@@ -207,16 +211,16 @@ class MeVariableModule(MeObject):
     def process(self):
         if self.tag == b'$UDC':
             subtag, _hash, name, offset, size = struct.unpack(
-                self.type.udc_format, self.data[:self.type.udc_length])
+                self.type.udc_format, self.view[:self.type.udc_length])
             self.add_update(subtag, name, offset, size)
         if self.tag in [b'$SKU', b'$UVR']:
             # SKU is not handled
             self.values = [0, 0]
             return True
         if self.size == 3:
-            values = [struct.unpack("<I", self.data[:4])[0]]
+            values = [struct.unpack("<I", self.view[:4])[0]]
         if self.size == 4:
-            values = struct.unpack("<II", self.data[:8])[0]
+            values = struct.unpack("<II", self.view[:8])[0]
         else:
             values = array.array("I", self.data)
 
@@ -291,7 +295,7 @@ class MeLLUT(MeObject):
         # print "Debug: relative (%d) absolute start (%d) len (%d)." % (
         #    self.offset, self.start, len(self.data))
         dump_data("%s.llut.table" % parent, self.lut_data)
-        dump_data("%s.llut.compressed" % parent, self.data)
+        dump_data("%s.llut.compressed" % parent, self.view)
 
 
 class MeManifestHeader(MeObject):
@@ -371,7 +375,7 @@ class MeManifestHeader(MeObject):
         huffman_offset = 0
         for module_index in range(self.structure.NumModules):
             module = MeModule(
-                self.data[module_offset:],
+                self.view[module_offset:],
                 self.header_type, module_offset + self.partition_offset)
             # print "Debug: found me module header (%s) at (%d)." %
             # (module.tag, module_offset)
@@ -400,7 +404,7 @@ class MeManifestHeader(MeObject):
         while module_offset < self.structure.Size * 4:
             # There is more module header to process.
             module = MeVariableModule(
-                self.data[module_offset:], self.header_type)
+                self.view[module_offset:], self.header_type)
             if not module.valid_header:
                 break
             module_offset += module.HEADER_SIZE
@@ -422,7 +426,7 @@ class MeManifestHeader(MeObject):
         file_offset = self.structure.Size * 4
         # print "Debug: looking for module files at (%08X)." % file_offset
         while True:
-            module_file = MeModuleFile(self.data[file_offset:])
+            module_file = MeModuleFile(self.view[file_offset:])
             if not module_file.valid_header:
                 break
             if module_file.name in module_map:
@@ -459,7 +463,7 @@ class MeManifestHeader(MeObject):
         # Parse optional huffman LLUT.
         huffman_offset = self.huffman_offset - self.partition_offset
         huffman_llut = MeLLUT(
-            self.data[huffman_offset:], huffman_offset + self.absolute_offset)
+            self.view[huffman_offset:], huffman_offset + self.absolute_offset)
         if huffman_llut.valid_header:
             self.huffman_llut = huffman_llut
         #    print "Debug: huffman LLUT start (0x%08X) end (0x%08X)." % (
@@ -526,8 +530,8 @@ class CPDEntry(MeObject):
         if self.compression == COMP_TYPE_LZMA:
             # There is an odd state to check for that includes an additional
             # \x00\x00\x00 after the initial LZMA header block.
-            if self.data[0x0e:0x11] == b'\x00\x00\x00':
-                self.data = self.data[:0x0e] + self.data[0x11:]
+            if self.view[0x0e:0x11] == b'\x00\x00\x00':
+                self.data = as_bytes(self.view[:0x0e]) + self.view[0x11:]
         self.dump_module(parent)
 
 
@@ -555,7 +559,7 @@ class CPDManifestHeader(MeObject):
         offset = MeCpdHeaderType.size
         for i in range(self.structure.NumModules - 1):
             offset += MeCpdEntryType.size
-            entry = CPDEntry(self.data, offset)
+            entry = CPDEntry(self.view, offset)
             if entry.process():
                 self.modules.append(entry)
         return True
@@ -610,10 +614,10 @@ class PartitionEntry(MeObject):
     def process(self):
         if not self.has_content:
             return True
-        if self.data[0:0x04] == b'$CPD':
-            manifest = CPDManifestHeader(self.data, self.structure.Offset)
+        if self.view[0:0x04] == b'$CPD':
+            manifest = CPDManifestHeader(self.view, self.structure.Offset)
         else:
-            manifest = MeManifestHeader(self.data, self.structure.Offset)
+            manifest = MeManifestHeader(self.view, self.structure.Offset)
         if manifest.valid_header:
             if manifest.process():
                 self.manifest = manifest
@@ -630,7 +634,7 @@ class PartitionEntry(MeObject):
     def dump(self, parent=""):
         if self.has_content:
             dump_data(os.path.join(parent, "%s.partition" % utf8_decode_safe(self.structure.Name)),
-                self.data)
+                self.view)
         if self.manifest is not None:
             self.manifest.dump(os.path.join(parent, utf8_decode_safe(self.structure.Name)))
 
@@ -654,13 +658,16 @@ class MeContainer(MeObject):
         return self.partitions
 
     def process(self):
-        self.parse_structure(self.data, MePartitionTable)
+        self.parse_structure(self.view, MePartitionTable)
 
+        entries = []
         for i in range(self.structure.Entries):
             offset = self.partition_offset + 0x30
             offset += i * PartitionEntry.size
-            entry = PartitionEntry(self.data, offset)
-            if entry.process():
+            entries.append(PartitionEntry(self.view, offset))
+        for entry, status in zip(
+                entries, self.process_children(entries, defer=False)):
+            if status:
                 self.size += entry.size
                 self.partitions.append(entry)
         return True
@@ -675,6 +682,6 @@ class MeContainer(MeObject):
             partition.showinfo("  %s" % ts)
 
     def dump(self, parent=""):
-        dump_data(os.path.join(parent, "me-container.me"), self.data)
+        dump_data(os.path.join(parent, "me-container.me"), self.view)
         for partition in self.partitions:
             partition.dump(os.path.join(parent, "partitions"))
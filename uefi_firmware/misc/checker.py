@@ -5,18 +5,28 @@ The TypeTester may be useful if parsing a large number of UEFI-related binaries.
 
 
 from builtins import bytes
+import heapq
 import re
 
 from ..uefi import FirmwareVolume, FirmwareCapsule, FirmwareFile
 from ..pfs import PFSFile, PFHeader
 from ..flash import FlashDescriptor
 from ..me import MeContainer, MeManifestHeader
+from ..structs.flash_structs import FLASH_HEADER
+from ..structs.intel_me_structs import ME_HEADER, ME_PARTITION_HEADER
+from ..structs.uefi_structs import FIRMWARE_VOLUME_GUID_SET
+
+HEADER_SIZE = 200
+'''int: The testers match against this many leading bytes.'''
 
 
 class TypeTester(object):
     parser = None
     static = b"MZ"
 
+    search_window = 0
+    '''int: How far before its signature a match may begin.'''
+
     def match(self, data):
         if data[:self.size] == self.static:
             return True
@@ -26,6 +36,17 @@ class TypeTester(object):
     def size(self):
         return len(self.static)
 
+    @property
+    def signatures(self):
+        '''list: (offset, magic) pairs, one of which is present in a match.
+
+        A tester overriding match without declaring its signatures has none
+        (None), it is tried on all content.
+        '''
+        if type(self).match is not TypeTester.match:
+            return None
+        return [(0, self.static)]
+
     @property
     def name(self):
         return self.__class__.__name__.replace("Tester", "")
@@ -33,18 +54,21 @@ class TypeTester(object):
 
 class UEFIFirmwareVolumeTester(TypeTester):
     parser = FirmwareVolume
+    signatures = [(40, b"_FVH")]
 
     def match(self, data):
-        fv = FirmwareVolume(data)
-        return fv.valid_header
+        # The checks of FirmwareVolume.valid_header, without the object.
+        if len(data) < 0x38 or data[40:44] != b"_FVH":
+            return False
+        return bytes(data[16:32]) in FIRMWARE_VOLUME_GUID_SET
 
 
 class FlashDescriptorTester(TypeTester):
     parser = FlashDescriptor
+    signatures = [(16, FLASH_HEADER)]
 
     def match(self, data):
-        fd = FlashDescriptor(data)
-        return fd.valid_header
+        return len(data) >= 20 and data[16:20] == FLASH_HEADER
 
 
 class EFICapsuleTester(TypeTester):
@@ -66,18 +90,19 @@ class IntelMEPartitionManifestTester(TypeTester):
 
 class IntelMETester(TypeTester):
     parser = MeContainer
+    signatures = [(0, ME_HEADER), (16, ME_PARTITION_HEADER)]
 
     def match(self, data):
-        me = MeContainer(data)
-        return me.valid_header
+        return data[:len(ME_HEADER)] == ME_HEADER or \
+            data[16:20] == ME_PARTITION_HEADER
 
 
 class PFHeaderTester(TypeTester):
     parser = PFHeader
+    signatures = [(0, b"$PFH")]
 
     def match(self, data):
-        pfh = PFHeader(data)
-        return pfh.valid_header
+        return len(data) >= 32 and data[:4] == b"$PFH"
 
 
 class DellPFSTester(TypeTester):
@@ -89,6 +114,9 @@ class DellUpdateBinaryTester(TypeTester):
     hdr_pattern = re.compile(
         b'.{4}\xAA\xEE\xAA\x76\x1B\xEC\xBB\x20\xF1\xE6\x51.{1}\x78\x9C')
     static = b"\x00" * 100
+    # The pattern may occur anywhere in the header.
+    signatures = [(4, b"\xAA\xEE\xAA\x76\x1B\xEC\xBB\x20\xF1\xE6\x51")]
+    search_window = HEADER_SIZE - 18
 
     def match(self, data):
         hdr_match = self.hdr_pattern.search(data)
@@ -107,3 +135,209 @@ TESTERS = [
     PFHeaderTester,
     UEFIFirmwareVolumeTester,
 ]
+
+
+class Registry(object):
+    '''Type testers indexed by their signatures.
+
+    Each tester is instantiated once. Its signatures are indexed by offset and
+    length, so detecting the type of a header takes one dictionary lookup per
+    distinct (offset, length) pair, and only the testers whose signature is
+    present run their match. Testers with a search_window are checked with a
+    search over their window instead, and testers without signatures are
+    always candidates.
+
+    When several testers match, the one registered last is chosen.
+    '''
+
+    def __init__(self, testers=None):
+        self.testers = []
+        self._instances = {}
+        self._index = {}
+        self._windowed = []
+        self._unindexed = []
+        for tester in testers or []:
+            self.register(tester)
+
+    def register(self, tester):
+        '''Add a TypeTester class (or instance) to the index.
+
+        Return:
+            TypeTester: The registered tester instance.
+        '''
+        instance = tester() if isinstance(tester, type) else tester
+        self.unregister(type(instance))
+        self._instances[type(instance)] = instance
+        self.testers.append(instance)
+        if instance.signatures is None:
+            self._unindexed.append(instance)
+            return instance
+        for offset, magic in instance.signatures:
+            magic = bytes(magic)
+            if instance.search_window > 0:
+                self._windowed.append((offset, magic, instance))
+                continue
+            magics = self._index.setdefault((offset, len(magic)), {})
+            magics.setdefault(magic, []).append(instance)
+        return instance
+
+    def unregister(self, tester):
+        '''Remove a TypeTester class from the index.'''
+        instance = self._instances.pop(tester, None)
+        if instance is None:
+            return
+        self.testers.remove(instance)
+        if instance in self._unindexed:
+            self._unindexed.remove(instance)
+        self._windowed = [
+            entry for entry in self._windowed if entry[2] is not instance]
+        for magics in self._index.values():
+            for magic in magics:
+                if instance in magics[magic]:
+                    magics[magic].remove(instance)
+
+    def instance(self, tester):
+        '''Return the registered instance of a TypeTester class.'''
+        instance = self._instances.get(tester)
+        return tester() if instance is None else instance
+
+    def candidates(self, data):
+        '''Return the testers whose signatures are present in data.'''
+        data = bytes(data)
+        found = set(self._unindexed)
+        for (offset, size), magics in self._index.items():
+            testers = magics.get(data[offset:offset + size])
+            if testers:
+                found.update(testers)
+        for offset, magic, instance in self._windowed:
+            window = data[offset:offset + instance.search_window + len(magic)]
+            if window.find(magic) >= 0:
+                found.add(instance)
+        return found
+
+    def detect(self, data):
+        '''Return the tester matching the header data, or None.'''
+        found = self.candidates(data)
+        for instance in reversed(self.testers):
+            if instance in found and instance.match(data):
+                return instance
+        return None
+
+
+REGISTRY = Registry(TESTERS)
+'''Registry: The testers used by AutoParser, built from TESTERS.'''
+
+_registered = list(TESTERS)
+
+
+def _registry():
+    # TESTERS may be changed directly, the registry is then rebuilt.
+    global REGISTRY, _registered
+    if TESTERS != _registered:
+        REGISTRY = Registry(TESTERS)
+        _registered = list(TESTERS)
+    return REGISTRY
+
+
+def register(tester):
+    '''Register a custom TypeTester class for AutoParser and scan.
+
+    The tester takes precedence over the testers registered before it. A
+    tester declaring the signatures a match contains is only run where one is
+    present. Appending to TESTERS has the same effect.
+    '''
+    registry = _registry()
+    if tester in TESTERS:
+        TESTERS.remove(tester)
+        _registered.remove(tester)
+    TESTERS.append(tester)
+    _registered.append(tester)
+    return registry.register(tester)
+
+
+def unregister(tester):
+    '''Remove a TypeTester class from AutoParser and scan.'''
+    registry = _registry()
+    if tester in TESTERS:
+        TESTERS.remove(tester)
+        _registered.remove(tester)
+    registry.unregister(tester)
+
+
+def detect(data):
+    '''Return the registered tester matching the header data, or None.'''
+    return _registry().detect(data[:HEADER_SIZE])
+
+
+def scan(data, testers=None):
+    '''Find the offsets within data at which the testers match.
+
+    This replaces trying every tester at every offset. The signatures of all
+    testers are searched for in a single pass, and the testers only run at
+    the offsets those signatures imply. If a tester has no signatures, the
+    testers are tried at every offset.
+
+    Args:
+        data (binary): The content to search.
+        testers (Optional[list]): Tester classes, by default the registered
+            testers.
+
+    Return:
+        generator: Pairs of (offset, list of matching tester classes), in
+            increasing offset order.
+    '''
+    registry = _registry()
+    if testers is None:
+        testers = [type(instance) for instance in registry.testers]
+    instances = [registry.instance(tester) for tester in testers]
+    if any(instance.signatures is None for instance in instances):
+        for offset in range(len(data)):
+            header = data[offset:offset + HEADER_SIZE]
+            matches = [
+                tester for tester, instance in zip(testers, instances)
+                if instance.match(header)]
+            if matches:
+                yield (offset, matches)
+        return
+    signatures = {}
+    lookback = 0
+    for instance in instances:
+        for offset, magic in instance.signatures:
+            signatures.setdefault(bytes(magic), []).append(
+                (offset, instance.search_window))
+            lookback = max(lookback, offset + instance.search_window)
+    if not signatures:
+        return
+    # Longer magics first, so one that prefixes another is not preferred.
+    magics = sorted(signatures.keys(), key=len, reverse=True)
+    pattern = re.compile(b"|".join([re.escape(magic) for magic in magics]))
+
+    candidates = []
+    checked = set()
+    position = 0
+    while True:
+        found = pattern.search(data, position)
+        # Later signatures cannot imply offsets before this limit.
+        limit = len(data) + 1 if found is None else found.start() - lookback
+        while candidates and candidates[0] < limit:
+            offset = heapq.heappop(candidates)
+            header = data[offset:offset + HEADER_SIZE]
+            matches = [
+                tester for tester, instance in zip(testers, instances)
+                if instance.match(header)]
+            if matches:
+                yield (offset, matches)
+        if found is None:
+            return
+
+        start = found.start()
+        for magic in magics:
+            if data[start:start + len(magic)] != magic:
+                continue
+            for offset, window in signatures[magic]:
+                for candidate in range(max(0, start - offset - window),
+                                       start - offset + 1):
+                    if candidate not in checked:
+                        checked.add(candidate)
+                        heapq.heappush(candidates, candidate)
+        position = start + 1
@@ -3,7 +3,7 @@ import os
 
 from .base import FirmwareObject, RawObject, BaseObject, AutoRawObject
 from .uefi import FirmwareVolume
-from .utils import print_error, dump_data, sguid, green, blue
+from .utils import print_error, dump_data, sguid, green, blue, as_bytes
 
 
 PFS_GUIDS = {
@@ -41,9 +41,9 @@ class PFRegion(FirmwareObject):
         return [self.obj]
 
     def process(self):
-        self.obj = AutoRawObject(self.data)
+        self.obj = AutoRawObject(self.view)
         if not self.obj.process():
-            self.obj = RawObject(self.data)
+            self.obj = RawObject(self.view)
         else:
             self.obj = self.obj.object
         return True
@@ -94,10 +94,10 @@ class PFHeader(FirmwareObject, BaseObject):
 
         if self.size < 32:
             return
-        if self.data[:4] == b'$PFH':
+        if self.view[:4] == b'$PFH':
             self.valid_header = True
         version, hdr_size, checksum, image_size, image_checksum, image_count, \
-            image_offset = struct.unpack('<IIHIHII', self.data[4:28])
+            image_offset = struct.unpack('<IIHIHII', self.view[4:28])
         self.hdr_size = hdr_size
         self.image_count = image_count
         self.image_offset = image_offset
@@ -114,8 +114,8 @@ class PFHeader(FirmwareObject, BaseObject):
         data_offset = self.hdr_size
         for i in range(self.image_count):
             region_offset = 0xDC + (i * 20)
-            entry = PFRegion(self.data[region_offset:region_offset + 20],
-                self.data[data_offset:])
+            entry = PFRegion(self.view[region_offset:region_offset + 20],
+                self.view[data_offset:])
             data_offset += entry.size
             if entry.process():
                 self.objs.append(entry)
@@ -132,7 +132,7 @@ class PFHeader(FirmwareObject, BaseObject):
 
     def dump(self, parent='', index=None):
         path = os.path.join(parent, "pfheader.pfh")
-        dump_data("%s" % path, self.data)
+        dump_data("%s" % path, self.view)
         images = os.path.join(parent, "pfheader")
         for i in range(len(self.objs)):
             self.objs[i].dump(images, i)
@@ -164,14 +164,14 @@ class PFSPartitionedSection(FirmwareObject, BaseObject):
         body_end = self.size - 0x10
         # This data is the content of a section, with stripped PFS header.
         # The first line will be the UUID.
-        self.uuid = self.data[0x0:0x10]
+        self.uuid = as_bytes(self.view[0x0:0x10])
         body_step = 0x10
 
         # The stepping is equivilent to a PFSSection save for a 0x200-sized
         # set of variables.
         while body_step < body_end:
             # The UUID for partitioned section is useless.
-            header = self.data[body_step:body_step + self.HEADER_SIZE]
+            header = self.view[body_step:body_step + self.HEADER_SIZE]
             if len(header) < self.HEADER_SIZE:
                 return False
             self.partitions += 1
@@ -179,7 +179,7 @@ class PFSPartitionedSection(FirmwareObject, BaseObject):
             # Advance the seek pointer past the header.
             body_step += self.HEADER_SIZE
             # The section data seeks past an offset of variables.
-            data = self.data[body_step + self.DATA_OFFSET:body_step + size]
+            data = self.view[body_step + self.DATA_OFFSET:body_step + size]
             self.section_data += data
             sig1_size, trp_size, sig2_size = struct.unpack("<III", header[0x2C:0x2C + 0x0C])
             body_step += size + sig1_size + trp_size + sig2_size
@@ -221,9 +221,12 @@ class PFSSection(FirmwareObject, BaseObject):
 
         # Store parsed objects (if any)
         self.section_objects = []
+        self.header = None
 
-    def process(self):
-        hdr = self.data[:self.HEADER_SIZE]
+    def parse_header(self):
+        '''Parse the header, chunk sizes and 'section_size', but not the data.
+        '''
+        hdr = as_bytes(self.view[:self.HEADER_SIZE])
         self.uuid = hdr[:0x10]
         self.header = hdr
 
@@ -248,15 +251,15 @@ class PFSSection(FirmwareObject, BaseObject):
 
         # This seems to be a set of 8byte CRCs for each chunk (4 total)
         self.crcs = hdr[0x20 + 0x18:self.HEADER_SIZE]
-        self.section_data = self.data[
+        self.section_data = self.view[
             self.HEADER_SIZE:self.HEADER_SIZE + section_size]
 
         rsa1_offset = self.HEADER_SIZE + section_size
-        self.rsa1 = RawObject(self.data[rsa1_offset:rsa1_offset + rsa1_size])
+        self.rsa1 = RawObject(self.view[rsa1_offset:rsa1_offset + rsa1_size])
         pmim_offset = rsa1_offset + rsa1_size
-        self.pmim = RawObject(self.data[pmim_offset:pmim_offset + pmim_size])
+        self.pmim = RawObject(self.view[pmim_offset:pmim_offset + pmim_size])
         rsa2_offset = pmim_offset + pmim_size
-        self.rsa2 = RawObject(self.data[rsa2_offset:rsa2_offset + rsa2_size])
+        self.rsa2 = RawObject(self.view[rsa2_offset:rsa2_offset + rsa2_size])
 
         # Unknown 8byte variable
         # _u3 = self.data[64+total_chunk_size:64+total_chunk_size+8]
@@ -267,6 +270,10 @@ class PFSSection(FirmwareObject, BaseObject):
         self.section_size = self.HEADER_SIZE + total_size
         self.data = None
 
+    def process(self):
+        if self.header is None:
+            self.parse_header()
+
         if self.section_data[:0x08] == b"PFS.HDR.":
             # Partitioned ROM
             rom = PFSPartitionedSection(self.section_data)
@@ -292,7 +299,7 @@ class PFSSection(FirmwareObject, BaseObject):
             "_self": self,
             "guid": sguid(self.uuid),
             "type": "PFSSection",
-            "content": self.section_data if include_content else "",
+            "content": as_bytes(self.section_data) if include_content else "",
             "attrs": {
                 "size": self.section_size,
                 "crcs": self.crcs,
@@ -330,12 +337,12 @@ class PFSSection(FirmwareObject, BaseObject):
 
         # Instead of calling dump on each chunk RawObject, dump with a better
         # name.
-        if len(self.rsa1.data) > 0:
-            dump_data("%s.rsa1" % path, self.rsa1.data)
-        if len(self.pmim.data) > 0:
-            dump_data("%s.pmim" % path, self.pmim.data)
-        if len(self.rsa2.data) > 0:
-            dump_data("%s.rsa2" % path, self.rsa2.data)
+        if len(self.rsa1.view) > 0:
+            dump_data("%s.rsa1" % path, self.rsa1.view)
+        if len(self.pmim.view) > 0:
+            dump_data("%s.pmim" % path, self.pmim.view)
+        if len(self.rsa2.view) > 0:
+            dump_data("%s.rsa2" % path, self.rsa2.view)
 
         path = os.path.join(parent, "section-%s" % sguid(self.uuid))
         for sub_object in self.section_objects:
@@ -355,11 +362,11 @@ class PFSFile(FirmwareObject):
             self.valid_header = True
 
     def check_header(self):
-        if len(self.data) < 32:
+        if len(self.view) < 32:
             print_error("Data does not contain a header.")
             return False
 
-        header = self.data[:0x10]
+        header = self.view[:0x10]
         magic, spec, size = struct.unpack("<8sII", header)
 
         self.spec = spec
@@ -371,7 +378,7 @@ class PFSFile(FirmwareObject):
             return False
 
         footer_offset = self.size + 0x10
-        footer = self.data[footer_offset:footer_offset + 0x10]
+        footer = self.view[footer_offset:footer_offset + 0x10]
         # Footer size is a repeated body size.
         footer_size, _u2, footer_magic = struct.unpack("<II8s", footer)
         if footer_magic != self.PFS_FOOTER:
@@ -383,7 +390,7 @@ class PFSFile(FirmwareObject):
 
     def process(self):
         '''Chunks are assumed to contain a chunk header.'''
-        data = self.data[16:-16]
+        data = self.view[16:-16]
         if not self.valid_header:
             return False
 
@@ -391,7 +398,7 @@ class PFSFile(FirmwareObject):
         offset = 16
         while True:
             section = PFSSection(data)
-            section.process()
+            section.parse_header()
             self.sections.append(section)
 
             chunk_num += 1
@@ -400,6 +407,9 @@ class PFSFile(FirmwareObject):
 
             if len(data) < 64:
                 break
+
+        # The sections are independent, they may be processed in parallel.
+        self.process_children(self.sections, defer=False)
         return True
 
     @property
@@ -410,7 +420,7 @@ class PFSFile(FirmwareObject):
         body = b""
         for section in self.sections:
             body += section.build(generate_checksum, debug=debug)
-        return self.data[:16] + body + self.data[-16:]
+        return as_bytes(self.view[:16]) + body + self.view[-16:]
         pass
 
     def showinfo(self, ts='', index=None):
@@ -423,7 +433,7 @@ class PFSFile(FirmwareObject):
 
     def dump(self, parent='', index=None):
         path = os.path.join(parent, "pfsobject.pfs")
-        dump_data(path, self.data)
+        dump_data(path, self.view)
 
         path = os.path.join(parent, "pfsobject")
         for section in self.sections:
@@ -0,0 +1,177 @@
+'''A pool of threads processing the independent subtrees of an image.
+
+Sibling objects, such as the volumes of a flash region or the files of a
+filesystem, are parsed independently of each other. With a scheduler, a
+parent's process method submits each child's processing as a task, see
+FirmwareObject.process_children, and children submit their own children in
+turn. The parent then waits for its tasks, in order, so the children are kept
+in the order a serial parse would keep them.
+
+Each thread owns a deque of tasks. A thread submitting tasks pushes them onto
+its own deque and runs them newest first, an idle thread steals the oldest
+task of another thread's deque, usually the largest remaining subtree. A
+thread waiting for a task runs other tasks instead of blocking, so nested
+tasks never exhaust the pool.
+
+The decompressors release the GIL, so decompression and the parsing of
+other subtrees overlap. Python code still runs on one core at a time, the
+parse of an image without compressed content is not faster.
+'''
+
+import threading
+import contextvars
+
+from collections import deque
+
+
+class Task(object):
+    '''A function call run by a Scheduler.'''
+
+    __slots__ = ("function", "args", "context", "done", "result", "error")
+
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+        # The task runs in a copy of the submitter's context, e.g. its cache.
+        self.context = contextvars.copy_context()
+        self.done = False
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self.context.run(self.function, *self.args)
+        except BaseException as e:
+            self.error = e
+
+
+class Scheduler(object):
+    '''A work-stealing pool of threads (see the module notes).
+
+    The thread creating the scheduler counts as one of the workers: it runs
+    tasks while waiting for them.
+    '''
+
+    def __init__(self, workers):
+        '''Start the worker threads.
+
+        Args:
+            workers (int): The number of threads processing tasks, including
+                the calling thread.
+        '''
+        self.workers = max(1, workers)
+        self.closed = False
+        self._condition = threading.Condition()
+        self._queues = [deque() for _ in range(self.workers)]
+        self._local = threading.local()
+        self._threads = []
+        for index in range(1, self.workers):
+            thread = threading.Thread(
+                target=self._work, args=(index,),
+                name="uefi-firmware-worker-%d" % index)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        '''Stop the worker threads, later calls to map run serially.'''
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self._threads = []
+
+    def map(self, function, items):
+        '''Call function(item) for each item, in parallel.
+
+        Return:
+            list: The results, in the order of the items. An exception raised
+                by a call is raised once the calls before it have returned.
+        '''
+        items = list(items)
+        if self.closed or self.workers < 2 or len(items) < 2:
+            return [function(item) for item in items]
+        tasks = [self.submit(function, item) for item in items]
+        return [self.wait(task) for task in tasks]
+
+    def submit(self, function, *args):
+        '''Queue a call of function(*args).
+
+        Return:
+            Task: The task, see wait.
+        '''
+        task = Task(function, args)
+        with self._condition:
+            self._queues[self._index()].append(task)
+            self._condition.notify()
+        return task
+
+    def wait(self, task):
+        '''Run tasks until a task is done.
+
+        Return:
+            object: The task's result, an exception raised by the task is
+                raised.
+        '''
+        index = self._index()
+        while not task.done:
+            other = self._next(index)
+            if other is not None:
+                self._run(other)
+                continue
+            with self._condition:
+                if not task.done and not self._pending():
+                    self._condition.wait()
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def _index(self):
+        # Threads outside the pool share the first deque.
+        return getattr(self._local, "index", 0)
+
+    def _pending(self):
+        for queue in self._queues:
+            if queue:
+                return True
+        return False
+
+    def _next(self, index):
+        # The newest task of this thread, otherwise the oldest of another's.
+        try:
+            return self._queues[index].pop()
+        except IndexError:
+            pass
+        for offset in range(1, self.workers):
+            try:
+                return self._queues[(index + offset) % self.workers].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _run(self, task):
+        task.run()
+        with self._condition:
+            task.done = True
+            self._condition.notify_all()
+
+    def _work(self, index):
+        self._local.index = index
+        while True:
+            task = self._next(index)
+            if task is not None:
+                self._run(task)
+                continue
+            with self._condition:
+                if self.closed:
+                    return
+                if not self._pending():
+                    self._condition.wait()
@@ -0,0 +1,192 @@
+'''Images and decompressed content in shared memory segments.
+
+Parsed objects are views of their input, so an input placed in a
+multiprocessing.shared_memory segment is parsed in place by any process
+that attaches the segment. Instead of pickling content, processes exchange
+extents, (segment name, offset, length) tuples:
+
+  with SharedBuffer.create(read_file(path)) as image:
+      firmware = AutoParser(image.view).parse(lazy=True)
+      extents = [image.extent(volume._data) for volume in volumes]
+      for nodes in pool.map(parse_extent, extents):
+          ...
+      release(nodes, keep=[image])
+
+A worker's parse_extent parses the content of an extent and returns a small
+Node descriptor for each object of the tree. Content the worker decompressed
+is copied into new segments, so each node's extent can be resolved by the
+parent, which is then responsible for unlinking those segments (see release).
+
+Segments are attached once per process and kept attached.
+'''
+
+import collections
+
+from multiprocessing import shared_memory
+
+from .utils import memview, view_offset
+
+Extent = collections.namedtuple("Extent", ["name", "offset", "length"])
+'''An extent of a segment, e.g. the bytes of a parsed object.'''
+
+Node = collections.namedtuple("Node", [
+    "parent", "depth", "type", "name", "guid", "file_type", "section_type",
+    "extent"])
+'''The descriptor of a parsed object, see describe. The parent is the
+position of the parent node in the list of nodes, -1 for the root. The extent
+is None for objects without content.'''
+
+_attached = {}
+'''dict: The SharedBuffer of each segment this process attached or created.'''
+
+
+class _Segment(shared_memory.SharedMemory):
+    # Views of a segment may outlive it, the mapping is then released with
+    # the last view instead of when the segment is collected.
+
+    def __del__(self):
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass
+
+
+class SharedBuffer(object):
+    '''A shared memory segment holding an image or decompressed content.'''
+
+    def __init__(self, segment, size):
+        self.segment = segment
+        self.size = size
+        self.view = memview(segment.buf)[:size]
+        '''memoryview: The content, segments may be larger than requested.'''
+
+    @property
+    def name(self):
+        return self.segment.name
+
+    @classmethod
+    def create(cls, data):
+        '''Copy data into a new segment.'''
+        data = memview(data)
+        segment = _Segment(create=True, size=max(1, len(data)))
+        segment.buf[:len(data)] = data
+        shared = cls(segment, len(data))
+        _attached[shared.name] = shared
+        return shared
+
+    @classmethod
+    def attach(cls, name, size=None):
+        '''Attach an existing segment, once per process.'''
+        if name in _attached:
+            return _attached[name]
+        segment = _Segment(name=name)
+        shared = cls(segment, segment.size if size is None else size)
+        _attached[name] = shared
+        return shared
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.unlink()
+
+    def extent(self, view=None):
+        '''Return the Extent of a view of this buffer, by default all of it.
+        '''
+        if view is None:
+            return Extent(self.name, 0, self.size)
+        try:
+            offset = view_offset(memview(view), self.view)
+        except ValueError:
+            raise ValueError("The view is not within segment %s" % self.name)
+        return Extent(self.name, offset, len(view))
+
+    def close(self):
+        '''Detach the segment from this process, views must be released.'''
+        _attached.pop(self.name, None)
+        self.view.release()
+        self.segment.close()
+
+    def unlink(self):
+        '''Remove the segment, mappings of other processes remain valid.'''
+        _attached.pop(self.name, None)
+        self.segment.unlink()
+
+
+def resolve(extent):
+    '''Return a view of an extent's bytes, attaching its segment if needed.'''
+    shared = SharedBuffer.attach(extent.name)
+    return shared.view[extent.offset:extent.offset + extent.length]
+
+
+def _segment_of(buffer):
+    # The attached segment starting where buffer starts, if any.
+    for shared in list(_attached.values()):
+        try:
+            if view_offset(shared.view, buffer) == 0:
+                return shared
+        except ValueError:
+            continue
+    return None
+
+
+def describe(root):
+    '''Describe a tree of objects as a list of Node descriptors.
+
+    Objects within attached segments are described in place, other content,
+    such as decompressed sections, is copied into new segments (one for
+    each decompressed buffer).
+    '''
+    index = root.index(hashes=False)
+
+    # The index's offsets are relative to the start of each buffer.
+    segments = []
+    for buffer in index.buffers:
+        shared = _segment_of(buffer)
+        if shared is None:
+            # This process keeps its own copy, it does not map the segment.
+            shared = SharedBuffer.create(buffer)
+            shared.close()
+        segments.append(shared.name)
+
+    nodes = []
+    for node_id, node in enumerate(index.nodes):
+        extent = None
+        if index.buffer[node_id] >= 0:
+            extent = Extent(
+                segments[index.buffer[node_id]], index.offset[node_id],
+                index.length[node_id])
+        guid = index.guid(node_id)
+        nodes.append(Node(
+            index.parent[node_id], index.depth[node_id],
+            index.types[index.type[node_id]], getattr(node, "name", None),
+            None if guid is None else bytes(guid),
+            index.file_type[node_id], index.section_type[node_id], extent))
+    return nodes
+
+
+def parse_extent(extent, **parse_options):
+    '''Parse the content of an extent, e.g. within a worker process.
+
+    Args:
+        extent (Extent): The content to parse, e.g. a volume of an image.
+        parse_options: Arguments of AutoParser.parse.
+
+    Return:
+        list: The Node descriptors of the parsed tree (see describe), or None
+            if the content could not be parsed.
+    '''
+    from . import AutoParser
+    firmware = AutoParser(resolve(extent), search=False).parse(**parse_options)
+    if firmware is None:
+        return None
+    return describe(firmware)
+
+
+def release(nodes, keep=()):
+    '''Unlink the segments referenced by nodes, except the kept buffers.'''
+    kept = set(shared.name for shared in keep)
+    for name in set(node.extent.name for node in nodes
+                    if node.extent is not None):
+        if name not in kept:
+            SharedBuffer.attach(name).unlink()
@@ -0,0 +1,174 @@
+'''Identify the codec of compressed content from its headers.
+
+Compressed sections do not always name their codec: type 0x01 sections may
+use EFI or Tiano compression, and type 0x02 sections LZMA, Tiano, or EFI.
+Rather than attempting each decoder in turn, the candidates are checked
+against the codec headers first:
+
+  - LZMA: the properties byte (lc/lp/pb) and the 64-bit decoded size.
+  - EFI/Tiano: the compressed and original size fields, and the code
+    lengths of the first Huffman table (the extra set) of the first block.
+
+A candidate is only eliminated when its decoder is certain to fail, the
+remaining candidates keep their order unless a declared decoded size
+matches the expected size.
+'''
+
+import struct
+import threading
+
+LZMA_HEADER_SIZE = 13
+
+MAX_DESTINATION_SIZE = 100000000
+'''int: The decoders reject larger outputs (MAX_DSTSZ in EfiCompressor.c).'''
+
+# Parameters of the first Huffman table (see Tiano/Decompress.c).
+_CODE_BIT = 16
+_NT = _CODE_BIT + 3
+_TBIT = 5
+_NPT = 31
+_TABLE_BITS = 8
+
+counters = {"sniffed": 0, "avoided": 0}
+'''dict: Number of candidate decodes checked, and avoided, by candidates.'''
+
+_counters_lock = threading.Lock()
+
+
+def reset_counters():
+    '''Reset the sniffed and avoided counters.'''
+    with _counters_lock:
+        counters["sniffed"] = 0
+        counters["avoided"] = 0
+
+
+def _huffman_table_valid(data, compressed_size):
+    '''Check the first (extra set) Huffman table of an EFI/Tiano stream.
+
+    This follows ReadPTLen and the checks of MakeTable in Tiano/Decompress.c
+    for the first block. Streams it cannot decide on are reported as valid.
+    '''
+    # Bits are read MSB-first, past the compressed size the decoder reads 0s.
+    # The table fits in 48 bytes unless its code lengths are unusually long.
+    window = min(compressed_size, 48)
+    bits = bin(int.from_bytes(data[8:8 + window], 'big') | (1 << window * 8))[3:]
+    if compressed_size <= window:
+        bits += "0" * 256
+    # The block size, then the number of code lengths.
+    number = int(bits[16:21], 2)
+    if number == 0:
+        return True
+    position = 21
+    lengths = []
+    while len(lengths) < number and len(lengths) < _NPT:
+        length = int(bits[position:position + 3], 2)
+        position += 3
+        if length == 7:
+            end = bits.find("0", position)
+            if end < 0 or end - position >= 29:
+                return True
+            length += end - position
+            position = end + 1
+        lengths.append(length)
+        if len(lengths) == 3:
+            lengths += [0] * int(bits[position:position + 2], 2)
+            lengths = lengths[:_NPT]
+            position += 2
+        if position > len(bits):
+            return True
+    lengths = (lengths + [0] * _NT)[:_NT]
+
+    # The failure checks of MakeTable, in 16-bit arithmetic.
+    if max(lengths) > 16:
+        return False
+    total = 0
+    for length in lengths:
+        if length:
+            total += 1 << (16 - length)
+    if total & 0xFFFF:
+        return False
+    # Codes that index the 8-bit lookup table must fit within it.
+    total = 0
+    for length in range(1, _TABLE_BITS + 1):
+        total += lengths.count(length) << (_TABLE_BITS - length)
+        if total > (1 << _TABLE_BITS):
+            return False
+    return True
+
+
+def efi_plausible(data, decompressed_size=None):
+    '''Check EFI/Tiano compressed content, see candidates.
+
+    Return:
+        int: 0 if decoding must fail, 2 if the original size matches
+            decompressed_size, otherwise 1.
+    '''
+    if len(data) < 8:
+        return 0
+    compressed_size, original_size = struct.unpack("<II", data[:8])
+    if compressed_size + 8 > len(data) or compressed_size + 8 > 0xFFFFFFFF:
+        return 0
+    if original_size == 0 or original_size > MAX_DESTINATION_SIZE:
+        return 0
+    if not _huffman_table_valid(data, compressed_size):
+        return 0
+    return 2 if original_size == decompressed_size else 1
+
+
+def lzma_plausible(data, decompressed_size=None):
+    '''Check LZMA compressed content, see candidates.
+
+    Return:
+        int: 0 if decoding must fail, 2 if the decoded size matches
+            decompressed_size, otherwise 1.
+    '''
+    if len(data) < LZMA_HEADER_SIZE:
+        return 0
+    properties = data[0]
+    if properties >= 9 * 5 * 5:
+        return 0
+    decoded_size = struct.unpack("<Q", data[5:LZMA_HEADER_SIZE])[0]
+    if decoded_size == 0 or decoded_size > MAX_DESTINATION_SIZE:
+        return 0
+    return 2 if decoded_size == decompressed_size else 1
+
+
+SNIFFERS = {
+    "EfiDecompress": efi_plausible,
+    "TianoDecompress": efi_plausible,
+    "LzmaDecompress": lzma_plausible,
+}
+'''dict: Header checks by decompressor name.'''
+
+
+def candidates(algorithms, data, decompressed_size=None):
+    '''Order the algorithms that may decode data.
+
+    Algorithms without a header check are kept.
+
+    Args:
+        algorithms (list): A set of decompression methods, in preferred order.
+        data (binary): The compressed content.
+        decompressed_size (Optional[int]): The expected decoded size.
+
+    Return:
+        list: Indexes into algorithms, the most likely first.
+    '''
+    ranked = []
+    ranks = {}
+    for i, algorithm in enumerate(algorithms):
+        sniffer = SNIFFERS.get(getattr(algorithm, "__name__", None))
+        if sniffer is None:
+            rank = 1
+        elif sniffer in ranks:
+            rank = ranks[sniffer]
+        else:
+            rank = ranks[sniffer] = sniffer(data, decompressed_size)
+        with _counters_lock:
+            counters["sniffed"] += 1
+            if rank == 0:
+                counters["avoided"] += 1
+        if rank == 0:
+            continue
+        ranked.append((-rank, i))
+    return [i for _, i in sorted(ranked)]
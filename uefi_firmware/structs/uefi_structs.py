@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import ctypes
+import struct
 
 uint8_t = ctypes.c_ubyte
 char = ctypes.c_char
@@ -43,6 +44,30 @@ FIRMWARE_FREEFORM_GUIDS = {
     "CHAR_GUID": "059ef06e-c652-4a45-9fbe-5975e369461c"
 }
 
+
+def guid_bytes(guid):
+    '''RFC4122 string GUID as its raw (little-endian) 16 bytes.'''
+    parts = guid.strip().strip("{}").split("-")
+    if [len(part) for part in parts] != [8, 4, 4, 4, 12]:
+        raise ValueError("Invalid GUID string: %s" % guid)
+    return struct.pack("<IHH", *[int(part, 16) for part in parts[:3]]) + \
+        bytes.fromhex(parts[3] + parts[4])
+
+
+def _guid_names(guids):
+    return dict((guid_bytes(guid), name) for name, guid in guids.items())
+
+
+# The GUID tables keyed by raw GUID, parsed GUIDs are looked up without
+# formatting them as strings.
+FIRMWARE_VOLUME_GUID_NAMES = _guid_names(FIRMWARE_VOLUME_GUIDS)
+FIRMWARE_VOLUME_GUID_SET = frozenset(FIRMWARE_VOLUME_GUID_NAMES)
+FIRMWARE_CAPSULE_GUID_BYTES = tuple(
+    guid_bytes(guid) for guid in FIRMWARE_CAPSULE_GUIDS)
+FIRMWARE_CAPSULE_GUID_SET = frozenset(FIRMWARE_CAPSULE_GUID_BYTES)
+FIRMWARE_GUIDED_GUID_NAMES = _guid_names(FIRMWARE_GUIDED_GUIDS)
+FIRMWARE_FREEFORM_GUID_NAMES = _guid_names(FIRMWARE_FREEFORM_GUIDS)
+
 EFI_FILE_TYPES = {
     # http://wiki.phoenix.com/wiki/index.php/EFI_FV_FILETYPE
     0x00: ("unknown",                    "none",        "0x00"),
@@ -11,6 +11,9 @@ import struct
 import zlib
 
 from .base import FirmwareObject, StructuredObject, RawObject, AutoRawObject
+from .base import CompactObject, expands, read_structure, walk
+from . import cache
+from . import sniffer
 from .utils import *
 from .guids import get_guid_name
 from .structs.uefi_structs import *
@@ -22,10 +25,10 @@ def parse_depex(input_data):
     depex = []
     offset = 0
     while offset < len(input_data):
-        opcode = ord(input_data[offset:offset+1])
+        opcode = input_data[offset]
         offset = offset + 1
         if opcode == 0x00:
-            guid = input_data[offset:offset+16]
+            guid = as_bytes(input_data[offset:offset+16])
             guid_name = get_guid_name(guid)
             offset = offset + 16
             depex.append({
@@ -34,7 +37,7 @@ def parse_depex(input_data):
                 'guid': sguid(guid),
             })
         elif opcode == 0x01:
-            guid = input_data[offset:offset+16]
+            guid = as_bytes(input_data[offset:offset+16])
             guid_name = get_guid_name(guid)
             offset = offset + 16
             depex.append({
@@ -43,7 +46,7 @@ def parse_depex(input_data):
                 'guid': sguid(guid),
             })
         elif opcode == 0x02:
-            guid = input_data[offset:offset+16]
+            guid = as_bytes(input_data[offset:offset+16])
             guid_name = get_guid_name(guid)
             offset = offset + 16
             depex.append({
@@ -89,7 +92,7 @@ def _get_section_type(section_type):
 def uefi_name(s):
     '''Return the utf-16le encoded string name for a UEFIFile.'''
     try:
-        name = s.decode("utf-16le").split("\0")[0]
+        name = as_bytes(s).decode("utf-16le").split("\0")[0]
         if len(name) == 0:
             return None
         for c in name:
@@ -110,19 +113,30 @@ def compare(data1, data2):
     return True
 
 
-def decompress(algorithms, compressed_data):
+def decompress(algorithms, compressed_data, decompressed_size=None):
     '''Attempt to decompress using a set of algorithms.
 
+    Algorithms whose headers do not match the stream are not attempted, and
+    one declaring decompressed_size is attempted first (see sniffer).
+
     Args:
         algorithms (list): A set of decompression methods.
         compressed_data (binary): A compressed data stream.
+        decompressed_size (Optional[int]): The expected decompressed size.
 
     Return:
         pair (int, binary): Return the algorithm index, and decompressed stream.
     '''
-    for i, algorithm in enumerate(algorithms):
+    # The native codecs read any contiguous buffer in place, views are not
+    # copied to bytes.
+    compressed_data = memview(compressed_data)
+    for i in sniffer.candidates(
+            algorithms, compressed_data, decompressed_size):
+        algorithm = algorithms[i]
         try:
-            data = algorithm(compressed_data, len(compressed_data))
+            data = cache.decode(
+                algorithm.__name__,
+                lambda data: algorithm(data, len(data)), compressed_data)
             if data:
                 return (i, data)
             else:
@@ -132,7 +146,37 @@ def decompress(algorithms, compressed_data):
     return None
 
 
-def find_volumes(data, process=True):
+def lzma_chunks(compressed_data, chunk_size=0x10000, max_output=None):
+    '''Decode an LZMA stream incrementally.
+
+    At most chunk_size bytes of input and output are handled at a time, so
+    large content can be streamed (to disk) in bounded memory. With max_output
+    decoding stops early, to inspect the start of the content.
+
+    Args:
+        compressed_data (binary): An LZMA stream with the 13-byte header.
+        chunk_size (Optional[int]): The largest input or output chunk.
+        max_output (Optional[int]): Stop after this many decoded bytes.
+
+    Return:
+        generator: The decoded chunks, raises Exception for corrupt content.
+    '''
+    decompressor = efi_compressor.LzmaDecompressor(max_output=max_output)
+    compressed_data = memview(compressed_data)
+    offset = 0
+    while not decompressor.eof:
+        chunk = b""
+        if decompressor.needs_input:
+            if offset >= len(compressed_data):
+                raise EOFError("Truncated LZMA stream")
+            chunk = compressed_data[offset:offset + chunk_size]
+            offset += chunk_size
+        data = decompressor.decompress(chunk, chunk_size)
+        if data:
+            yield data
+
+
+def find_volumes(data, process=True, lazy=False):
     '''Search for arbitary firmware volumes within data.
 
     This is helpful within Raw files and sections.
@@ -145,13 +189,15 @@ def find_volumes(data, process=True):
 
     Args:
         process (Optional[bool]): Call process on each discovered volumn.
+        lazy (Optional[bool]): Defer processing the volumes' children.
 
     Return:
         list: The set of discovered firmware objects.
     '''
     objects = []
+    data = memview(data)
     while True:
-        volume_index = data.find(b"_FVH")
+        volume_index = find_bytes(data, b"_FVH")
         if volume_index < 0:
             break
         volume_index -= (8 + 16 * 2)
@@ -162,6 +208,7 @@ def find_volumes(data, process=True):
         if volume_index > 0:
             objects.append(RawObject(data[:volume_index]))
         if process:
+            fv.lazy = lazy
             fv.process()
         objects.append(fv)
         data = data[volume_index + fv.size:]
@@ -170,10 +217,62 @@ def find_volumes(data, process=True):
     return objects
 
 
+def find_first(root, guid=None, name=None):
+    '''Find the first object with a GUID, or a name, within a tree.
+
+    The tree is walked depth-first and the walk stops at the first match, so
+    when the tree was parsed lazily (parse(lazy=True)) only the objects before
+    the match are processed: compressed sections are only decompressed while
+    they may contain the match. The match itself is then fully processed.
+
+    A name matches the user interface (or version) section of a file, and
+    the file is returned, or any other object with that name.
+
+    Args:
+        root (FirmwareObject): The object to search from.
+        guid (Optional[str]): A GUID, in any form accepted by Guid.
+        name (Optional[str]): An object name.
+
+    Return:
+        FirmwareObject: The first match, or None.
+    '''
+    if guid is None and name is None:
+        raise ValueError("find_first requires a guid or a name")
+    if guid is not None:
+        guid = Guid(guid)
+
+    parents = {}
+    match = None
+    for node, parent, _, _ in walk(root):
+        parents[id(node)] = parent
+        if guid is not None:
+            node_guid = getattr(node, "guid", None)
+            if isinstance(node_guid, bytes) and node_guid == guid:
+                match = node
+                break
+        if name is not None and getattr(node, "name", None) == name:
+            match = node
+            if isinstance(node, FirmwareFileSystemSection):
+                # Sections are named for the file containing them.
+                while parent is not None and not isinstance(parent, FirmwareFile):
+                    parent = parents[id(parent)]
+                if parent is not None:
+                    match = parent
+            break
+
+    if match is not None:
+        for _ in walk(match):
+            pass
+    return match
+
+
 class FirmwareVariableStore(FirmwareObject, StructuredObject):
 
     '''An firmware-related variable storage structure (think NVRAM).'''
-    variables = []
+
+    __slots__ = ()
+
+    variables = ()
 
     @property
     def objects(self):
@@ -183,14 +282,27 @@ class FirmwareVariableStore(FirmwareObject, StructuredObject):
 class FirmwareVariable(FirmwareObject, StructuredObject):
 
     '''A firmware-related variable, found in a variable store.'''
-    subsections = []
+
+    __slots__ = ()
+
+    subsections = ()
 
     @property
     def objects(self):
         return self.subsections
 
 
-class NVARVariable(FirmwareVariable):
+class NVARVariable(FirmwareVariable, CompactObject):
+    '''A NVAR variable, the variable's 'view' includes its header.
+
+    A store may hold tens of thousands of variables, see CompactObject. The
+    header 'structure' is read from the view on access, only the size and
+    attributes are kept.
+    '''
+
+    __slots__ = ("_name", "guid", "size", "attributes", "data_offset")
+
+    structure_size = ctypes.sizeof(NVARVariableHeaderType)
 
     @classmethod
     def valid_nvar(cls, data):
@@ -200,46 +312,69 @@ class NVARVariable(FirmwareVariable):
 
     def _get_name(self, data, is_ascii=False):
         tail = b"\x00" if is_ascii else b"\x00\x00"
-        size = data.find(tail)
+        size = find_bytes(data, tail)
         if not is_ascii:
             name = uefi_name(data[:size])
         else:
-            name = data[:size]
+            name = as_bytes(data[:size])
         return (name, size + len(tail))
 
     def __init__(self, data):
-        self.subsections = []
-        self.name = None
+        CompactObject.__init__(self, data)
+        self._name = None
         self.guid = None
-        self.data = data
+        self.size = 0
+        self.attributes = None
+        self.data_offset = 0
+
+    @property
+    def structure(self):
+        if self.attributes is None:
+            return None
+        return read_structure(self.view, NVARVariableHeaderType)
+
+    @property
+    def structure_data(self):
+        return as_bytes(self.view[:self.structure_size])
+
+    @property
+    def structure_fields(self):
+        return [field[0] for field in NVARVariableHeaderType._fields_]
+
+    @property
+    def attrs(self):
+        if self.attributes is None:
+            return None
+        return {"attrs": self.attributes}
 
     def process(self):
         dlog(self, 'NVAR')
-        if not NVARVariable.valid_nvar(self.data):
+        if not NVARVariable.valid_nvar(self.view):
             return False
-        self.parse_structure(self.data, NVARVariableHeaderType)
-        self.size = self.structure.TotalSize
-        self.attrs = {"attrs": self.structure.Attributes}
+        structure = read_structure(self.view, NVARVariableHeaderType)
+        self.size = structure.TotalSize
+        self.attributes = structure.Attributes
 
         # Now with structure parsed, set bounds on the data
-        self.data = self.data[:self.size]
+        self.data = self.view[:self.size]
         offset = self.structure_size
-        if bit_set(self.structure.Attributes, NVRAM_ATTRIBUTES["GUID"]):
-            self.guid = self.data[offset:offset + 16]
+        if bit_set(self.attributes, NVRAM_ATTRIBUTES["GUID"]):
+            guid = self.view[offset:offset + 16]
+            self.guid = Guid(guid) if len(guid) == 16 else as_bytes(guid)
             offset += 16
         else:
             # Increment data by 1!
             offset += 1
 
-        if bit_set(self.structure.Attributes, NVRAM_ATTRIBUTES["DATA"]):
+        if bit_set(self.attributes, NVRAM_ATTRIBUTES["DATA"]):
             self.data_offset = offset
             # self.subsections.append(RawObject(self.data[offset:]))
             return True
 
         # Parse variable name.
         var_name, var_name_size = self._get_name(
-            self.data[offset:],
-            bit_set(self.structure.Attributes, NVRAM_ATTRIBUTES["DESC_ASCII"])
+            self.view[offset:],
+            bit_set(self.attributes, NVRAM_ATTRIBUTES["DESC_ASCII"])
         )
         if var_name is not None:
             self.name = var_name
@@ -258,14 +393,14 @@ class NVARVariable(FirmwareVariable):
         for section in self.subsections:
             data += section.build(generate_checksum, debug)
         if len(self.subsections) == 0:
-            data = self.data[self.data_offset:]
+            data = as_bytes(self.view[self.data_offset:])
         # Metadata includes optional guid/name.
-        meta_data = self.data[self.structure_size:self.data_offset]
+        meta_data = as_bytes(self.view[self.structure_size:self.data_offset])
         return header + meta_data + data
 
     def dump(self, parent, index=0):
         path = os.path.join(parent, "variable%d.nvar" % index)
-        dump_data(path, self.data)
+        dump_data(path, self.view)
         for i, section in enumerate(self.subsections):
             section.dump(os.path.join(parent, "variable%d-data" % index), i)
 
@@ -276,7 +411,7 @@ class NVARVariable(FirmwareVariable):
                 blue("%sVariable:" % ts),
                 green(sguid(self.guid)),
                 purple(self.name),
-                "attrs= %s" % self.attrs["attrs"]
+                "attrs= %s" % self.attributes
             ))
 
     def to_dict(self):
@@ -284,7 +419,7 @@ class NVARVariable(FirmwareVariable):
             return {
                 'guid': sguid(self.guid),
                 'name': self.name,
-                'attributes': self.attrs["attrs"]
+                'attributes': self.attributes
             }
 
 class NVARVariableStore(FirmwareVariableStore):
@@ -303,7 +438,7 @@ class NVARVariableStore(FirmwareVariableStore):
         if not self.valid_header:
             return False
 
-        var_offset = self.data
+        var_offset = self.view
         total_size = 0
         while len(var_offset) > 4:
             nvar = NVARVariable(var_offset)
@@ -314,7 +449,7 @@ class NVARVariableStore(FirmwareVariableStore):
             var_offset = var_offset[nvar.size:]
 
         # Scope data to just the parsed variables
-        self.data = self.data[:total_size]
+        self.data = self.view[:total_size]
         self.attrs = {"variables": len(self.variables)}
         return True
 
@@ -328,7 +463,7 @@ class NVARVariableStore(FirmwareVariableStore):
         if not self.valid_header:
             return
         path = os.path.join(parent, "nvar.vars")
-        dump_data(path, self.data)
+        dump_data(path, self.view)
         for i, variable in enumerate(self.variables):
             variable.dump(parent, i)
         pass
@@ -355,29 +490,32 @@ class NVARVariableStore(FirmwareVariableStore):
 
 
 class EfiSection(FirmwareObject):
-    subsections = []
+    __slots__ = ()
+
+    subsections = ()
 
     @property
+    @expands
     def objects(self):
         return self.subsections
 
     def process_subsections(self):
         self.subsections = []
 
-        if self.data is None:
+        if self.view is None:
             return False
 
         subsection_offset = 0
         status = True
-        while subsection_offset < len(self.data):
+        while subsection_offset < len(self.view):
             if subsection_offset % 4:
                 subsection_offset += 4 - (subsection_offset % 4)
-            if subsection_offset >= len(self.data):
+            if subsection_offset >= len(self.view):
                 break
 
             try:
                 subsection = FirmwareFileSystemSection(
-                    self.data[subsection_offset:],
+                    self.view[subsection_offset:],
                     self.guid
                 )
             except struct.error as e:
@@ -385,7 +523,7 @@ class EfiSection(FirmwareObject):
                 return False
             if subsection.size == 0:
                 break
-            sub_status = subsection.process()
+            sub_status = self.process_child(subsection, defer=False)
             if not sub_status:
                 dlog(self, 'subsections', 'Could not parse subsection')
                 status = False
@@ -403,6 +541,7 @@ class EfiSection(FirmwareObject):
     def showinfo(self, ts='', index=-1):
         pass
 
+    @expands
     def to_dict(self):
         subsections = []
         for subsection in self.subsections:
@@ -412,6 +551,7 @@ class EfiSection(FirmwareObject):
             'subsections': subsections,
         }
 
+    @expands
     def dump(self, parent="", index=0):
         for i, subsection in enumerate(self.subsections):
             subsection.dump(parent, i)
@@ -427,7 +567,7 @@ class EfiSection(FirmwareObject):
                     (((subsection_size + 3) & (~3)) - subsection_size)
 
         # Pad the pre-compression data
-        trailling_bytes = len(self.data) - len(data)
+        trailling_bytes = len(self.view) - len(data)
         if trailling_bytes > 0:
             data += '\x00' * trailling_bytes
         return data
@@ -440,6 +580,9 @@ class CompressedSection(EfiSection):
     ATTR_STANDARD_COMPRESSION = 0x01
     ATTR_CUSTOMIZED_COMPRESSION = 0x02
 
+    decompressed = False
+    '''bool: Decompression was attempted, see materialize.'''
+
     def __init__(self, data, guid):
         self.guid = guid
         self.data = None
@@ -453,17 +596,43 @@ class CompressedSection(EfiSection):
 
         # Advance the byte pointer through the header
         self.compressed_data = data[5:]
+        self.compressed_size = len(self.compressed_data)
         self.attrs = {
             "decompressed_size": self.decompressed_size, "type": self.type}
 
     def process(self):
         dlog(self, sguid(self.guid))
+        if self.lazy:
+            # Decompress when the subsections are first accessed.
+            return True
+        return self.materialize()
+
+    def expand(self):
+        EfiSection.expand(self)
+        if not self.limited:
+            self.materialize()
+
+    def materialize(self):
+        '''Decompress the section and process the subsections.
+
+        Eager parsing decompresses while processing, lazy parsing waits for
+        the first access to the subsections. The result is kept.
+
+        Return:
+            bool: The decompression and subsection status.
+        '''
+        if not self.decompressed:
+            self.decompressed = True
+            self.status = self._decompress()
+        return self.status
+
+    def _decompress(self):
         def bf_decompress(data):
             return decompress([
                 efi_compressor.LzmaDecompress,
                 efi_compressor.TianoDecompress,
                 efi_compressor.EfiDecompress,
-            ], data)
+            ], data, self.decompressed_size)
 
         if self.type == 0x00:
             '''No compression.'''
@@ -476,7 +645,7 @@ class CompressedSection(EfiSection):
             results = decompress([
                 efi_compressor.EfiDecompress,
                 efi_compressor.TianoDecompress,
-            ], self.compressed_data)
+            ], self.compressed_data, self.decompressed_size)
         if self.type == 0x02:
             results = bf_decompress(self.compressed_data)
             if results is None and len(self.compressed_data) > 4:
@@ -497,10 +666,10 @@ class CompressedSection(EfiSection):
                     )
                 )
                 raw = AutoRawObject(self.compressed_data)
-                raw.process()
-                self.subsections.append(raw)
+                self.process_child(raw, defer=False)
+                self.subsections = [raw]
 
-        if self.data is None:
+        if self.view is None:
             '''No data was uncompressed.'''
             return True
 
@@ -508,6 +677,7 @@ class CompressedSection(EfiSection):
         return status
         pass
 
+    @expands
     def build(self, generate_checksum=False, debug=False):
         data = self._build_subsections()
 
@@ -525,12 +695,14 @@ class CompressedSection(EfiSection):
         return header + data
         pass
 
+    @expands
     def showinfo(self, ts):
         if self.name is not None:
             print ("%s %s" % (blue("%sCompressed Name:" % ts), purple(self.name)))
         for i, _object in enumerate(self.subsections):
             _object.showinfo(ts, i)
 
+    @expands
     def to_dict(self):
         subsections = []
         for subsection in self.subsections:
@@ -545,7 +717,7 @@ class VersionSection(EfiSection):
 
     def __init__(self, data):
         self.data = data
-        self.build_number = struct.unpack("<16s", self.data[:16])
+        self.build_number = struct.unpack("<16s", self.view[:16])
 
 
 class FreeformGuidSection(EfiSection):
@@ -557,27 +729,30 @@ class FreeformGuidSection(EfiSection):
     name = None
 
     def __init__(self, data):
-        self.guid = struct.unpack("<16s", data[:16])[0]
+        self.guid = Guid(struct.unpack("<16s", data[:16])[0])
         self.data = data[16:]
 
     def process(self):
         dlog(self, sguid(self.guid))
-        if sguid(self.guid) == FIRMWARE_FREEFORM_GUIDS["CHAR_GUID"]:
-            self.guid_header = self.data[:12]
-            self.name = uefi_name(self.data[12:])
+        if FIRMWARE_FREEFORM_GUID_NAMES.get(self.guid) == "CHAR_GUID":
+            self.guid_header = self.view[:12]
+            self.name = uefi_name(self.view[12:])
         return True
 
+    @expands
     def build(self, generate_checksum=False, debug=False):
         # print "Building FreeformGUID: %s" % green(sguid(self.guid))
 
         header = struct.pack("<16s", self.guid)
         return header + self.data
 
+    @expands
     def showinfo(self, ts='', index=-1):
         # print "%sGUID: %s" % (ts, green(sguid(self.guid)))
         if self.name is not None:
             print ("%sGUID Description: %s" % (ts, purple(self.name)))
 
+    @expands
     def to_dict(self):
         return {
             'guid': sguid(self.guid),
@@ -589,41 +764,109 @@ class GuidDefinedSection(EfiSection):
     '''A firmware file section type (GUID-defined)
 
     struct { UCHAR GUID[16]; short offset; short attrs; }
+
+    The GUID identifies the codec, until the section is decompressed (see
+    materialize) data is the encoded content.
     '''
 
     ATTR_PROCESSING_REQUIRED = 0x01
     ATTR_AUTH_STATUS_VALID = 0x02
 
+    _LZMA_TYPES = ("LZMA_COMPRESSED", "LZMA_COMPRESSED_HP")
+
+    decompressed = False
+    '''bool: Decoding the content was attempted, see materialize.'''
+
     def __init__(self, data):
         self.guid, self.offset, self.attr_mask = struct.unpack(
             "<16sHH", data[:20])
+        self.guid = Guid(self.guid)
 
         # A guid-defined section includes an offset
+        self._data = data
         self.preamble = data[20:self.offset]
         self.data = data[self.offset:]
         self.attrs = {"attrs": self.attr_mask}
         self.subsections = []
 
     @property
+    @expands
     def objects(self):
         return self.subsections
 
+    @property
+    def guid_type(self):
+        '''string: The FIRMWARE_GUIDED_GUIDS name of the GUID, or None.'''
+        return FIRMWARE_GUIDED_GUID_NAMES.get(self.guid)
+
+    @property
+    def body(self):
+        '''The preamble and data, a contiguous view of the section content.'''
+        return self._data[min(self.offset, 20):]
+
     def process(self):
         dlog(self, sguid(self.guid))
+        if self.lazy:
+            # Decode when the subsections are first accessed.
+            return True
+        return self.materialize()
+
+    def expand(self):
+        EfiSection.expand(self)
+        if not self.limited:
+            self.materialize()
+
+    def materialize(self):
+        '''Decode the section content and process the subsections.
+
+        Eager parsing decodes while processing, lazy parsing waits for the
+        first access to the subsections. The result is kept.
+
+        Return:
+            bool: The decoding and subsection status.
+        '''
+        if not self.decompressed:
+            self.decompressed = True
+            self.status = self._decompress()
+        return self.status
+
+    def peek(self, size=0x1000):
+        '''Decode the start of an LZMA section without decoding it all.
+
+        This is cheap for large sections, e.g. to check for a nested volume
+        or an executable before materializing.
+
+        Args:
+            size (Optional[int]): The number of bytes to decode.
+
+        Return:
+            binary: Up to size decoded bytes, None if the section is not LZMA
+                or cannot be decoded.
+        '''
+        if self.guid_type not in self._LZMA_TYPES:
+            return None
+        for data in [self.body, self.view]:
+            try:
+                return b"".join(lzma_chunks(data, max_output=size))
+            except Exception:
+                continue
+        return None
+
+    def _decompress(self):
         def parse_volume():
-            fv = FirmwareVolume(self.data)
+            fv = FirmwareVolume(self.view)
             if fv.valid_header:
-                fv.process()
+                self.process_child(fv, defer=False)
                 self.subsections = [fv]
                 return True
             return False
 
         def decompress_guid(alg):
             # Try to decompress the body of the section.
-            results = decompress([alg], self.preamble + self.data)
+            results = decompress([alg], self.body)
             if results is None:
                 # Attempt to recover by skipping the preamble.
-                results = decompress([alg], self.data)
+                results = decompress([alg], self.view)
                 if results is None:
                     return False
             self.subtype = results[0] + 1
@@ -631,12 +874,13 @@ class GuidDefinedSection(EfiSection):
             return self.process_subsections()
 
         status = True
-        if sguid(self.guid) in [FIRMWARE_GUIDED_GUIDS["LZMA_COMPRESSED"], FIRMWARE_GUIDED_GUIDS["LZMA_COMPRESSED_HP"]]:
+        guid_type = self.guid_type
+        if guid_type in self._LZMA_TYPES:
             status = decompress_guid(efi_compressor.LzmaDecompress)
-        elif sguid(self.guid) == FIRMWARE_GUIDED_GUIDS["TIANO_COMPRESSED"]:
+        elif guid_type == "TIANO_COMPRESSED":
             status = decompress_guid(efi_compressor.TianoDecompress)
-        elif sguid(self.guid) == FIRMWARE_GUIDED_GUIDS["ZLIB_COMPRESSED_AMD"]:
-            body = self.preamble + self.data
+        elif guid_type == "ZLIB_COMPRESSED_AMD":
+            body = self.body
             if len(body) < 0x100:
                 dlog(self, sguid(self.guid), 'error, invalid AMD zlib section header size')
                 return False
@@ -646,7 +890,7 @@ class GuidDefinedSection(EfiSection):
                 dlog(self, sguid(self.guid), 'error, invalid AMD zlib section header')
                 return False
             try:
-                data = zlib.decompress(compressed_data)
+                data = cache.decode("zlib", zlib.decompress, compressed_data)
                 if data:
                     self.subtype = 0
                     self.data = data
@@ -654,12 +898,12 @@ class GuidDefinedSection(EfiSection):
                 else:
                     status = False
                     dlog(self, sguid(self.guid), 'error, empty zlib decompress')
-            except zlib.error as err:
+            except (zlib.error, cache.CachedFailure) as err:
                 status = False
                 dlog(self, sguid(self.guid), 'zlib error: %s' % str(err))
-        elif sguid(self.guid) == FIRMWARE_GUIDED_GUIDS["GZIP_COMPRESSED_QC"]:
+        elif guid_type == "GZIP_COMPRESSED_QC":
             try:
-                data = gzip.decompress(self.preamble + self.data)
+                data = cache.decode("gzip", gzip.decompress, self.body)
                 if data:
                     self.subtype = 0
                     self.data = data
@@ -671,19 +915,20 @@ class GuidDefinedSection(EfiSection):
                 status = False
                 dlog(self, sguid(self.guid), 'gzip error: %s' % str(err))
         # Todo: check for processing required attribute
-        elif sguid(self.guid) == FIRMWARE_GUIDED_GUIDS["STATIC_GUID"]:
+        elif guid_type == "STATIC_GUID":
             # Todo: verify this (FirmwareFile hack)
-            self.data = self.preamble[-4:] + self.data
+            # Include up to 4 bytes of the preamble, without copying.
+            self.data = self.body[max(len(self.preamble) - 4, 0):]
             status = self.process_subsections()
             if len(self.subsections) == 0:
                 # There were no subsections parsed, treat as a firmware volume
                 status = parse_volume()
                 if not status:
-                    raw = AutoRawObject(self.data)
-                    raw.process()
+                    raw = AutoRawObject(self.view)
+                    self.process_child(raw, defer=False)
                     self.subsections.append(raw)
             pass
-        elif sguid(self.guid) == FIRMWARE_GUIDED_GUIDS["FIRMWARE_VOLUME"]:
+        elif guid_type == "FIRMWARE_VOLUME":
             status = parse_volume()
         else:
             # Undefined GUIDed-Section GUID, treat as a FV, don't require
@@ -693,17 +938,19 @@ class GuidDefinedSection(EfiSection):
             dlog(self, sguid(self.guid), 'Could not parse GUID object')
         return status
 
+    @expands
     def build(self, generate_checksum=False, debug=False):
         data = self._build_subsections(generate_checksum)
 
-        if sguid(self.guid) in [FIRMWARE_GUIDED_GUIDS["LZMA_COMPRESSED"], FIRMWARE_GUIDED_GUIDS["LZMA_COMPRESSED_HP"]]:
+        if self.guid_type in self._LZMA_TYPES:
             data = efi_compressor.LzmaCompress(data, len(data))
             pass
 
         header = struct.pack(
             "<16sHH", self.guid, self.offset, self.attrs["attrs"])
-        return header + self.preamble + data
+        return header + as_bytes(self.preamble) + data
 
+    @expands
     def showinfo(self, ts='', index=0):
         auth_status = "ATTR_UNKNOWN"
         if self.attrs["attrs"] == self.ATTR_AUTH_STATUS_VALID:
@@ -718,6 +965,7 @@ class GuidDefinedSection(EfiSection):
             for i, section in enumerate(self.subsections):
                 section.showinfo("%s  " % ts, index=i)
 
+    @expands
     def to_dict(self):
         auth_status = "ATTR_UNKNOWN"
         if self.attrs["attrs"] == self.ATTR_AUTH_STATUS_VALID:
@@ -738,6 +986,7 @@ class GuidDefinedSection(EfiSection):
             'subsections': subsections,
         }
 
+    @expands
     def dump(self, parent="", generate_checksum=False, debug=False):
         for i, subsection in enumerate(self.subsections):
             subsection.dump(parent, i)
@@ -748,18 +997,28 @@ class GuidDefinedSection(EfiSection):
     pass
 
 
-class FirmwareFileSystemSection(EfiSection):
+class FirmwareFileSystemSection(EfiSection, CompactObject):
     '''A firmware file section
 
     struct { UINT8 Size[3]; EFI_SECTION_TYPE Type; } EFI_COMMON_SECTION_HEADER;
     struct { UINT8 Size[3]; EFI_SECTION_TYPE Type; UINT32 ExtendedSize; } EFI_COMMON_SECTION_HEADER2;
+
+    Files may hold many sections, see CompactObject. For object sections the
+    'parsed_object' keeps track of each.
     '''
 
-    parsed_object = None
-    '''For object sections, keep track of each.'''
+    __slots__ = (
+        "guid", "valid_header", "size", "type", "_name", "parsed_object",
+        "build_number", "path")
 
     def __init__(self, data, guid):
+        CompactObject.__init__(self)
         self.guid = guid
+        self._name = None
+        self.parsed_object = None
+        self.size = 0
+        self.type = None
+        data = memview(data)
         header = data[:0x4]
 
         self.valid_header = True
@@ -781,11 +1040,17 @@ class FirmwareFileSystemSection(EfiSection):
             return
 
         self._data = data[:self.size]
-        if large_header:
-            self.data = data[0x8:self.size]
-        else:
-            self.data = data[0x4:self.size]
-        self.name = None
+        self.header_size = 0x8 if large_header else 0x4
+
+    @property
+    def attrs(self):
+        if not self.valid_header:
+            return None
+        return {
+            "type": self.type,
+            "size": self.size,
+            "type_name": _get_section_type(self.type)[0]
+        }
 
     @property
     def objects(self):
@@ -793,68 +1058,70 @@ class FirmwareFileSystemSection(EfiSection):
 
     def regen(self, data):
         # Transitional method, should be adopted by other objects.
-        self._data = data
-        self.data = data[0x4:]
+        self._data = memview(data)
+        self.header_size = 0x4
 
     def process(self):
         # section types, see PI spec v1.7 Errata A Volume 3, 2.1.5.1, table 3-4
         dlog(self, sguid(self.guid))
         self.parsed_object = None
         raw_object = False
+        if self.headers_only:
+            # Keep the section's content unprocessed.
+            self.max_depth = 0
 
         if self.type == 0x01:  # compression
-            compressed_section = CompressedSection(self.data, self.guid)
+            compressed_section = CompressedSection(self.view, self.guid)
             self.parsed_object = compressed_section
 
         elif self.type == 0x02:  # GUID-defined
-            guid_defined = GuidDefinedSection(self.data)
+            guid_defined = GuidDefinedSection(self.view)
             self.parsed_object = guid_defined
 
         elif self.type == 0x14:  # version string
-            self.build_number = struct.unpack("<H", self.data[0:2])[0]
-            self.name = uefi_name(self.data[2:])
+            self.build_number = struct.unpack("<H", self.view[0:2])[0]
+            self.name = uefi_name(self.view[2:])
 
         elif self.type == 0x15:  # user interface name
-            self.name = uefi_name(self.data)
+            self.name = uefi_name(self.view)
 
         elif self.type == 0x17:  # firmware-volume
-            fv = FirmwareVolume(self.data, sguid(self.guid))
+            fv = FirmwareVolume(self.view, sguid(self.guid))
             if not fv.valid_header:
                 # Could be a FFSv3 section (Kairos sample)
-                fv = FirmwareVolume(self.data[4:], sguid(self.guid))
+                fv = FirmwareVolume(self.view[4:], sguid(self.guid))
             if fv.valid_header:
                 self.parsed_object = fv
 
         elif self.type == 0x18:  # freeform GUID
-            freeform_guid = FreeformGuidSection(self.data)
+            freeform_guid = FreeformGuidSection(self.view)
             self.parsed_object = freeform_guid
 
         elif self.type == 0x19:  # raw
             raw_object = True
-            if self.data[:10] == b"123456789A":
+            if self.view[:10] == b"123456789A":
                 # HP adds a strange header to nested FVs.
-                fv = FirmwareVolume(self.data[12:], sguid(self.guid))
+                fv = FirmwareVolume(self.view[12:], sguid(self.guid))
                 self.parsed_object = fv
             else:
                 # For a raw section, we can cheat and assign the parsed object
                 # as the AutoRawObject's managed object
-                raw = AutoRawObject(self.data)
-                raw.process()
+                raw = AutoRawObject(self.view)
+                self.process_child(raw, defer=False)
                 if raw.object is not None:
                     self.parsed_object = raw.object
-
-        self.attrs = {"type": self.type, "size": self.size}
-        self.attrs["type_name"] = _get_section_type(self.type)[0]
+                elif raw.limited:
+                    self.parsed_object = raw
 
         if self.parsed_object is None:
             return True
-        status = self.parsed_object.process()
+        status = self.process_child(self.parsed_object)
         if not status:
             dlog(self, sguid(self.guid), 'Could not parse %s' % (
                 self.parsed_object.__class__.__name__))
             # Allow raw objects to fall-back.
             if raw_object:
-                self.parsed_object = RawObject(self.data)
+                self.parsed_object = RawObject(self.view)
                 status = True
 
             # If we failed to unpack/parse one of the GuidDefinedSections
@@ -898,12 +1165,13 @@ class FirmwareFileSystemSection(EfiSection):
             print ("%s  Version: %s BuildNum: %d" % (ts, self.name, self.build_number))
         # DXE, PEI and SMM DEPEX sections
         if self.type == 0x13 or self.type == 0x1b or self.type == 0x1c:
+            view = self.view
             offset = 0
-            while offset < len(self.data):
-                opcode = ord(self.data[offset:offset+1])
+            while offset < len(view):
+                opcode = view[offset]
                 offset = offset + 1
                 if opcode == 0x02:
-                    guid = self.data[offset:offset+16]
+                    guid = as_bytes(view[offset:offset+16])
                     guid_name = get_guid_name(guid)
                     offset = offset + 16
                     if guid_name is not None:
@@ -939,7 +1207,7 @@ class FirmwareFileSystemSection(EfiSection):
         # 0x1b - PEI DepEx
         # 0x1c - SMM DepEx
         if self.type == 0x13 or self.type == 0x1b or self.type == 0x1c:
-            data = parse_depex(self.data)
+            data = parse_depex(self.view)
 
         return {
             'type': self.type,
@@ -952,13 +1220,13 @@ class FirmwareFileSystemSection(EfiSection):
     def dump(self, parent="", index=0):
         self.path = os.path.join(
             parent, "section%d.%s" % (index, _get_section_type(self.type)[1]))
-        dump_data(self.path, self.data)
+        dump_data(self.path, self.view)
 
         if self.parsed_object is not None:
             self.parsed_object.dump(os.path.join(parent, "section%d" % index))
 
 
-class FirmwareFile(FirmwareObject):
+class FirmwareFile(CompactObject):
     '''A firmware file is contained within a firmware file system and is
     comprised of firmware file sections.
 
@@ -973,32 +1241,42 @@ class FirmwareFile(FirmwareObject):
     '''
     _HEADER_SIZE = 0x18  # 24 byte header, always
 
+    __slots__ = (
+        "guid", "checksum", "type", "attributes", "size", "state",
+        "raw_blobs", "sections")
+
     def __init__(self, data):
+        CompactObject.__init__(self)
+        data = memview(data)
         header = data[:self._HEADER_SIZE]
 
         try:
             self.guid, self.checksum, self.type, self.attributes, \
                 self.size, self.state = struct.unpack("<16sHBB3sB", header)
+            self.guid = Guid(self.guid)
             self.size = struct.unpack("<I", self.size + b"\x00")[0]
         except Exception as e:
             print_error("Error: invalid FirmwareFile header.")
             raise e
 
-        self.attrs = {
-            "size": self.size,
-            "type": self.type,
-            "attributes": self.attributes,
-            "state": self.state ^ 0xFF
-        }
-        self.attrs["type_name"] = _get_file_type(self.type)[0]
-
         # The size includes the header bytes.
         self._data = data[:self.size]
-        self.data = data[self._HEADER_SIZE:self.size]
+        self.header_size = self._HEADER_SIZE
         self.raw_blobs = []
         self.sections = []
 
     @property
+    def attrs(self):
+        return {
+            "size": self.size,
+            "type": self.type,
+            "attributes": self.attributes,
+            "state": self.state ^ 0xFF,
+            "type_name": _get_file_type(self.type)[0]
+        }
+
+    @property
+    @expands
     def objects(self):
         invalid_types = [bytes, str, str]
         valid_blobs = [
@@ -1018,14 +1296,14 @@ class FirmwareFile(FirmwareObject):
             return True
 
         status = True
-        if sguid(self.guid) == FIRMWARE_VOLUME_GUIDS["NVRAM_NVAR"]:
-            var_store = NVARVariableStore(self.data)
+        if FIRMWARE_VOLUME_GUID_NAMES.get(self.guid) == "NVRAM_NVAR":
+            var_store = NVARVariableStore(self.view)
             if not var_store.valid_header:
-                raw = AutoRawObject(self.data)
-                raw.process()
+                raw = AutoRawObject(self.view)
+                self.process_child(raw, defer=False)
                 self.raw_blobs.append(raw)
             else:
-                status = var_store.process()
+                status = self.process_child(var_store, defer=False)
                 self.raw_blobs.append(var_store)
                 if not status:
                     dlog(self, sguid(self.guid), 'Could not parse NVAR')
@@ -1040,12 +1318,12 @@ class FirmwareFile(FirmwareObject):
 
         if self.type == 0x00:  # unknown
             dlog(self, sguid(self.guid), 'file is unknown')
-            raw = AutoRawObject(self.data)
-            raw.process()
+            raw = AutoRawObject(self.view)
+            self.process_child(raw, defer=False)
             self.raw_blobs.append(raw)
             return True
 
-        section_data = self.data
+        section_data = self.view
         self.sections = []
         while len(section_data) >= 4:
             file_section = FirmwareFileSystemSection(section_data, self.guid)
@@ -1058,7 +1336,7 @@ class FirmwareFile(FirmwareObject):
                             file_section.size)
                 return False
 
-            status = file_section.process() and status
+            status = self.process_child(file_section, defer=False) and status
             self.sections.append(file_section)
 
             section_data = section_data[(file_section.size + 3) & (~3):]
@@ -1070,28 +1348,29 @@ class FirmwareFile(FirmwareObject):
         status = True
 
         # It may be a firmware volume (Lenovo or HP).
-        fv = FirmwareVolume(self.data, sguid(self.guid))
+        fv = FirmwareVolume(self.view, sguid(self.guid))
         if fv.valid_header:
             has_object = True
-            status = fv.process() and status
+            status = self.process_child(fv, defer=False) and status
             self.raw_blobs.append(fv)
-        elif self.data[0x10:0x10 + 4] == FLASH_HEADER:
+        elif self.view[0x10:0x10 + 4] == FLASH_HEADER:
             # Lenovo may also bundle a flash descriptor as raw content.
             from .flash import FlashDescriptor
-            flash = FlashDescriptor(self.data)
+            flash = FlashDescriptor(self.view)
             if flash.valid_header:
                 has_object = True
-                status = flash.process() and status
+                status = self.process_child(flash, defer=False) and status
                 self.raw_blobs.append(flash)
 
         # If everything is normal (according to the FV/FF spec).
         if not has_object:
             # There may be arbitrary firmware structures (Lenovo)
-            objects = find_volumes(self.data)
+            objects = find_volumes(self.view, lazy=self.lazy)
             self.raw_blobs += objects
             return True
         return status
 
+    @expands
     def build(self, generate_checksum=False, debug=False):
         data = b""
         for i, section in enumerate(self.sections):
@@ -1134,6 +1413,7 @@ class FirmwareFile(FirmwareObject):
         )
         return size, header + data
 
+    @expands
     def showinfo(self, ts='', index="N/A"):
         guid_name = get_guid_name(self.guid)
         if guid_name is None:
@@ -1166,6 +1446,7 @@ class FirmwareFile(FirmwareObject):
         for i, section in enumerate(self.sections):
             section.showinfo(ts + "  ", index=i)
 
+    @expands
     def to_dict(self):
         sections = []
         for section in self.sections:
@@ -1208,6 +1489,7 @@ class FirmwareFile(FirmwareObject):
             print ("%s Might contain CPU microcodes" % (
                 blue("%sBlob %d:" % (ts, index))))
 
+    @expands
     def dump(self, parent=""):
         parent = os.path.join(parent, "file-%s" % sguid(self.guid))
 
@@ -1229,12 +1511,13 @@ class FirmwareFileSystem(FirmwareObject):
 
     def __init__(self, data):
         self.files = []
-        self._data = data
+        self._data = memview(data)
 
         # Overflow data is non-file data within the filesystem
         self.overflow_data = ""
 
     @property
+    @expands
     def objects(self):
         return self.files or []
 
@@ -1244,24 +1527,30 @@ class FirmwareFileSystem(FirmwareObject):
         dlog(self, 'ffs')
         data = self._data
         status = True
+        files = []
         while len(data) >= 24 and data[:24] != (b"\xff" * 24):
             firmware_file = FirmwareFile(data)
 
             if firmware_file.size < 24:
                 # This is a problem, the file was corrupted.
                 break
-            ff_status = firmware_file.process()
+            files.append(firmware_file)
+            data = data[(firmware_file.size + 7) & (~7):]
+
+        # Files, and their compressed sections, are processed in parallel.
+        for firmware_file, ff_status in zip(
+                files, self.process_children(files)):
             if not ff_status:
                 dlog(self, 'ffs', 'Could not parse FF')
                 status = False
             self.files.append(firmware_file)
-            data = data[(firmware_file.size + 7) & (~7):]
 
         if len(data) > 0:
             # There is overflow data
             self.overflow_data = data
         return status
 
+    @expands
     def build(self, generate_checksum=False, debug=False):
 
         # Generate the file system data as an unstructed set of file data.
@@ -1271,7 +1560,7 @@ class FirmwareFileSystem(FirmwareObject):
             data += file_data
             data += b"\xFF" * (((file_size + 7) & (~7)) - file_size)
 
-        data += self.overflow_data
+        data += as_bytes(self.overflow_data)
 
         if len(data) != len(self._data):
             print ("ffs size mismatch old=%d new=%d %d" % (
@@ -1283,16 +1572,19 @@ class FirmwareFileSystem(FirmwareObject):
         return data
         pass
 
+    @expands
     def showinfo(self, ts='', index=None):
         for i, firmware_file in enumerate(self.files):
             firmware_file.showinfo(ts + ' ', index=i)
 
+    @expands
     def to_dict(self):
         res = []
         for firmware_file in self.files:
             res.append(firmware_file.to_dict())
         return res
 
+    @expands
     def dump(self, parent=""):
         dump_data(os.path.join(parent, "filesystem.ffs"), self._data)
 
@@ -1337,16 +1629,18 @@ class FirmwareVolume(FirmwareObject):
 
     _EXT_HEADER_SIZE = 0x14
 
+    _FFS_TYPES = ("FFS1", "FFS2", "FFS3", "PFH1", "PFH2")
+
     name = None
     '''string: An optional name or offset of the firmware volume.'''
 
     block_map = None
     '''list: An empty block set.'''
 
-    firmware_filesystems = []
+    firmware_filesystems = ()
     '''list: Set of FirmwareFileSystems discovered in volume.'''
 
-    raw_objects = []
+    raw_objects = ()
     '''list: Set of RawObjects discovered in volume.'''
 
     def __init__(self, data, name="0"):
@@ -1354,6 +1648,7 @@ class FirmwareVolume(FirmwareObject):
         self.raw_objects = []
         self.name = name
         self.valid_header = False
+        data = memview(data)
         try:
             header = data[:self._HEADER_SIZE]
             self.rsvd, self.guid, self.size, self.magic, self.attributes, \
@@ -1367,7 +1662,8 @@ class FirmwareVolume(FirmwareObject):
         if self.magic != b'_FVH':
             return
 
-        if sguid(self.guid) not in list(FIRMWARE_VOLUME_GUIDS.values()):
+        self.guid = Guid(self.guid)
+        if self.guid not in FIRMWARE_VOLUME_GUID_SET:
             dlog(self, sguid(self.guid), 'Unrecognized volume GUID')
             return
 
@@ -1389,6 +1685,7 @@ class FirmwareVolume(FirmwareObject):
             try:
                 exthdr = self._data[self.exthdroff:self.exthdroff + self._EXT_HEADER_SIZE]
                 self.fvname, self.exthdrsize = struct.unpack("<16sI", exthdr)
+                self.fvname = Guid(self.fvname)
                 if self.exthdrsize != self._EXT_HEADER_SIZE:
                     dlog(self, name, "Unexpected ext header size: 0x%x (expected 0x%x)" % (
                         self.exthdrsize, self._EXT_HEADER_SIZE))
@@ -1400,6 +1697,7 @@ class FirmwareVolume(FirmwareObject):
         pass
 
     @property
+    @expands
     def objects(self):
         return self.firmware_filesystems or []
 
@@ -1426,32 +1724,26 @@ class FirmwareVolume(FirmwareObject):
             dlog(self, self.name, 'No blocks discovered')
             return False
 
-        data = self.data
+        data = self.view
         self.firmware_filesystems = []
         self.raw_objects = []
         status = True
 
-        ffs_guids = [
-            FIRMWARE_VOLUME_GUIDS["FFS1"],
-            FIRMWARE_VOLUME_GUIDS["FFS2"],
-            FIRMWARE_VOLUME_GUIDS["FFS3"],
-            FIRMWARE_VOLUME_GUIDS["PFH1"],
-            FIRMWARE_VOLUME_GUIDS["PFH2"],
-        ]
+        fvtype = FIRMWARE_VOLUME_GUID_NAMES.get(self.guid)
         for block in self.blocks:
-            if sguid(self.guid) in ffs_guids:
+            if fvtype in self._FFS_TYPES:
                 # FIXME: there may only be a single FFS, which is the FV body
                 # see https://uefi.org/sites/default/files/resources/PI_Spec_1_7_A_final_May1.pdf
                 # Volume 3, section 2.1.2
                 # and https://edk2-docs.gitbook.io/edk-ii-build-specification/2_design_discussion/22_uefipi_firmware_images
                 firmware_filesystem = FirmwareFileSystem(
                     data[:block[0] * block[1]])
-                ffs_status = firmware_filesystem.process()
+                ffs_status = self.process_child(firmware_filesystem)
                 if not ffs_status:
                     dlog(self, self.name, 'Could not parse FFS')
                     status = False
                 self.firmware_filesystems.append(firmware_filesystem)
-            elif sguid(self.guid) == FIRMWARE_VOLUME_GUIDS["NVRAM_EVSA"]:
+            elif fvtype == "NVRAM_EVSA":
                 # If this is an NVRAM volume, there are no FFS/FFs.
                 self.raw_objects.append(
                     NVARVariableStore(data[:block[0] * block[1]]))
@@ -1460,6 +1752,7 @@ class FirmwareVolume(FirmwareObject):
             data = data[block[0] * block[1]:]
         return status
 
+    @expands
     def build(self, generate_checksum=False, debug=False):
         # Generate blocks from FirmwareFileSystems
         data = b""
@@ -1487,15 +1780,12 @@ class FirmwareVolume(FirmwareObject):
         return header + block_map + data
         pass
 
+    @expands
     def showinfo(self, ts='', index=None):
-        if not self.valid_header or len(self.data) == 0:
+        if not self.valid_header or len(self.view) == 0:
             return
 
-        fvtype = None
-        for fvtypestr in FIRMWARE_VOLUME_GUIDS:
-            if sguid(self.guid) == FIRMWARE_VOLUME_GUIDS[fvtypestr]:
-                fvtype = fvtypestr
-                break
+        fvtype = FIRMWARE_VOLUME_GUID_NAMES.get(self.guid)
         if fvtype is not None:
             if hasattr(self, 'fvname'):
                 print("%s %s %s, attr 0x%08x, rev %d, cksum 0x%x, size 0x%x (%d bytes)" % (
@@ -1550,8 +1840,9 @@ class FirmwareVolume(FirmwareObject):
         for raw in self.raw_objects:
             print("%s%s NVRAM" % ("%s  " % ts, blue("Raw section:")))
 
+    @expands
     def to_dict(self):
-        if not self.valid_header or len(self.data) == 0:
+        if not self.valid_header or len(self.view) == 0:
             return
 
         blocks = []
@@ -1581,8 +1872,9 @@ class FirmwareVolume(FirmwareObject):
             'ffs': ffs,
         }
 
+    @expands
     def dump(self, parent="", index=None):
-        if len(self.data) == 0:
+        if len(self.view) == 0:
             return
 
         path = os.path.join(parent, "volume-%s.fv" % self.name)
@@ -1621,11 +1913,13 @@ class FirmwareCapsule(FirmwareObject):
         self.valid_header = True
         self.data = None
 
-        self.capsule_guid = data[:16]
-        self.guid = "\x00" * 16
-        if sguid(self.capsule_guid) not in FIRMWARE_CAPSULE_GUIDS:
+        data = memview(data)
+        self.capsule_guid = as_bytes(data[:16])
+        self.guid = Guid(b"\x00" * 16)
+        if self.capsule_guid not in FIRMWARE_CAPSULE_GUID_SET:
             self.valid_header = False
             return
+        self.capsule_guid = Guid(self.capsule_guid)
 
         try:
             self.parse_capsule_header(data[16:])
@@ -1643,13 +1937,13 @@ class FirmwareCapsule(FirmwareObject):
         pass
 
     def parse_capsule_header(self, data):
-        if sguid(self.capsule_guid) == FIRMWARE_CAPSULE_GUIDS[0]:
+        if self.capsule_guid == FIRMWARE_CAPSULE_GUID_BYTES[0]:
             # EFICapsule
             self.size, self.flags, self.image_size, self.seq_num = struct.unpack(
                 "<IIII",
                 data[:4 * 4]
             )
-            self.guid = data[16:32]
+            self.guid = Guid(data[16:32])
             split_info, capsule_body, oem_header, author_info, revision_info, \
                 short_desc, long_desc, compatibility = struct.unpack(
                     "<" + "I" * 8,
@@ -1669,7 +1963,7 @@ class FirmwareCapsule(FirmwareObject):
                 "long_desc": long_desc,
                 "compatibility": compatibility
             }
-        elif sguid(self.capsule_guid) == FIRMWARE_CAPSULE_GUIDS[1]:
+        elif self.capsule_guid == FIRMWARE_CAPSULE_GUID_BYTES[1]:
             # EFI2Capsule
             self.size, self.flags, self.image_size = struct.unpack(
                 "<III", data[:4 * 3])
@@ -1679,7 +1973,7 @@ class FirmwareCapsule(FirmwareObject):
                 "oem_header": oem_header,
                 "author_info": 0
             }
-        elif sguid(self.capsule_guid) == FIRMWARE_CAPSULE_GUIDS[2]:
+        elif self.capsule_guid == FIRMWARE_CAPSULE_GUID_BYTES[2]:
             # UEFI Capsule
             self.size, self.flags, self.image_size = struct.unpack(
                 "<III", data[:4 * 3])
@@ -1688,7 +1982,7 @@ class FirmwareCapsule(FirmwareObject):
                 "oem_header": 0,
                 "author_info": 0
             }
-        elif sguid(self.capsule_guid) == FIRMWARE_CAPSULE_GUIDS[4]:
+        elif self.capsule_guid == FIRMWARE_CAPSULE_GUID_BYTES[4]:
             # AMI Aptio Capsule
             self.size, self.flags, self.image_size = struct.unpack(
                 "<III", data[:4 * 3])
@@ -1712,20 +2006,20 @@ class FirmwareCapsule(FirmwareObject):
 
     def process(self):
         # Copy the EOH to capsule into a preamble
-        self.preamble = self.data[:self.offsets["capsule_body"]]
+        self.preamble = self.view[:self.offsets["capsule_body"]]
         self.parse_sections(None)
 
-        fv = FirmwareVolume(self.data[self.offsets["capsule_body"]:])
+        fv = FirmwareVolume(self.view[self.offsets["capsule_body"]:])
         if not fv.valid_header:
             # The body could be an offset from the end of the header (Intel
             # does this).
             fv = FirmwareVolume(
-                self.data[self.offsets["capsule_body"] - self.header_size:])
+                self.view[self.offsets["capsule_body"] - self.header_size:])
             if not fv.valid_header:
                 return False
 
         self.size += fv.size
-        if not fv.process():
+        if not self.process_child(fv, defer=False):
             # Todo: test code coverage
             # return False
             pass
@@ -1736,14 +2030,15 @@ class FirmwareCapsule(FirmwareObject):
         if self.capsule_body is not None:
             body = self.capsule_body.build(generate_checksum, debug=debug)
         else:
-            body = self.data[self.offsets["capsule_body"]:]
+            body = as_bytes(self.view[self.offsets["capsule_body"]:])
 
         # Assume no size change
-        return self._data[:self.header_size] + self.preamble + body
+        return as_bytes(self._data[:self.header_size]) + \
+            as_bytes(self.preamble) + body
         pass
 
     def showinfo(self, ts='', index=None):
-        if not self.valid_header or len(self.data) == 0:
+        if not self.valid_header or len(self.view) == 0:
             return
 
         print ("%s %s flags 0x%08x, size 0x%x (%d bytes)" % (
@@ -1764,7 +2059,7 @@ class FirmwareCapsule(FirmwareObject):
         pass
 
     def to_dict(self):
-        if not self.valid_header or len(self.data) == 0:
+        if not self.valid_header or len(self.view) == 0:
             return
 
         body = None
@@ -1786,7 +2081,7 @@ class FirmwareCapsule(FirmwareObject):
         }
 
     def dump(self, parent="", index=None):
-        if len(self.data) == 0:
+        if len(self.view) == 0:
             return
 
         path = os.path.join(parent, "capsule-%s.cap" % self.name)
@@ -1799,4 +2094,4 @@ class FirmwareCapsule(FirmwareObject):
             # Write the raw image data from the capsule.
             path = os.path.join(parent, "capsule-%s.image" % self.name)
             offset = self.offsets["capsule_body"]
-            dump_data(path, self.data[offset:offset + self.image_size])
+            dump_data(path, self.view[offset:offset + self.image_size])
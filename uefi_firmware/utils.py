@@ -2,16 +2,91 @@
 from __future__ import print_function
 
 import os
+import re
 import sys
+import mmap
 import struct
+import threading
+import contextlib
+import contextvars
 from builtins import bytes
+from collections import OrderedDict
 import binascii
 
+from .structs.uefi_structs import FIRMWARE_VOLUME_GUID_SET, guid_bytes
+
 nocolor = False
+'''bool: Plain output, unless the current context chose otherwise (see colors).
+'''
+
+_color = contextvars.ContextVar("color", default=None)
+
+_cancel = contextvars.ContextVar("cancel", default=None)
+
+MMAP_THRESHOLD = 16 * 1024 * 1024
+'''int: Input files of at least this size are memory-mapped by read_file.'''
+
+def _plain():
+    enabled = _color.get()
+    if enabled is None:
+        return nocolor
+    return not enabled
+
+
+def use_color(enabled):
+    '''Enable, or disable, ANSI colors in the current context.
+
+    The choice applies to the calling thread (or asyncio task) only, other
+    threads use 'nocolor'.
+
+    Return:
+        contextvars.Token: Restores the previous choice, see colors.
+    '''
+    return _color.set(enabled)
+
+
+@contextlib.contextmanager
+def colors(enabled):
+    '''Enable, or disable, ANSI colors within a with block, see use_color.'''
+    token = _color.set(enabled)
+    try:
+        yield
+    finally:
+        _color.reset(token)
+
+
+class Cancelled(BaseException):
+    '''Raised within a parse, or a dump, that was cancelled (see aio).
+
+    Like asyncio.CancelledError it is not an Exception, parsers catching
+    errors do not mistake it for invalid content.
+    '''
+
+
+def check_cancelled():
+    '''Raise Cancelled if the work of the current context was cancelled.'''
+    event = _cancel.get()
+    if event is not None and event.is_set():
+        raise Cancelled()
+
+
+def run_cancellable(event, function, *args, **kwargs):
+    '''Call a function that stops, raising Cancelled, once event is set.
+
+    The function runs in a copy of the current context, where check_cancelled
+    tests the event (a threading.Event).
+
+    Return:
+        object: The function's result.
+    '''
+    context = contextvars.copy_context()
+    context.run(_cancel.set, event)
+    return context.run(function, *args, **kwargs)
+
 
 def blue(msg):
     '''Return the input string as console-escaped blue.'''
-    if nocolor:
+    if _plain():
         return msg
     else:
         return "\033[1;36m%s\033[1;m" % msg
@@ -19,7 +94,7 @@ def blue(msg):
 
 def red(msg):
     '''Return the input string as console-escaped red.'''
-    if nocolor:
+    if _plain():
         return msg
     else:
         return "\033[31m%s\033[1;m" % msg
@@ -27,7 +102,7 @@ def red(msg):
 
 def green(msg):
     '''Return the input string as console-escaped green.'''
-    if nocolor:
+    if _plain():
         return msg
     else:
         return "\033[32m%s\033[1;m" % msg
@@ -35,7 +110,7 @@ def green(msg):
 
 def purple(msg):
     '''Return the input string as console-escaped purple.'''
-    if nocolor:
+    if _plain():
         return msg
     else:
         return "\033[1;35m%s\033[1;m" % msg
@@ -77,13 +152,19 @@ def hex_dump(data, size=16):
         print_line(data[(len(data) % size) * -1:])
 
 
+def _format_guid(b, big=False):
+    a, b, c, d = struct.unpack("%sIHH8s" % (">" if big else "<"), b)
+    d = ''.join('%02x' % c for c in bytes(d))
+    return "%08x-%04x-%04x-%s-%s" % (a, b, c, d[:4], d[4:])
+
+
 def sguid(b, big=False):
     '''RFC4122 binary GUID as string.'''
     if b is None or len(b) != 16:
         return ""
-    a, b, c, d = struct.unpack("%sIHH8s" % (">" if big else "<"), b)
-    d = ''.join('%02x' % c for c in bytes(d))
-    return "%08x-%04x-%04x-%s-%s" % (a, b, c, d[:4], d[4:])
+    if isinstance(b, Guid) and not big:
+        return b.string
+    return _format_guid(b, big)
 
 
 def s2aguid(s):
@@ -112,6 +193,117 @@ def aguid(b, big=False):
     return [a, b, c] + [_c for _c in d]
 
 
+class Guid(bytes):
+    '''An immutable, interned GUID.
+
+    A Guid is its raw (little-endian) 16 bytes: it hashes and compares as
+    those bytes, so it may be looked up in sets and dictionaries of raw GUIDs.
+    The string and int array forms are computed once. Guid(value) returns the
+    same instance for the same bytes while it remains interned, the most
+    recently used GUIDs are kept. Parsers create a Guid for the GUIDs of
+    structure headers, sguid formats other bytes without interning them.
+    '''
+
+    _interned = OrderedDict()
+
+    _INTERN_LIMIT = 0x10000
+    '''int: The least recently used GUIDs are released beyond this many.'''
+
+    _lock = threading.Lock()
+
+    def __new__(cls, value):
+        if type(value) is cls:
+            return value
+        if isinstance(value, str):
+            value = guid_bytes(value)
+        raw = bytes(value)
+        with cls._lock:
+            guid = cls._interned.get(raw)
+            if guid is not None:
+                cls._interned.move_to_end(raw)
+                return guid
+        if len(raw) != 16:
+            raise ValueError("A GUID is 16 bytes, not %d" % len(raw))
+        guid = bytes.__new__(cls, raw)
+        guid.__dict__["string"] = _format_guid(raw)
+        with cls._lock:
+            guid = cls._interned.setdefault(raw, guid)
+            if len(cls._interned) > cls._INTERN_LIMIT:
+                cls._interned.popitem(last=False)
+        return guid
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Guid is immutable")
+
+    def __reduce__(self):
+        return (Guid, (bytes(self),))
+
+    def __str__(self):
+        return self.string
+
+    def __repr__(self):
+        return "Guid('%s')" % self.string
+
+    @property
+    def array(self):
+        '''tuple: The int array form (see aguid).'''
+        array = self.__dict__.get("_array")
+        if array is None:
+            array = self.__dict__["_array"] = tuple(aguid(bytes(self)))
+        return array
+
+
+def memview(data):
+    '''Return a zero-copy memoryview over a bytes-like input.
+
+    Non-buffer values (None, str) are returned unchanged.
+    '''
+    if data is None or isinstance(data, memoryview):
+        return data
+    try:
+        return memoryview(data)
+    except TypeError:
+        return data
+
+
+def view_offset(view, base=None):
+    '''Return the offset of a memoryview within a buffer containing it.
+
+    Args:
+        view (memoryview): A view, e.g. an object's bytes.
+        base (Optional[binary]): The buffer, by default the view's underlying
+            object.
+    '''
+    from . import _buffers
+
+    return _buffers.offset(view, view.obj if base is None else base)
+
+
+def as_bytes(data):
+    '''Return the bytes for a bytes-like input.
+
+    A memoryview spanning an entire bytes object returns that object, only
+    partial views are copied.
+    '''
+    if isinstance(data, memoryview):
+        if isinstance(data.obj, bytes) and data.nbytes == len(data.obj):
+            return data.obj
+        return data.tobytes()
+    return data
+
+
+def find_bytes(data, pattern, start=0):
+    '''Find a pattern within bytes or a memoryview without copying.
+
+    Return:
+        int: The offset of the first match at or after start, otherwise -1.
+    '''
+    match = re.compile(re.escape(pattern)).search(data, start)
+    if match is None:
+        return -1
+    return match.start()
+
+
 def bit_set(field, bit):
     '''Check if bit is set (1) in field.'''
     return (field & bit == bit)
@@ -124,6 +316,7 @@ def dump_data(name, data):
         name (string): Path to output file, created if it does not exist.
         data (binary): Content to be written.
     '''
+    check_cancelled()
     try:
         if os.path.dirname(name) != '':
             if not os.path.exists(os.path.dirname(name)):
@@ -135,19 +328,93 @@ def dump_data(name, data):
         print("Error: could not write (%s), (%s)." % (name, str(e)))
 
 
-def search_firmware_volumes(data, byte_align=16, limit=None):
-    '''"Search a blob for '_FVH' magics, related to firmware volume headers.'''
+def read_file(name, use_mmap=None):
+    '''Read an input file, memory-mapping large files.
+
+    A mapped file is only paged in as parsers touch its content. The mapping
+    remains valid after the file is closed.
+
+    Args:
+        name (string): Path to the input file.
+        use_mmap (Optional[bool]): Always (True) or never (False) map the file,
+            by default files of at least MMAP_THRESHOLD bytes are mapped.
+
+    Returns:
+        binary: The file content as bytes or a read-only mmap.
+    '''
+    with open(name, 'rb') as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if use_mmap is None:
+            use_mmap = size >= MMAP_THRESHOLD
+        if use_mmap and size > 0:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return fh.read()
+
+
+_FVH_PATTERN = re.compile(b"_FVH")
+
+
+def valid_volume_header(data, offset=0, checksum=True):
+    '''Check the firmware volume header at offset without parsing the volume.
+
+    This is a cheap filter for '_FVH' search hits: the filesystem GUID must be
+    known, the HeaderLength must be even and hold at least one block map
+    entry, the Length must hold the header, and (optionally) the 16-bit sum of
+    the header must be 0.
+
+    Args:
+        data (bytes): Any buffer containing the volume.
+        offset (Optional[int]): The offset of the volume header (the '_FVH'
+            magic is 40 bytes into the header).
+        checksum (Optional[bool]): Also verify the header checksum.
+
+    Returns:
+        bool: True if the header is plausible.
+    '''
+    if offset < 0 or len(data) - offset < 0x40:
+        return False
+    header = bytes(data[offset:offset + 0x38])
+    length, magic, _, hdrlen = struct.unpack("<Q4sIH", header[32:50])
+    if magic != b"_FVH" or header[16:32] not in FIRMWARE_VOLUME_GUID_SET:
+        return False
+    if hdrlen < 0x40 or hdrlen % 2 or length < hdrlen or length >= 1 << 32:
+        return False
+    if checksum:
+        if len(data) - offset < hdrlen:
+            return False
+        words = struct.unpack("<%dH" % (hdrlen // 2),
+                              bytes(data[offset:offset + hdrlen]))
+        if sum(words) & 0xFFFF != 0:
+            return False
+    return True
+
+
+def search_firmware_volumes(data, byte_align=16, limit=None, validate=False):
+    '''Search a blob for '_FVH' magics, related to firmware volume headers.
+
+    The blob is searched for the magic once, hits that are not aligned to
+    half of byte_align (at least 32 bytes in) are dropped.
+
+    Args:
+        data (bytes): Any buffer (bytes, memoryview, mmap).
+        byte_align (Optional[int]): The volume alignment.
+        limit (Optional[int]): Stop after this many hits.
+        validate (Optional[bool]): Only return hits with a plausible header,
+            see valid_volume_header.
+
+    Returns:
+        list: Offsets of the magics, 40 bytes after each volume header start.
+    '''
     potential_volumes = []
-    for aligned in range(32, len(data), byte_align):
-        if data[aligned:aligned + 4] == b'_FVH':
-            potential_volumes.append(aligned)
-            if limit and limit == len(potential_volumes):
-                return potential_volumes
-        magic = data[(aligned + byte_align // 2):(aligned + byte_align // 2 + 4)]
-        if magic == b'_FVH':
-            potential_volumes.append(aligned + byte_align // 2)
-            if limit and limit == len(potential_volumes):
-                return potential_volumes
+    for match in _FVH_PATTERN.finditer(data, 32):
+        offset = match.start()
+        if (offset - 32) % byte_align not in (0, byte_align // 2):
+            continue
+        if validate and not valid_volume_header(data, offset - 40):
+            continue
+        potential_volumes.append(offset)
+        if limit and limit == len(potential_volumes):
+            break
     return potential_volumes
 
 
@@ -166,10 +433,12 @@ def flatten_firmware_objects(base_objects):
         list: Non-Nested list of firmware objects.
     '''
     objects = []
-    for _object in base_objects:
+    pending = list(reversed(base_objects))
+    while pending:
+        _object = pending.pop()
         objects.append(_object)
-        if "objects" in _object and len(_object["objects"]) > 0:
-            objects += flatten_firmware_objects(_object["objects"])
+        if "objects" in _object:
+            pending.extend(reversed(_object["objects"]))
     return objects
 
 def utf8_decode_safe(byte_array):